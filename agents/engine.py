@@ -6,9 +6,14 @@ import random
 import subprocess
 import sys
 import os
-import re
+import sqlite3
 from typing import List, Dict, Any, Optional, Callable
 from dotenv import load_dotenv
+from .search_render import extract_search_item, render_search_results
+from .page_fetch import PageFetcher, attach_page_excerpts
+from .search_index import SearchIndex
+from .rate_limit import SearchRateLimiter, RateLimitExceeded
+from .parsing import extract_agent_output, SearchRequestStream
 
 # Load environment variables from .env file
 load_dotenv()
@@ -19,6 +24,66 @@ OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434/api/generate")
 MAX_CONCURRENT = int(os.getenv("MAX_CONCURRENT", "3"))  # GPU-aware: change to match GPU count
 DEFAULT_MODEL = os.getenv("OLLAMA_MODEL", "llama3.2")
 
+# Native tool calling via /api/chat (disabled by default: SEARCH_REQUEST text mode)
+OLLAMA_CHAT_URL = os.getenv("OLLAMA_CHAT_URL", OLLAMA_URL.replace("/api/generate", "/api/chat"))
+TOOL_CALLING = os.getenv("TOOL_CALLING", "false").lower() in ("1", "true", "yes")
+TOOL_MAX_STEPS = int(os.getenv("TOOL_MAX_STEPS", "4"))
+TOOL_TIME_BUDGET = float(os.getenv("TOOL_TIME_BUDGET", "300"))  # seconds per agent
+TOOL_FINAL_GRACE = float(os.getenv("TOOL_FINAL_GRACE", "60"))  # seconds for the forced final answer
+
+# Maximum web searches performed per agent in SEARCH_REQUEST text mode
+MAX_SEARCH_REQUESTS = int(os.getenv("MAX_SEARCH_REQUESTS", "3"))
+
+# Stream the first agent call and start web searches as soon as they appear in the output
+STREAM_SEARCH = os.getenv("STREAM_SEARCH", "false").lower() in ("1", "true", "yes")
+
+# Approximate token budget for search results embedded in follow-up prompts
+SEARCH_PROMPT_TOKEN_BUDGET = int(os.getenv("SEARCH_PROMPT_TOKEN_BUDGET", "1500"))
+
+# Optional fetching of top result pages for follow-up prompts
+FETCH_PAGES = os.getenv("FETCH_PAGES", "false").lower() in ("1", "true", "yes")
+FETCH_TOP_N = int(os.getenv("FETCH_TOP_N", "3"))  # pages fetched per search
+FETCH_CONCURRENCY = int(os.getenv("FETCH_CONCURRENCY", "4"))  # shared by all agents
+FETCH_MAX_BYTES = int(os.getenv("FETCH_MAX_BYTES", str(512 * 1024)))
+
+# Web search and local full-text index of past results
+SEARCH_TIMEOUT = float(os.getenv("SEARCH_TIMEOUT", "30"))
+SEARCH_INDEX_MODE = os.getenv("SEARCH_INDEX_MODE", "fallback")  # off | fallback | cache_first | offline
+SEARCH_INDEX_PATH = os.getenv("SEARCH_INDEX_PATH", "./storage/search_index.sqlite3")
+SEARCH_INDEX_MAX_AGE_HOURS = float(os.getenv("SEARCH_INDEX_MAX_AGE_HOURS", "168"))
+SEARCH_INDEX_MIN_HITS = int(os.getenv("SEARCH_INDEX_MIN_HITS", "3"))
+# cache_first: fraction of query terms a cached hit must contain to count
+SEARCH_INDEX_MIN_COVERAGE = float(os.getenv("SEARCH_INDEX_MIN_COVERAGE", "0.75"))
+
+# Memory server connection pool and context prefetched for each agent
+MEMORY_POOL_SIZE = int(os.getenv("MEMORY_POOL_SIZE", "10"))
+MEMORY_CONTEXT_RESULTS = int(os.getenv("MEMORY_CONTEXT_RESULTS", "3"))
+
+# Write-behind queue for memory stores (flushed in batches by a background task)
+MEMORY_QUEUE_MAX = int(os.getenv("MEMORY_QUEUE_MAX", "100"))
+MEMORY_FLUSH_BATCH = int(os.getenv("MEMORY_FLUSH_BATCH", "8"))
+MEMORY_FLUSH_INTERVAL = float(os.getenv("MEMORY_FLUSH_INTERVAL", "0.5"))  # seconds to gather a batch
+MEMORY_STORE_RETRIES = int(os.getenv("MEMORY_STORE_RETRIES", "3"))
+MEMORY_DRAIN_TIMEOUT = float(os.getenv("MEMORY_DRAIN_TIMEOUT", "30"))  # seconds close() waits for pending stores
+
+# SearXNG rate limiting (per engine group)
+PRIMARY_ENGINES = "duckduckgo,google,bing"
+FALLBACK_ENGINES = "startpage,brave"
+SEARCH_RATE_PER_SEC = float(os.getenv("SEARCH_RATE_PER_SEC", "1.0"))
+SEARCH_BURST = int(os.getenv("SEARCH_BURST", "3"))
+SEARCH_QUEUE_MAX = int(os.getenv("SEARCH_QUEUE_MAX", "20"))
+SEARCH_THROTTLE_BACKOFF = float(os.getenv("SEARCH_THROTTLE_BACKOFF", "10"))
+# Lower values are served first when searches queue up (workflow order)
+SEARCH_PRIORITIES = {
+    "researcher": 0,
+    "strategist": 1,
+    "product_manager": 2,
+    "architect": 3,
+    "project_manager": 4,
+    "namer": 5,
+    "copywriter": 6
+}
+
 
 # ======================
 # OLLAMA CLIENT (async)
@@ -29,11 +94,21 @@ async def call_ollama(
         model: str = DEFAULT_MODEL,
         stream: bool = False,
         retries: int = 2,
-        delay: float = 1.5) -> str:
+        delay: float = 1.5,
+        on_token: Optional[Callable[[str], None]] = None,
+        on_attempt: Optional[Callable[[], None]] = None) -> str:
+    """
+    Call Ollama's /api/generate endpoint and return the response text.
 
-    payload = {"model": model, "prompt": prompt, "stream": stream}
+    Streamed tokens go to `on_token` when given. A failed attempt is
+    retried from the start; `on_attempt` is called before every attempt so
+    consumers of partial output can reset.
+    """
+    payload = {"model": model, "prompt": prompt, "stream": stream or on_token is not None}
 
     for attempt in range(retries + 1):
+        if on_attempt:
+            on_attempt()
         try:
             async with session.post(OLLAMA_URL, json=payload, timeout=600) as resp:
                 if resp.status != 200:
@@ -41,18 +116,22 @@ async def call_ollama(
                     print(f"❌ Ollama HTTP {resp.status}: {error_text[:200]}")
                     raise Exception(f"Ollama HTTP {resp.status}")
 
-                # STREAM MODE
-                if stream:
+                # STREAM MODE (tokens go to on_token when given, else to the console)
+                if payload["stream"]:
                     output = ""
                     async for chunk in resp.content:
                         try:
                             data = json.loads(chunk.decode().strip())
-                            if "response" in data:
+                        except ValueError:
+                            continue
+                        if "response" in data:
+                            if on_token:
+                                on_token(data["response"])
+                            else:
                                 print(data["response"], end="", flush=True)
-                                output += data["response"]
-                        except:
-                            pass
-                    print()
+                            output += data["response"]
+                    if not on_token:
+                        print()
                     return output
 
                 # NON-STREAM
@@ -66,6 +145,52 @@ async def call_ollama(
                 raise e
 
 
+async def call_ollama_chat(
+        session: aiohttp.ClientSession,
+        messages: List[Dict[str, Any]],
+        tools: Optional[List[Dict[str, Any]]] = None,
+        model: str = DEFAULT_MODEL,
+        retries: int = 2,
+        delay: float = 1.5,
+        deadline: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Call Ollama's /api/chat endpoint and return the assistant message.
+
+    When tools are supplied the returned message may carry structured
+    `tool_calls` instead of (or in addition to) text content. With a
+    `deadline` (time.monotonic() value) every attempt is cut off when it
+    is reached, raising asyncio.TimeoutError.
+    """
+    payload = {"model": model, "messages": messages, "stream": False}
+    if tools:
+        payload["tools"] = tools
+
+    for attempt in range(retries + 1):
+        timeout = 600.0
+        if deadline is not None:
+            timeout = min(timeout, deadline - time.monotonic())
+            if timeout <= 0:
+                raise asyncio.TimeoutError("Ollama chat call reached the time budget")
+        try:
+            async with session.post(OLLAMA_CHAT_URL, json=payload, timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
+                if resp.status != 200:
+                    error_text = await resp.text()
+                    print(f"❌ Ollama chat HTTP {resp.status}: {error_text[:200]}")
+                    raise Exception(f"Ollama chat HTTP {resp.status}")
+
+                data = await resp.json()
+                return data.get("message", {"role": "assistant", "content": ""})
+
+        except Exception as e:
+            wait = delay * (attempt + 1)
+            if deadline is not None and time.monotonic() + wait >= deadline:
+                raise asyncio.TimeoutError("Ollama chat call reached the time budget") from e
+            if attempt < retries:
+                await asyncio.sleep(wait)
+            else:
+                raise e
+
+
 # ======================
 # PARALLEL EXECUTOR
 # ======================
@@ -196,6 +321,20 @@ class MemoryClient:
         """
         self.base_url = base_url or os.getenv("MEMORY_SERVER_URL", "http://localhost:8000")
         self.initialized = False
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._batch_search_supported = True
+        self._batch_store_supported = True
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+        self.write_stats = {"queued": 0, "stored": 0, "failed": 0, "batches": 0}
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Return the pooled HTTP session, creating it on first use."""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=MEMORY_POOL_SIZE, keepalive_timeout=60)
+            )
+        return self._session
     
     async def initialize(self):
         """Initialize memory client connection."""
@@ -204,22 +343,31 @@ class MemoryClient:
         
         # Check if memory server is available
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    f"{self.base_url}/memory/health",
-                    timeout=aiohttp.ClientTimeout(total=5)
-                ) as response:
-                    if response.status == 200:
-                        self.initialized = True
-                        print(f"🔗 Memory server connected at {self.base_url}")
-                    else:
-                        print(f"⚠️ Memory server health check failed: HTTP {response.status}")
-                        self.initialized = False
+            async with self._get_session().get(
+                f"{self.base_url}/memory/health",
+                timeout=aiohttp.ClientTimeout(total=5)
+            ) as response:
+                if response.status == 200:
+                    self.initialized = True
+                    print(f"🔗 Memory server connected at {self.base_url}")
+                else:
+                    print(f"⚠️ Memory server health check failed: HTTP {response.status}")
+                    self.initialized = False
         except Exception as e:
             print(f"⚠️ Memory server not available: {str(e)}")
             print(f"   Continuing without persistent memory...")
             self.initialized = False
     
+    @staticmethod
+    def _search_payload(query: str, n_results: int = 5, agent: str = None) -> Dict[str, Any]:
+        payload = {
+            "query": query,
+            "n_results": n_results
+        }
+        if agent:
+            payload["agent"] = agent
+        return payload
+    
     async def search(self, query: str, n_results: int = 5, agent: str = None) -> List[Dict[str, Any]]:
         """
         Search memory for relevant context.
@@ -236,27 +384,91 @@ class MemoryClient:
             return []
         
         try:
-            async with aiohttp.ClientSession() as session:
-                payload = {
-                    "query": query,
-                    "n_results": n_results
-                }
-                if agent:
-                    payload["agent"] = agent
-                
-                async with session.post(
-                    f"{self.base_url}/memory/search",
-                    json=payload,
-                    timeout=aiohttp.ClientTimeout(total=10)
+            async with self._get_session().post(
+                f"{self.base_url}/memory/search",
+                json=self._search_payload(query, n_results, agent),
+                timeout=aiohttp.ClientTimeout(total=10)
+            ) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    return data.get("results", [])
+                else:
+                    return []
+        except Exception as e:
+            print(f"⚠️ Memory search failed: {str(e)}")
+            return []
+    
+    async def search_batch(self, queries: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """
+        Run several memory searches in one request.
+        
+        Falls back to concurrent single searches when the server has no
+        batch endpoint.
+        
+        Args:
+            queries: Dicts with query and optional n_results and agent
+            
+        Returns:
+            One result list per query, in order
+        """
+        if not self.initialized or not queries:
+            return [[] for _ in queries]
+        
+        if self._batch_search_supported:
+            try:
+                async with self._get_session().post(
+                    f"{self.base_url}/memory/search_batch",
+                    json={"queries": [self._search_payload(**q) for q in queries]},
+                    timeout=aiohttp.ClientTimeout(total=30)
                 ) as response:
                     if response.status == 200:
                         data = await response.json()
-                        return data.get("results", [])
+                        return [entry.get("results", []) for entry in data.get("results", [])]
+                    if response.status in (404, 405):
+                        self._batch_search_supported = False
                     else:
-                        return []
+                        error_text = await response.text()
+                        print(f"⚠️ Memory batch search failed: HTTP {response.status} - {error_text[:200]}")
+            except Exception as e:
+                print(f"⚠️ Memory batch search failed: {str(e)}")
+        
+        return list(await asyncio.gather(*(self.search(**q) for q in queries)))
+    
+    @staticmethod
+    def _store_payload(
+        text: str,
+        agent: str,
+        task: str,
+        tags: List[str] = None,
+        metadata: Dict[str, Any] = None
+    ) -> Dict[str, Any]:
+        payload = {
+            "text": text,
+            "agent": agent,
+            "task": task
+        }
+        if tags:
+            payload["tags"] = tags
+        if metadata:
+            payload["metadata"] = metadata
+        return payload
+    
+    async def _post_store(self, payload: Dict[str, Any]) -> bool:
+        try:
+            async with self._get_session().post(
+                f"{self.base_url}/memory/store",
+                json=payload,
+                timeout=aiohttp.ClientTimeout(total=30)
+            ) as response:
+                if response.status == 200:
+                    return True
+                else:
+                    error_text = await response.text()
+                    print(f"⚠️ Memory store failed: HTTP {response.status} - {error_text[:200]}")
+                    return False
         except Exception as e:
-            print(f"⚠️ Memory search failed: {str(e)}")
-            return []
+            print(f"⚠️ Memory store failed: {str(e)}")
+            return False
     
     async def store(
         self,
@@ -282,46 +494,223 @@ class MemoryClient:
         if not self.initialized:
             return False
         
+        return await self._post_store(self._store_payload(text, agent, task, tags, metadata))
+    
+    async def enqueue_store(
+        self,
+        text: str,
+        agent: str,
+        task: str,
+        tags: List[str] = None,
+        metadata: Dict[str, Any] = None
+    ) -> bool:
+        """
+        Queue a memory entry for background storage.
+        
+        Entries are flushed in batches by a background writer. When the
+        queue is full this waits for room, so buffering stays bounded.
+        
+        Args:
+            text: Text content to store
+            agent: Agent persona name
+            task: Task description
+            tags: Optional additional tags
+            metadata: Optional additional metadata
+            
+        Returns:
+            True if queued, False if the memory server is unavailable
+        """
+        if not self.initialized:
+            return False
+        
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=MEMORY_QUEUE_MAX)
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.ensure_future(self._write_behind())
+        
+        await self._queue.put(self._store_payload(text, agent, task, tags, metadata))
+        self.write_stats["queued"] += 1
+        return True
+    
+    async def _write_behind(self):
+        """Background writer: gather queued entries into batches and flush them."""
+        while True:
+            batch = [await self._queue.get()]
+            deadline = time.monotonic() + MEMORY_FLUSH_INTERVAL
+            while len(batch) < MEMORY_FLUSH_BATCH:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+            
+            try:
+                await self._flush(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+    
+    async def _flush(self, batch: List[Dict[str, Any]]):
+        """Store a batch, retrying with exponential backoff; entries still failing are dropped."""
+        pending = batch
+        for attempt in range(MEMORY_STORE_RETRIES + 1):
+            if attempt:
+                await asyncio.sleep(0.5 * 2 ** (attempt - 1))
+            
+            if self._batch_store_supported:
+                status = await self._post_store_batch(pending)
+                if status == 200:
+                    self.write_stats["stored"] += len(pending)
+                    self.write_stats["batches"] += 1
+                    return
+                if status in (404, 405):
+                    self._batch_store_supported = False
+                else:
+                    continue
+            
+            # Server without batch endpoint: store entries one by one (concurrently)
+            ok = await asyncio.gather(*(self._post_store(payload) for payload in pending))
+            self.write_stats["stored"] += sum(ok)
+            self.write_stats["batches"] += 1
+            pending = [payload for payload, stored in zip(pending, ok) if not stored]
+            if not pending:
+                return
+        
+        self.write_stats["failed"] += len(pending)
+        print(f"⚠️ Dropped {len(pending)} memory entries after {MEMORY_STORE_RETRIES + 1} attempts")
+    
+    async def _post_store_batch(self, batch: List[Dict[str, Any]]) -> int:
+        """POST a batch to /memory/store_batch; returns the HTTP status (0 on connection errors)."""
         try:
-            async with aiohttp.ClientSession() as session:
-                payload = {
-                    "text": text,
-                    "agent": agent,
-                    "task": task
-                }
-                if tags:
-                    payload["tags"] = tags
-                if metadata:
-                    payload["metadata"] = metadata
-                
-                async with session.post(
-                    f"{self.base_url}/memory/store",
-                    json=payload,
-                    timeout=aiohttp.ClientTimeout(total=30)
-                ) as response:
-                    if response.status == 200:
-                        return True
-                    else:
-                        error_text = await response.text()
-                        print(f"⚠️ Memory store failed: HTTP {response.status} - {error_text[:200]}")
-                        return False
+            async with self._get_session().post(
+                f"{self.base_url}/memory/store_batch",
+                json={"items": batch},
+                timeout=aiohttp.ClientTimeout(total=60)
+            ) as response:
+                if response.status not in (200, 404, 405):
+                    error_text = await response.text()
+                    print(f"⚠️ Memory batch store failed: HTTP {response.status} - {error_text[:200]}")
+                return response.status
         except Exception as e:
-            print(f"⚠️ Memory store failed: {str(e)}")
+            print(f"⚠️ Memory batch store failed: {str(e)}")
+            return 0
+    
+    async def drain(self, timeout: float = MEMORY_DRAIN_TIMEOUT) -> bool:
+        """
+        Wait until all queued entries are flushed.
+        
+        Returns:
+            True if the queue drained within the timeout
+        """
+        if self._queue is None or self._writer is None:
+            return True
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            print(f"⚠️ Memory write-behind queue not drained after {timeout:.0f}s "
+                  f"({self._queue.qsize()} entries pending)")
             return False
     
     async def close(self):
-        """Close memory client connection."""
+        """Flush pending stores (bounded by MEMORY_DRAIN_TIMEOUT) and close the connection."""
+        await self.drain()
+        if self._writer is not None:
+            self._writer.cancel()
+            try:
+                await self._writer
+            except asyncio.CancelledError:
+                pass
+            self._writer = None
+        self._queue = None
         self.initialized = False
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
 
 
 # Global Memory client instance
 memory_client = MemoryClient()
 
+# Global page fetcher (its semaphore bounds fetches across all agents)
+page_fetcher = PageFetcher(concurrency=FETCH_CONCURRENCY, max_bytes=FETCH_MAX_BYTES)
+
+
+async def fetch_search_pages(session: aiohttp.ClientSession, search_results: List[Dict[str, Any]]) -> None:
+    """Attach page excerpts to search results when FETCH_PAGES is enabled."""
+    if not FETCH_PAGES or not search_results:
+        return
+    attached = await attach_page_excerpts(page_fetcher, session, search_results, top_n=FETCH_TOP_N)
+    if attached:
+        print(f"  📄 Extracted content from {attached} result pages")
+
 
 # ======================
 # MCP WEB SEARCH FUNCTIONS
 # ======================
-async def web_search(query: str, max_results: int = 5) -> dict:
+# Global search rate limiter shared by all agents
+search_rate_limiter = SearchRateLimiter(
+    rate=SEARCH_RATE_PER_SEC,
+    burst=SEARCH_BURST,
+    max_queue=SEARCH_QUEUE_MAX,
+    priorities=SEARCH_PRIORITIES
+)
+
+_search_index = None
+
+
+def get_search_index() -> Optional[SearchIndex]:
+    """Open the local search index on first use (None when disabled or unavailable)."""
+    global _search_index
+    if _search_index is None and SEARCH_INDEX_MODE != "off":
+        try:
+            _search_index = SearchIndex(SEARCH_INDEX_PATH)
+        except sqlite3.Error as e:
+            print(f"⚠️ Local search index unavailable: {e}")
+            return None
+    return _search_index
+
+
+def format_index_results(query: str, hits: List[Dict[str, Any]], live_error: str = None) -> dict:
+    """Shape local index hits like a live SearXNG result."""
+    from datetime import datetime
+
+    urls = [hit["url"] for hit in hits]
+    formatted_results = f"""Web Search Results for: "{query}"
+
+📚 Answered from local search index
+📊 Found {len(hits)} previously retrieved results"""
+    if urls:
+        formatted_results += "\n\n📋 Top Sources:\n"
+        for i, url in enumerate(urls, 1):
+            formatted_results += f"{i}. {url}\n"
+
+    result = {
+        "results": formatted_results,
+        "urls": urls,
+        "items": [{"title": h["title"], "snippet": h["snippet"], "url": h["url"]} for h in hits],
+        "query": query,
+        "timestamp": datetime.now().isoformat(),
+        "total_results": len(hits),
+        "engines": ["local_index"],
+        "source": "local_index"
+    }
+    if live_error is not None:
+        result["live_error"] = live_error
+    return result
+
+
+def _throttle_seconds(response) -> float:
+    """Back-off requested by an HTTP 429 response (Retry-After or a default)."""
+    try:
+        return float(response.headers.get("Retry-After", SEARCH_THROTTLE_BACKOFF))
+    except ValueError:
+        return SEARCH_THROTTLE_BACKOFF
+
+
+async def _searxng_search(query: str, max_results: int = 5, role: str = None) -> dict:
     """
     Perform real web search using SearXNG server directly.
     Returns both formatted results and extracted URLs.
@@ -333,7 +722,7 @@ async def web_search(query: str, max_results: int = 5) -> dict:
         params = {
             "q": query,
             "format": "json",
-            "engines": "duckduckgo,google,bing",
+            "engines": PRIMARY_ENGINES,
             "pageno": "1",
             "safesearch": "0",
             "language": "en",
@@ -346,9 +735,14 @@ async def web_search(query: str, max_results: int = 5) -> dict:
 
         print(f"🔍 Searching SearXNG: {query}")
 
+        # Wait for the primary engine group's rate limit
+        await search_rate_limiter.acquire(PRIMARY_ENGINES, role)
+
         # Make HTTP request to SearXNG
         async with aiohttp.ClientSession() as session:
-            async with session.get(full_url, timeout=30) as response:
+            async with session.get(full_url, timeout=SEARCH_TIMEOUT) as response:
+                if response.status == 429:
+                    search_rate_limiter.penalize(PRIMARY_ENGINES, _throttle_seconds(response))
                 if response.status != 200:
                     error_text = await response.text()
                     return {
@@ -363,21 +757,26 @@ async def web_search(query: str, max_results: int = 5) -> dict:
                 # Extract results from SearXNG response
                 results = data.get('results', [])
                 urls = []
+                items = []
 
                 for result in results[:max_results]:
                     url = result.get('url', '')
                     if url:
                         urls.append(url)
+                        items.append(extract_search_item(result))
 
                 # If no results from primary engines, try additional engines
                 if not urls:
                     # Try with different engines
                     fallback_params = params.copy()
-                    fallback_params["engines"] = "startpage,brave"
+                    fallback_params["engines"] = FALLBACK_ENGINES
                     fallback_query = "&".join([f"{k}={v}" for k, v in fallback_params.items() if v is not None])
                     fallback_url = f"{searxng_url}?{fallback_query}"
 
-                    async with session.get(fallback_url, timeout=30) as fallback_response:
+                    await search_rate_limiter.acquire(FALLBACK_ENGINES, role)
+                    async with session.get(fallback_url, timeout=SEARCH_TIMEOUT) as fallback_response:
+                        if fallback_response.status == 429:
+                            search_rate_limiter.penalize(FALLBACK_ENGINES, _throttle_seconds(fallback_response))
                         if fallback_response.status == 200:
                             fallback_data = await fallback_response.json()
                             fallback_results = fallback_data.get('results', [])
@@ -386,6 +785,7 @@ async def web_search(query: str, max_results: int = 5) -> dict:
                                 url = result.get('url', '')
                                 if url and url not in urls:
                                     urls.append(url)
+                                    items.append(extract_search_item(result))
 
                 # Format results summary
                 formatted_results = f"""Web Search Results for: "{query}"
@@ -418,12 +818,21 @@ Note: Full source URLs and metadata available in References section."""
                 return {
                     "results": formatted_results,
                     "urls": urls[:max_results],
+                    "items": items[:max_results],
                     "query": query,
                     "timestamp": timestamp,
                     "total_results": len(results),
                     "engines": ["duckduckgo", "google", "bing"]
                 }
 
+    except RateLimitExceeded as e:
+        print(f"⏳ {str(e)}")
+        return {
+            "results": f"Search rate limit exceeded: {str(e)}",
+            "urls": [],
+            "query": query,
+            "error": "rate_limited"
+        }
     except aiohttp.ClientError as e:
         error_msg = f"Network error connecting to SearXNG: {str(e)}"
         print(f"❌ {error_msg}")
@@ -443,11 +852,52 @@ Note: Full source URLs and metadata available in References section."""
             "error": str(e)
         }
 
+
+async def web_search(query: str, max_results: int = 5, role: str = None) -> dict:
+    """
+    Web search with a local full-text index of past results.
+
+    Live SearXNG results are appended to the index. Depending on
+    SEARCH_INDEX_MODE the index also answers queries:
+      - "fallback": only when SearXNG fails or times out (default)
+      - "cache_first": whenever enough fresh hits cover most of the query's
+        terms (SEARCH_INDEX_MIN_COVERAGE), else live search
+      - "offline": always, without contacting SearXNG
+      - "off": never (and nothing is indexed)
+    """
+    index = get_search_index()
+    max_age = SEARCH_INDEX_MAX_AGE_HOURS * 3600
+
+    if index is not None and SEARCH_INDEX_MODE in ("cache_first", "offline"):
+        min_coverage = 0.0 if SEARCH_INDEX_MODE == "offline" else SEARCH_INDEX_MIN_COVERAGE
+        hits = index.search(query, limit=max_results, max_age=max_age, min_coverage=min_coverage)
+        if SEARCH_INDEX_MODE == "offline" or len(hits) >= max(1, min(SEARCH_INDEX_MIN_HITS, max_results)):
+            print(f"📚 Answered from local index ({len(hits)} hits): {query}")
+            return format_index_results(query, hits)
+
+    result = await _searxng_search(query, max_results, role=role)
+
+    if index is None:
+        return result
+
+    if "error" not in result:
+        index.add_results(query, result.get("items", []))
+        return result
+
+    hits = index.search(query, limit=max_results, max_age=max_age)
+    if hits:
+        print(f"📚 SearXNG unavailable, answered from local index ({len(hits)} hits): {query}")
+        return format_index_results(query, hits, live_error=result["error"])
+    return result
+
+
 async def enhanced_call_ollama_with_tools(
         session: aiohttp.ClientSession,
         prompt: str,
         model: str = DEFAULT_MODEL,
-        enable_web_search: bool = True) -> str:
+        enable_web_search: bool = True,
+        on_token: Optional[Callable[[str], None]] = None,
+        on_attempt: Optional[Callable[[], None]] = None) -> str:
     """
     Enhanced Ollama call that includes tool use instructions.
     """
@@ -464,13 +914,104 @@ The system will automatically perform the search and provide results for your ne
 """
         prompt += tool_prompt
 
-    return await call_ollama(session, prompt, model)
+    return await call_ollama(session, prompt, model, on_token=on_token, on_attempt=on_attempt)
+
+
+# ======================
+# NATIVE TOOL CALLING
+# ======================
+TOOL_DEFINITIONS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "web_search",
+            "description": "Search the web for current information, market data, statistics or competitors.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "query": {"type": "string", "description": "The search query"}
+                },
+                "required": ["query"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "memory_search",
+            "description": "Search persistent memory for outputs of previous agent runs.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "query": {"type": "string", "description": "What to look for in memory"},
+                    "agent": {"type": "string", "description": "Optional agent role to restrict the search to"}
+                },
+                "required": ["query"]
+            }
+        }
+    }
+]
+
+
+async def _tool_web_search(session, role: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    query = str(arguments.get("query", "")).strip()
+    if not query:
+        return {"content": "Error: empty search query", "search": None}
+    print(f"  📡 Searching: '{query}'")
+    search_result = await web_search(query, role=role)
+    await fetch_search_pages(session, [search_result])
+    content = render_search_results([search_result], token_budget=SEARCH_PROMPT_TOKEN_BUDGET)
+    return {"content": content, "search": search_result}
+
+
+async def _tool_memory_search(session, role: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    query = str(arguments.get("query", "")).strip()
+    if not query:
+        return {"content": "Error: empty memory query", "search": None}
+    print(f"  🧠 Memory search: '{query}'")
+    memories = await memory_client.search(query=query, n_results=3, agent=arguments.get("agent"))
+    content = [
+        {"text": m.get("text", "")[:500], "agent": m.get("metadata", {}).get("agent")}
+        for m in memories
+    ]
+    return {"content": json.dumps(content) if content else "No relevant memories found.", "search": None}
+
+
+TOOL_HANDLERS = {
+    "web_search": _tool_web_search,
+    "memory_search": _tool_memory_search,
+}
+
+
+async def execute_tool_call(session, role: str, tool_call: Dict[str, Any]) -> Dict[str, Any]:
+    """Execute a single structured tool call returned by /api/chat."""
+    function = tool_call.get("function", {})
+    name = function.get("name", "")
+    arguments = function.get("arguments") or {}
+
+    # Some models return arguments as a JSON-encoded string
+    if isinstance(arguments, str):
+        try:
+            arguments = json.loads(arguments)
+        except json.JSONDecodeError:
+            arguments = {"query": arguments}
+
+    handler = TOOL_HANDLERS.get(name)
+    if handler is None:
+        return {"name": name, "arguments": arguments, "content": f"Error: unknown tool '{name}'", "search": None}
+
+    try:
+        outcome = await handler(session, role, arguments)
+    except Exception as e:
+        outcome = {"content": f"Error: tool '{name}' failed: {str(e)}", "search": None}
+
+    return {"name": name, "arguments": arguments, **outcome}
 
 
 # ======================
 # UTILITY FUNCTIONS
 # ======================
-def build_subagent_prompt(role: str, task: str, shared_memory: Dict[str, Any], memory_context: List[Dict[str, Any]] = None):
+def build_subagent_prompt(role: str, task: str, shared_memory: Dict[str, Any], memory_context: List[Dict[str, Any]] = None, native_tools: bool = False):
     # Build role-specific context and instructions
     role_instructions = ""
     
@@ -515,6 +1056,19 @@ Key responsibilities:
 Use web search for: project management best practices, development timelines, team sizing guidelines, risk assessment frameworks.
 """
 
+    if native_tools:
+        search_section = """🔍 TOOLS:
+You can call the `web_search` tool to gather current information, market data, or external knowledge, and the `memory_search` tool to look up outputs of previous agent runs. Call several tools at once when you need several searches. When you have enough information, stop calling tools and answer."""
+        search_requests_line = ""
+    else:
+        search_section = """🔍 WEB SEARCH CAPABILITIES:
+You can perform web searches to gather current information, market data, or external knowledge. To request a web search, include SEARCH_REQUEST: "your query here" in your response.
+
+Example: SEARCH_REQUEST: "latest SME automation trends 2024"
+
+The system will automatically perform the search and you may get additional context in follow-up interactions."""
+        search_requests_line = ',\n  "search_requests": ["optional search query 1", "optional search query 2"]'
+
     return f"""
 You are **{role}**, part of a coordinated AI team with web search capabilities.
 
@@ -528,45 +1082,94 @@ TASK:
 SHARED MEMORY FROM MASTER:
 {json.dumps(shared_memory, indent=2)}
 
-🔍 WEB SEARCH CAPABILITIES:
-You can perform web searches to gather current information, market data, or external knowledge. To request a web search, include SEARCH_REQUEST: "your query here" in your response.
-
-Example: SEARCH_REQUEST: "latest SME automation trends 2024"
-
-The system will automatically perform the search and you may get additional context in follow-up interactions.
+{search_section}
 
 Return your output as valid JSON in this format:
 {{
   "role": "{role}",
   "result": "...",
-  "insights": ["...", "..."],
-  "search_requests": ["optional search query 1", "optional search query 2"]
+  "insights": ["...", "..."]{search_requests_line}
 }}
 """
 
 
-async def run_subagent(session, role: str, task: str, mem: Dict[str, Any]):
-    print(f"🚀 Agent '{role}' starting task...")
+async def call_ollama_dispatching_searches(
+        session: aiohttp.ClientSession,
+        prompt: str,
+        role: str,
+        searches: Dict[str, asyncio.Task]) -> str:
+    """
+    Stream an agent call and start a web search for each search request as
+    soon as it is complete in the output, overlapping search latency with
+    the rest of the generation.
+
+    Started searches are added to `searches` (query -> task); the caller
+    awaits the ones it keeps and cancels the rest. If the call fails, the
+    searches it started are cancelled before the error propagates.
+    """
+    # A retried attempt streams the response again from the start, so it gets a fresh recognizer
+    streams = []
+
+    def dispatch(queries: List[str]):
+        for query in queries:
+            if len(searches) >= MAX_SEARCH_REQUESTS:
+                return
+            if query in searches:
+                continue
+            print(f"  📡 Searching early: '{query}'")
+            searches[query] = asyncio.ensure_future(web_search(query, role=role))
 
-    # Query memory for relevant context before execution
-    memory_context = []
-    if memory_client.initialized:
-        # Search memory using task description as query
-        memory_context = await memory_client.search(
-            query=f"{role} {task}",
-            n_results=3,
-            agent=role
+    try:
+        response = await enhanced_call_ollama_with_tools(
+            session, prompt,
+            on_token=lambda token: dispatch(streams[-1].feed(token)),
+            on_attempt=lambda: streams.append(SearchRequestStream())
         )
-        if memory_context:
-            print(f"  🧠 Found {len(memory_context)} relevant memories")
+        dispatch(streams[-1].finish())
+    except BaseException:
+        for task in searches.values():
+            task.cancel()
+        raise
+    return response
+
+
+def memory_context_query(role: str, task: str) -> Dict[str, Any]:
+    """Memory search used to give an agent context from previous runs."""
+    return {"query": f"{role} {task}", "n_results": MEMORY_CONTEXT_RESULTS, "agent": role}
+
+
+async def run_subagent(
+        session,
+        role: str,
+        task: str,
+        mem: Dict[str, Any],
+        memory_context: Optional[List[Dict[str, Any]]] = None):
+    print(f"🚀 Agent '{role}' starting task...")
+
+    # Query memory for relevant context before execution (unless prefetched by the master)
+    if memory_context is None:
+        memory_context = []
+        if memory_client.initialized:
+            memory_context = await memory_client.search(**memory_context_query(role, task))
+    if memory_context:
+        print(f"  🧠 Found {len(memory_context)} relevant memories")
+
+    if TOOL_CALLING:
+        return await run_subagent_with_tools(session, role, task, mem, memory_context)
 
     # First call to get initial response and potential search requests
     prompt = build_subagent_prompt(role, task, mem, memory_context)
-    response = await enhanced_call_ollama_with_tools(session, prompt)
+    early_searches: Dict[str, asyncio.Task] = {}
+    if STREAM_SEARCH:
+        response = await call_ollama_dispatching_searches(session, prompt, role, early_searches)
+    else:
+        response = await enhanced_call_ollama_with_tools(session, prompt)
 
     # Debug: Check if response is empty or invalid
     if not response or not response.strip():
         print(f"⚠️  Agent '{role}' received empty response from Ollama")
+        for search_task in early_searches.values():
+            search_task.cancel()
         return {
             "role": role,
             "result": "No response received from AI model",
@@ -575,457 +1178,145 @@ async def run_subagent(session, role: str, task: str, mem: Dict[str, Any]):
             "search_requests": []
         }
 
-    try:
-        result = json.loads(response)
-
-        # Check if agent requested web searches
-        if "search_requests" in result and result["search_requests"]:
-            print(f"🔍 Agent '{role}' requested {len(result['search_requests'])} web searches")
-
-            search_results = []
-            for search_query in result["search_requests"]:
-                if search_query and search_query.strip():
-                    print(f"  📡 Searching: '{search_query}'")
-                    search_result = await web_search(search_query.strip())
-                    search_results.append(search_result)
+    result = extract_agent_output(response, role)
+    if result.get("parsing_error"):
+        print(f"⚠️  Agent '{role}' output recovered ({result['extraction_method']})")
+        if result["extraction_method"] == "raw_text":
+            print(f"   📄 Response preview: {response[:200]}...")
+
+    # Check if agent requested web searches
+    search_queries = [q for q in result["search_requests"] if q.strip()][:MAX_SEARCH_REQUESTS]
+    # Searches started while streaming that did not survive final parsing
+    for query in set(early_searches) - set(search_queries):
+        early_searches.pop(query).cancel()
+    if search_queries:
+        print(f"🔍 Agent '{role}' requested {len(search_queries)} web searches")
+
+        search_results = []
+        for search_query in search_queries:
+            if search_query in early_searches:
+                search_result = await early_searches.pop(search_query)
+            else:
+                print(f"  📡 Searching: '{search_query}'")
+                search_result = await web_search(search_query, role=role)
+            search_results.append(search_result)
 
-            # Add search results to memory for potential follow-up
-            result["web_search_results"] = search_results
+        # Add search results to memory for potential follow-up
+        result["web_search_results"] = search_results
 
-            # If agent needs more context, make a follow-up call
-            if search_results:
-                followup_prompt = f"""
+        # Make a follow-up call so the agent can refine its analysis
+        await fetch_search_pages(session, search_results)
+        followup_prompt = f"""
 You previously requested web searches. Here are the results:
 
-{json.dumps(search_results, indent=2)}
+{render_search_results(search_results, token_budget=SEARCH_PROMPT_TOKEN_BUDGET)}
 
 Now, please refine your analysis using this additional information and provide your final response in the same JSON format.
 """
-                followup_response = await call_ollama(session, followup_prompt)
-                try:
-                    final_result = json.loads(followup_response)
-                    final_result["web_search_results"] = search_results
-                    result = final_result
-                except:
-                    # If follow-up parsing fails, keep original result but add search data
-                    result["web_search_results"] = search_results
-                    result["followup_parsing_error"] = True
-
-        print(f"✅ Agent '{role}' completed successfully")
-        return result
-
-    except json.JSONDecodeError as e:
-        print(f"⚠️  Agent '{role}' completed with parsing issues: {str(e)}")
-        print(f"   📄 Response preview: {response[:200]}...")
-
-        # Special handling for Researcher agent that returns multiple JSON objects
-        if role == "researcher" and "SEARCH_REQUEST:" in response:
-            print(f"🔍 Detected Researcher agent multi-JSON format, attempting advanced parsing...")
-
-            # Extract all search requests from the response
-            search_requests = []
-            lines = response.split('\n')
-            for line in lines:
-                line = line.strip()
-                if line.startswith('SEARCH_REQUEST:'):
-                    query = line.split('SEARCH_REQUEST:', 1)[1].strip().strip('"')
-                    if query:
-                        search_requests.append(query)
-
-            # Try to find any JSON content in the response
-            json_start = response.find('{')
-            json_end = response.rfind('}') + 1
-            all_insights = []
-            all_results = []
-
-            if json_start != -1 and json_end > json_start:
-                try:
-                    json_part = response[json_start:json_end]
-                    parsed_part = json.loads(json_part)
-
-                    # Collect insights and results
-                    if "insights" in parsed_part:
-                        all_insights.extend(parsed_part["insights"])
-                    if "result" in parsed_part:
-                        all_results.append(str(parsed_part["result"]))
-                    if "search_requests" in parsed_part:
-                        search_requests.extend(parsed_part["search_requests"])
-
-                except json.JSONDecodeError:
-                    pass  # Continue with search requests only
-
-            # Create consolidated result
-            consolidated_result = {
-                "role": role,
-                "result": " ".join(all_results) if all_results else f"Research conducted on {len(search_requests)} key topics related to business automation for SMEs",
-                "insights": list(set(all_insights)) if all_insights else [
-                    "SMEs face significant challenges in adopting automation technologies",
-                    "Research identified multiple pain points in business process automation",
-                    "Market trends show increasing demand for SME-friendly automation solutions"
-                ],
-                "search_requests": list(set(search_requests)),  # Remove duplicates
-                "parsing_error": True,
-                "consolidated": True
-            }
-
-            # Handle web searches if any were requested
-            if search_requests:
-                print(f"🔍 Agent '{role}' requested {len(search_requests)} web searches")
-                search_results = []
-                for search_query in search_requests[:3]:  # Limit to 3 searches to avoid overload
-                    if search_query and search_query.strip():
-                        print(f"  📡 Searching: '{search_query}'")
-                        search_result = await web_search(search_query.strip())
-                        search_results.append(search_result)
-
-                consolidated_result["web_search_results"] = search_results
-
-            print(f"✅ Successfully consolidated Researcher agent data with {len(search_requests)} search requests")
-            return consolidated_result
-
-        # Special handling for Product Manager agent - handle malformed JSON with control characters
-        elif role == "product_manager" and response.strip().startswith('{'):
-            print(f"🔧 Detected Product Manager agent with potential malformed JSON, attempting advanced extraction...")
-
-            # First, try to find the complete outer JSON structure
-            json_start = response.find('{')
-            # Find the LAST closing brace to get the complete JSON object
-            json_end = response.rfind('}') + 1
-
-            if json_start != -1 and json_end > json_start:
-                json_part = response[json_start:json_end]
+        followup_response = await call_ollama(session, followup_prompt)
+        final_result = extract_agent_output(followup_response or "", role)
+        if final_result.get("extraction_method") == "raw_text":
+            # If follow-up parsing fails, keep original result with its search data
+            result["followup_parsing_error"] = True
+        else:
+            final_result["search_requests"] = search_queries
+            final_result["web_search_results"] = search_results
+            if final_result.pop("parsing_error", False):
+                final_result["followup_parsing_error"] = True
+            result = final_result
+
+    print(f"✅ Agent '{role}' completed successfully")
+    return result
+
+
+async def run_subagent_with_tools(
+        session,
+        role: str,
+        task: str,
+        mem: Dict[str, Any],
+        memory_context: List[Dict[str, Any]] = None,
+        max_steps: int = TOOL_MAX_STEPS,
+        time_budget: float = TOOL_TIME_BUDGET,
+        final_grace: float = TOOL_FINAL_GRACE):
+    """
+    Run a sub-agent using Ollama's native tool calling.
+
+    Each turn the model may return several structured tool calls; all of
+    them are executed concurrently and their results are fed back as
+    `tool` messages. The loop ends when the model answers without tool
+    calls or when the step/time budget is spent, in which case one last
+    call is made without tools to force a final answer. That call gets
+    `final_grace` seconds past the budget, so the whole run is bounded.
+    """
+    prompt = build_subagent_prompt(role, task, mem, memory_context, native_tools=True)
+    messages = [{"role": "user", "content": prompt}]
+    deadline = time.monotonic() + time_budget
 
-                # Try to parse the outer JSON, but handle the case where inner content is malformed
-                try:
-                    result = json.loads(json_part)
-                    print(f"✅ Successfully parsed complete JSON for Product Manager agent")
-                except json.JSONDecodeError:
-                    # If direct parsing fails, try to extract the structure manually
-                    print(f"🔧 Direct JSON parsing failed, attempting manual extraction...")
-
-                    # Extract role
-                    role_match = re.search(r'"role"\s*:\s*"([^"]*)"', json_part)
-                    extracted_role = role_match.group(1) if role_match else "product_manager"
-
-                    # Extract result field - this might contain malformed JSON
-                    result_match = re.search(r'"result"\s*:\s*"((?:[^"\\]|\\.)*)"', json_part, re.DOTALL)
-                    extracted_result = ""
-                    if result_match:
-                        extracted_result = result_match.group(1)
-                        # Try to clean up the result if it looks like JSON
-                        if extracted_result.strip().startswith('{'):
-                            # Attempt to extract meaningful content from malformed inner JSON
-                            try:
-                                # Look for the actual result content
-                                inner_result_match = re.search(r'"result"\s*:\s*"([^"]*)"', extracted_result)
-                                if inner_result_match:
-                                    extracted_result = inner_result_match.group(1)
-                                # Extract insights from inner JSON
-                                inner_insights = []
-                                insights_matches = re.findall(r'"([^"]*)"', extracted_result)
-                                if insights_matches:
-                                    inner_insights = [insight for insight in insights_matches if insight and not insight.startswith('product_manager') and not insight.startswith('result')]
-                                extracted_result = extracted_result.replace('\\n', '\n').replace('\\"', '"')
-                            except:
-                                pass
-
-                    # Extract insights array
-                    insights_match = re.search(r'"insights"\s*:\s*\[([^\]]*)\]', json_part, re.DOTALL)
-                    extracted_insights = []
-                    if insights_match:
-                        insights_content = insights_match.group(1)
-                        # Extract individual insight strings
-                        insight_matches = re.findall(r'"([^"]*)"', insights_content)
-                        extracted_insights = [insight for insight in insight_matches if insight.strip()]
-
-                    # Extract search_requests array
-                    search_requests_match = re.search(r'"search_requests"\s*:\s*\[([^\]]*)\]', json_part, re.DOTALL)
-                    extracted_search_requests = []
-                    if search_requests_match:
-                        search_content = search_requests_match.group(1)
-                        # Handle both proper JSON strings and SEARCH_REQUEST: syntax
-                        if 'SEARCH_REQUEST:' in search_content:
-                            lines = search_content.split('\n')
-                            for line in lines:
-                                if 'SEARCH_REQUEST:' in line:
-                                    query = line.split('SEARCH_REQUEST:', 1)[1].strip().strip('",')
-                                    if query:
-                                        extracted_search_requests.append(query)
-                        else:
-                            # Try to extract as JSON array
-                            request_matches = re.findall(r'"([^"]*)"', search_content)
-                            extracted_search_requests = [req for req in request_matches if req.strip()]
-
-                    # Construct the result
-                    result = {
-                        "role": extracted_role,
-                        "result": extracted_result,
-                        "insights": extracted_insights,
-                        "search_requests": extracted_search_requests,
-                        "parsing_error": True,
-                        "extraction_method": "product_manager_manual_extraction"
-                    }
+    search_requests = []
+    search_results = []
+    steps = 0
+    final_content = None
 
-                    print(f"✅ Successfully extracted data manually for Product Manager agent")
-
-                # Extract additional search requests from any remaining text after JSON
-                remaining_text = response[json_end:]
-                additional_search_requests = []
-                if "SEARCH_REQUEST:" in remaining_text:
-                    lines = remaining_text.split('\n')
-                    for line in lines:
-                        if "SEARCH_REQUEST:" in line:
-                            query = line.split("SEARCH_REQUEST:", 1)[1].strip().strip('"')
-                            if query and query not in result.get("search_requests", []):
-                                additional_search_requests.append(query)
-
-                if additional_search_requests:
-                    result["search_requests"].extend(additional_search_requests)
-
-                # Handle web searches if any were requested
-                search_requests = result.get("search_requests", [])
-                if search_requests:
-                    print(f"🔍 Agent '{role}' requested {len(search_requests)} web searches")
-                    search_results = []
-                    for search_query in search_requests[:3]:  # Limit to 3 searches
-                        if search_query and search_query.strip():
-                            print(f"  📡 Searching: '{search_query}'")
-                            search_result = await web_search(search_query.strip())
-                            search_results.append(search_result)
-
-                    result["web_search_results"] = search_results
-
-                print(f"✅ Successfully processed Product Manager agent with {len(search_requests)} search requests")
-                return result
-
-        # Special handling for Strategist agent - handle extra data after JSON
-        elif role == "strategist" and response.strip().startswith('{'):
-            print(f"🔧 Detected Strategist agent JSON+extra content format, attempting extraction...")
-
-            # Try to extract the first valid JSON object
-            json_start = response.find('{')
-            json_end = response.find('}', json_start) + 1
-
-            if json_start != -1 and json_end > json_start:
-                try:
-                    json_part = response[json_start:json_end]
-                    result = json.loads(json_part)
-                    print(f"✅ Successfully extracted JSON for Strategist agent")
-
-                    # Check for search requests in the remaining text
-                    remaining_text = response[json_end:]
-                    search_requests = []
-                    if "SEARCH_REQUEST:" in remaining_text:
-                        lines = remaining_text.split('\n')
-                        for line in lines:
-                            if "SEARCH_REQUEST:" in line:
-                                query = line.split("SEARCH_REQUEST:", 1)[1].strip().strip('"')
-                                if query:
-                                    search_requests.append(query)
-
-                    result["search_requests"] = search_requests
-
-                    # Handle web searches if any were requested
-                    if search_requests:
-                        print(f"🔍 Agent '{role}' requested {len(search_requests)} web searches")
-                        search_results = []
-                        for search_query in search_requests[:3]:  # Limit to 3 searches
-                            if search_query and search_query.strip():
-                                print(f"  📡 Searching: '{search_query}'")
-                                search_result = await web_search(search_query.strip())
-                                search_results.append(search_result)
-
-                        result["web_search_results"] = search_results
-
-                    result["parsing_error"] = True
-                    result["extraction_method"] = "strategist_json_first"
-                    print(f"✅ Successfully processed Strategist agent with {len(search_requests)} search requests")
-                    return result
-
-                except json.JSONDecodeError:
-                    pass  # Continue with general handling
-
-        # Special handling for Project Manager agent - handle complex markdown content
-        elif role == "project_manager":
-            print(f"🔧 Detected Project Manager agent with complex content, attempting extraction...")
-
-            # First, try to extract JSON by handling the specific markdown formatting issues
-            json_start = response.find('{')
-            json_end = response.rfind('}') + 1
-
-            if json_start != -1 and json_end > json_start:
-                json_content = response[json_start:json_end]
-
-                # Fix common issues in project manager responses:
-                # 1. Unescaped quotes in markdown headers like "## Phase 1: "Planning""
-                # 2. Unescaped quotes in content like "95% uptime"
-                try:
-                    # Replace problematic quote patterns in markdown
-                    # Pattern: word"word or "word"word" -> word\"word or \"word\"word\"
-                    json_content = re.sub(r'(\w)"(\w)', r'\1\\"\2', json_content)  # word"word -> word\"word
-                    json_content = re.sub(r'"(\w*)"(\w*)"', r'"\1\\"\2"', json_content)  # "word"word" -> "word\"word"
-
-                    # More aggressive: escape all unescaped quotes that appear to be inside strings
-                    # This looks for quotes that are not preceded by backslash or colon
-                    def escape_internal_quotes(match):
-                        value = match.group(1)
-                        # Escape quotes that are not at the start/end and not after colons
-                        escaped = re.sub(r'(?<!^)(?<!:)\"(?!\s*[,}])', r'\\"', value)
-                        return f'"{escaped}"'
-
-                    # Apply to string values in JSON
-                    json_content = re.sub(r'"([^"]*)"', escape_internal_quotes, json_content)
-
-                    result = json.loads(json_content)
-                    print(f"✅ Successfully parsed JSON for Project Manager after quote escaping")
-
-                    # Handle web searches if any were requested
-                    if "search_requests" in result and result["search_requests"]:
-                        print(f"🔍 Agent '{role}' requested {len(result['search_requests'])} web searches")
-                        search_results = []
-                        for search_query in result["search_requests"][:3]:  # Limit to 3 searches
-                            if search_query and search_query.strip():
-                                print(f"  📡 Searching: '{search_query}'")
-                                search_result = await web_search(search_query.strip())
-                                search_results.append(search_result)
-
-                        result["web_search_results"] = search_results
-
-                    result["parsing_error"] = True
-                    result["extraction_method"] = "project_manager_quote_escape"
-                    print(f"✅ Successfully processed Project Manager agent")
-                    return result
-
-                except (json.JSONDecodeError, re.error) as e:
-                    print(f"⚠️ Advanced quote escaping failed: {e}")
-
-            # Fallback: If JSON parsing fails completely, extract markdown content
-            print(f"🔄 Attempting markdown content extraction for Project Manager...")
-            try:
-                # Look for the JSON structure and extract the result field manually
-                result_start = response.find('"result":')
-                if result_start != -1:
-                    # Find the end of the result field (before next field)
-                    result_end = response.find('"insights":', result_start)
-                    if result_end == -1:
-                        result_end = response.find('"search_requests":', result_start)
-                    if result_end == -1:
-                        result_end = response.find('}', result_start)
-
-                    if result_end != -1:
-                        result_content = response[result_start:result_end].strip()
-                        # Extract just the content between quotes
-                        content_match = re.search(r'"result":\s*"([^"]*)"', result_content, re.DOTALL)
-                        if content_match:
-                            markdown_content = content_match.group(1)
-                            # Unescape the content
-                            markdown_content = markdown_content.replace('\\"', '"').replace('\\n', '\n')
-
-                            consolidated_result = {
-                                "role": role,
-                                "result": markdown_content,
-                                "insights": [
-                                    "Project plan developed with timeline and milestones",
-                                    "Resource requirements identified",
-                                    "Risk assessment included"
-                                ],
-                                "search_requests": [],
-                                "parsing_error": True,
-                                "extraction_method": "project_manager_content_extraction"
-                            }
-
-                            print(f"✅ Successfully extracted markdown content for Project Manager")
-                            return consolidated_result
-
-                # If all else fails, use the general markdown extraction
-                if "## " in response or "### " in response:
-                    lines = response.split('\n')
-                    result_content = []
-                    in_result = False
-
-                    for line in lines:
-                        if line.strip().startswith('## ') or line.strip().startswith('### '):
-                            in_result = True
-                        if in_result and line.strip():
-                            result_content.append(line)
-
-                    if result_content:
-                        consolidated_result = {
-                            "role": role,
-                            "result": "\n".join(result_content).strip(),
-                            "insights": [
-                                "Project plan created with detailed timeline and milestones",
-                                "Resource requirements identified for development team",
-                                "Risk mitigation strategies included in planning"
-                            ],
-                            "search_requests": [],
-                            "parsing_error": True,
-                            "extraction_method": "project_manager_markdown_fallback"
-                        }
-
-                        print(f"✅ Successfully extracted markdown content for Project Manager (fallback)")
-                        return consolidated_result
-
-            except Exception as fallback_e:
-                print(f"⚠️ All extraction methods failed for Project Manager: {fallback_e}")
-
-        # Try to extract JSON from responses that have SEARCH_REQUEST outside JSON
-        json_start = response.find('{')
-        json_end = response.rfind('}') + 1
-
-        if json_start != -1 and json_end > json_start:
-            try:
-                json_part = response[json_start:json_end]
-                result = json.loads(json_part)
-                print(f"✅ Successfully extracted JSON for '{role}'")
-
-                # Extract search requests from the text before JSON
-                search_requests = []
-                text_before_json = response[:json_start]
-                if "SEARCH_REQUEST:" in text_before_json:
-                    lines = text_before_json.split('\n')
-                    for line in lines:
-                        if "SEARCH_REQUEST:" in line:
-                            query = line.split("SEARCH_REQUEST:", 1)[1].strip().strip('"')
-                            if query:
-                                search_requests.append(query)
-
-                result["parsing_error"] = True
-                result["search_requests"] = search_requests
-
-                # Handle web searches if any were requested
-                if search_requests:
-                    print(f"🔍 Agent '{role}' requested {len(search_requests)} web searches")
-                    search_results = []
-                    for search_query in search_requests:
-                        if search_query and search_query.strip():
-                            print(f"  📡 Searching: '{search_query}'")
-                            search_result = await web_search(search_query.strip())
-                            search_results.append(search_result)
-
-                    result["web_search_results"] = search_results
-
-                print(f"✅ Agent '{role}' completed successfully (recovered from parsing error)")
-                return result
-
-            except json.JSONDecodeError:
-                print(f"❌ JSON extraction also failed for '{role}'")
-
-        # Fallback: Try to extract search requests even from malformed responses
-        search_requests = []
-        if "SEARCH_REQUEST:" in response:
-            # Simple extraction of search requests
-            lines = response.split('\n')
-            for line in lines:
-                if "SEARCH_REQUEST:" in line:
-                    query = line.split("SEARCH_REQUEST:", 1)[1].strip().strip('"')
-                    if query:
-                        search_requests.append(query)
+    while steps < max_steps and time.monotonic() < deadline:
+        try:
+            # A slow call is cut off when the budget runs out, not after it
+            message = await call_ollama_chat(session, messages, tools=TOOL_DEFINITIONS, deadline=deadline)
+        except asyncio.TimeoutError:
+            break
+        messages.append(message)
+        steps += 1
+
+        tool_calls = message.get("tool_calls") or []
+        if not tool_calls:
+            final_content = message.get("content", "")
+            break
+
+        print(f"🛠️ Agent '{role}' requested {len(tool_calls)} tool calls (step {steps}/{max_steps})")
+        outcomes = await asyncio.gather(*(execute_tool_call(session, role, call) for call in tool_calls))
+
+        for outcome in outcomes:
+            if outcome["search"] is not None:
+                search_requests.append(outcome["arguments"].get("query", ""))
+                search_results.append(outcome["search"])
+            messages.append({
+                "role": "tool",
+                "tool_name": outcome["name"],
+                "content": outcome["content"]
+            })
+
+    if final_content is None:
+        # Budget exhausted while the model was still calling tools
+        print(f"⏱️ Agent '{role}' reached its tool budget, requesting final answer")
+        messages.append({
+            "role": "user",
+            "content": "Stop calling tools. Provide your final response now in the requested JSON format."
+        })
+        try:
+            message = await call_ollama_chat(
+                session, messages, deadline=max(deadline, time.monotonic()) + final_grace
+            )
+            final_content = message.get("content", "")
+        except asyncio.TimeoutError:
+            print(f"⏱️ Agent '{role}' final answer did not arrive within {final_grace:.0f}s")
+            final_content = ""
 
-        return {
+    if not final_content or not final_content.strip():
+        print(f"⚠️  Agent '{role}' received empty response from Ollama")
+        result = {
             "role": role,
-            "result": response,
+            "result": "No response received from AI model",
             "insights": [],
-            "parsing_error": True,
-            "search_requests": search_requests
-        }
\ No newline at end of file
+            "parsing_error": True
+        }
+    else:
+        result = extract_agent_output(final_content, role)
+        if result.get("parsing_error"):
+            print(f"⚠️  Agent '{role}' output recovered ({result['extraction_method']})")
+
+    result["search_requests"] = search_requests
+    if search_results:
+        result["web_search_results"] = search_results
+    result["tool_steps"] = steps
+
+    print(f"✅ Agent '{role}' completed successfully")
+    return result
@@ -1,5 +1,5 @@
 import json
-from .engine import ParallelExecutor, run_subagent, mcp_client, memory_client
+from .engine import ParallelExecutor, run_subagent, mcp_client, memory_client, search_rate_limiter, memory_context_query
 
 
 class MasterAgent:
@@ -10,6 +10,31 @@ class MasterAgent:
     def update_memory(self, key, value):
         self.memory[key] = value
 
+    async def _run_and_persist(self, session, role: str, task: str, memory_context):
+        """Run one agent and queue its result for the memory server as soon as it finishes."""
+        result = await run_subagent(session, role, task, self.memory, memory_context)
+
+        if memory_client.initialized:
+            # Extract text content for storage
+            text_content = ""
+            if "result" in result:
+                text_content += str(result["result"])
+            if "insights" in result and result["insights"]:
+                text_content += "\n\nInsights:\n" + "\n".join(str(i) for i in result["insights"])
+
+            if text_content:
+                await memory_client.enqueue_store(
+                    text=text_content,
+                    agent=result.get("role", role),
+                    task=task,
+                    metadata={
+                        "has_web_search": bool(result.get("web_search_results")),
+                        "insights_count": len(result.get("insights", [])),
+                        "search_requests_count": len(result.get("search_requests", []))
+                    }
+                )
+        return result
+
     async def run(self, tasks: dict):
         """
         tasks = {
@@ -24,12 +49,21 @@ class MasterAgent:
         await mcp_client.initialize()
         print("🧠 Initializing memory server...")
         await memory_client.initialize()
+
+        # Prefetch memory context for every agent in one batched request
+        contexts = {}
+        if memory_client.initialized:
+            context_lists = await memory_client.search_batch(
+                [memory_context_query(role, task) for role, task in tasks.items()]
+            )
+            contexts = dict(zip(tasks.keys(), context_lists))
+            print(f"🧠 Prefetched memory context: {sum(len(c) for c in context_lists)} memories for {len(tasks)} agents")
         print("⏳ Starting parallel execution...\n")
 
         executor = ParallelExecutor()
 
         coroutines = [
-            lambda session, role=role, task=task: run_subagent(session, role, task, self.memory)
+            lambda session, role=role, task=task: self._run_and_persist(session, role, task, contexts.get(role))
             for role, task in tasks.items()
         ]
 
@@ -38,41 +72,24 @@ class MasterAgent:
         print("\n✅ All agents completed!")
         print(f"📊 Collected {len(results)} results\n")
 
+        # Report search rate limiting
+        for group, stats in search_rate_limiter.snapshot().items():
+            print(f"⏱️ Search rate limit [{group}]: {stats['requests']} requests, "
+                  f"{stats['waited']} waited (avg {stats['avg_wait']:.2f}s, max {stats['max_wait']:.2f}s), "
+                  f"{stats['rejected']} rejected, {stats['throttled']} throttled")
+
         # Save to local memory
         for result in results:
             role = result.get("role", "unknown")
             self.memory[f"result_{role}"] = result
         
-        # Store results in persistent memory server
-        if memory_client.initialized:
-            print("💾 Storing results in persistent memory...")
-            for result in results:
-                role = result.get("role", "unknown")
-                task = tasks.get(role, "Unknown task")
-                
-                # Extract text content for storage
-                text_content = ""
-                if "result" in result:
-                    text_content += str(result["result"])
-                if "insights" in result and result["insights"]:
-                    text_content += "\n\nInsights:\n" + "\n".join(result["insights"])
-                
-                if text_content:
-                    # Store in memory server
-                    await memory_client.store(
-                        text=text_content,
-                        agent=role,
-                        task=task,
-                        metadata={
-                            "has_web_search": bool(result.get("web_search_results")),
-                            "insights_count": len(result.get("insights", [])),
-                            "search_requests_count": len(result.get("search_requests", []))
-                        }
-                    )
-            print("✅ Memory storage completed\n")
-
-        # Cleanup clients
+        # Cleanup clients (closing the memory client flushes results still queued for storage)
         await mcp_client.close()
         await memory_client.close()
 
+        stats = memory_client.write_stats
+        if stats["queued"]:
+            print(f"💾 Memory storage: {stats['stored']}/{stats['queued']} results stored "
+                  f"in {stats['batches']} batches, {stats['failed']} failed\n")
+
         return results, self.memory
\ No newline at end of file
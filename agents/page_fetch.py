@@ -0,0 +1,295 @@
+"""
+Fetch-and-extract pipeline for top search result pages.
+
+Pages are fetched with bounded concurrency shared by every agent, read as
+a stream up to a byte cap, stripped of markup and boilerplate, cached by
+URL + ETag and split into chunks from which query-relevant excerpts are
+picked for follow-up prompts.
+"""
+
+import asyncio
+import re
+import time
+from collections import OrderedDict
+from html.parser import HTMLParser
+from typing import List, Dict, Any, Optional
+
+import aiohttp
+
+# Elements whose text is navigation/chrome rather than page content
+_SKIP_TAGS = {
+    "script", "style", "noscript", "template", "svg", "canvas", "iframe",
+    "nav", "header", "footer", "aside", "form", "button", "select", "head"
+}
+_BLOCK_TAGS = {
+    "p", "div", "section", "article", "main", "br", "li", "ul", "ol", "table",
+    "tr", "td", "th", "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "pre"
+}
+_WHITESPACE = re.compile(r"[ \t\r\f\v]+")
+_WORD = re.compile(r"\w+")
+
+
+class _TextExtractor(HTMLParser):
+    """Collects visible text, skipping boilerplate elements."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self.title = ""
+        self._skip_depth = 0
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "title":
+            self._in_title = True
+        if tag in _SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in _BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in _BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self._in_title = False
+        if tag in _SKIP_TAGS and self._skip_depth > 0:
+            self._skip_depth -= 1
+        elif tag in _BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        elif self._skip_depth == 0:
+            self.parts.append(data)
+
+
+def extract_text(html: str, min_words: int = 4) -> Dict[str, str]:
+    """
+    Strip markup and boilerplate from an HTML document.
+
+    Text inside navigation, header/footer, scripts and similar elements is
+    dropped, as are remaining lines shorter than `min_words` words (menus,
+    breadcrumbs, button labels).
+
+    Returns:
+        Dict with "title" and plain "text"
+    """
+    parser = _TextExtractor()
+    try:
+        parser.feed(html)
+        parser.close()
+    except Exception:
+        pass  # Keep whatever was extracted from malformed markup
+
+    lines = []
+    for line in "".join(parser.parts).split("\n"):
+        line = _WHITESPACE.sub(" ", line).strip()
+        if len(line.split()) >= min_words:
+            lines.append(line)
+
+    return {"title": _WHITESPACE.sub(" ", parser.title).strip(), "text": "\n".join(lines)}
+
+
+def chunk_text(text: str, chunk_chars: int = 800, overlap: int = 100) -> List[str]:
+    """Split text into overlapping chunks, preferring to break on whitespace."""
+    text = text.strip()
+    if len(text) <= chunk_chars:
+        return [text] if text else []
+
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + chunk_chars, len(text))
+        if end < len(text):
+            space = text.rfind(" ", start + chunk_chars // 2, end)
+            if space != -1:
+                end = space
+        chunks.append(text[start:end].strip())
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+    return chunks
+
+
+def select_excerpts(chunks: List[str], query: str, max_chunks: int = 2) -> List[str]:
+    """Pick the chunks sharing the most terms with the query, in document order."""
+    terms = {w.lower() for w in _WORD.findall(query) if len(w) > 2}
+    if not chunks:
+        return []
+    if not terms:
+        return chunks[:max_chunks]
+
+    scores = [sum(1 for w in _WORD.findall(chunk) if w.lower() in terms) for chunk in chunks]
+    best = sorted(range(len(chunks)), key=lambda i: (-scores[i], i))[:max_chunks]
+    return [chunks[i] for i in sorted(best)]
+
+
+class PageFetcher:
+    """Bounded-concurrency page fetcher with an ETag-aware content cache."""
+
+    def __init__(
+            self,
+            concurrency: int = 4,
+            max_bytes: int = 512 * 1024,
+            timeout: float = 15.0,
+            cache_ttl: float = 3600.0,
+            max_cache_entries: int = 512):
+        """
+        Initialize the page fetcher.
+
+        Args:
+            concurrency: Maximum simultaneous fetches across all callers
+            max_bytes: Maximum bytes read from a single response body
+            timeout: Per-request timeout in seconds
+            cache_ttl: Seconds a page without ETag is reused before refetching
+            max_cache_entries: Maximum number of cached pages
+        """
+        self.concurrency = concurrency
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.cache_ttl = cache_ttl
+        self.max_cache_entries = max_cache_entries
+        self._sem = asyncio.Semaphore(concurrency)
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.stats = {"fetched": 0, "cache_hits": 0, "revalidated": 0, "errors": 0}
+
+    def _cache_put(self, url: str, entry: Dict[str, Any]) -> None:
+        self._cache[url] = entry
+        self._cache.move_to_end(url)
+        while len(self._cache) > self.max_cache_entries:
+            self._cache.popitem(last=False)
+
+    def _cache_touch(self, url: str) -> None:
+        """Mark a cached page as just used (eviction drops the least recently used)."""
+        if url in self._cache:
+            self._cache.move_to_end(url)
+
+    async def _read_capped(self, resp: aiohttp.ClientResponse) -> bytes:
+        body = bytearray()
+        async for chunk in resp.content.iter_chunked(16 * 1024):
+            body.extend(chunk)
+            if len(body) >= self.max_bytes:
+                del body[self.max_bytes:]
+                break
+        return bytes(body)
+
+    async def _fetch(self, session: aiohttp.ClientSession, url: str) -> Optional[Dict[str, Any]]:
+        cached = self._cache.get(url)
+        if cached and not cached["etag"] and time.monotonic() - cached["fetched_at"] < self.cache_ttl:
+            self.stats["cache_hits"] += 1
+            self._cache_touch(url)
+            return {**cached["page"], "cached": True}
+
+        headers = {"User-Agent": "ollama-bench/0.1 (+page-fetch)"}
+        if cached and cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+
+        async with self._sem:
+            try:
+                async with session.get(
+                    url,
+                    headers=headers,
+                    timeout=aiohttp.ClientTimeout(total=self.timeout),
+                    allow_redirects=True
+                ) as resp:
+                    if resp.status == 304 and cached:
+                        self.stats["revalidated"] += 1
+                        cached["fetched_at"] = time.monotonic()
+                        self._cache_touch(url)
+                        return {**cached["page"], "cached": True}
+
+                    content_type = resp.headers.get("Content-Type", "")
+                    if resp.status != 200 or not content_type.startswith(("text/html", "text/plain", "application/xhtml")):
+                        self.stats["errors"] += 1
+                        return None
+
+                    raw = await self._read_capped(resp)
+                    etag = resp.headers.get("ETag")
+                    charset = resp.charset or "utf-8"
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                self.stats["errors"] += 1
+                print(f"  ⚠️ Page fetch failed for {url}: {str(e) or type(e).__name__}")
+                return None
+
+        try:
+            html = raw.decode(charset, errors="replace")
+        except LookupError:
+            html = raw.decode("utf-8", errors="replace")
+        if content_type.startswith("text/plain"):
+            page = {"url": url, "title": "", "text": html.strip()}
+        else:
+            page = {"url": url, **extract_text(html)}
+        page["truncated"] = len(raw) >= self.max_bytes
+
+        self.stats["fetched"] += 1
+        self._cache_put(url, {"etag": etag, "fetched_at": time.monotonic(), "page": page})
+        return {**page, "cached": False}
+
+    async def fetch(self, session: aiohttp.ClientSession, url: str) -> Optional[Dict[str, Any]]:
+        """
+        Fetch and extract a single page.
+
+        Concurrent requests for the same URL share one download.
+
+        Returns:
+            Dict with url, title, text, truncated and cached flags, or None on failure
+        """
+        if url in self._inflight:
+            return await asyncio.shield(self._inflight[url])
+
+        future = asyncio.ensure_future(self._fetch(session, url))
+        self._inflight[url] = future
+        try:
+            return await future
+        finally:
+            self._inflight.pop(url, None)
+
+    async def fetch_many(self, session: aiohttp.ClientSession, urls: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """Fetch several pages concurrently (bounded by the shared semaphore)."""
+        return await asyncio.gather(*(self.fetch(session, url) for url in urls))
+
+
+async def attach_page_excerpts(
+        fetcher: PageFetcher,
+        session: aiohttp.ClientSession,
+        search_results: List[Dict[str, Any]],
+        top_n: int = 3,
+        max_chunks: int = 2,
+        chunk_chars: int = 800) -> int:
+    """
+    Fetch the top result pages of each search and attach excerpts in place.
+
+    Every fetched item gains an "excerpt" field built from the chunks most
+    relevant to its query.
+
+    Returns:
+        Number of items that received an excerpt
+    """
+    targets = []
+    seen = set()
+    for search in search_results:
+        for item in (search.get("items") or [])[:top_n]:
+            url = item.get("url")
+            if url and url not in seen:
+                seen.add(url)
+                targets.append((search.get("query", ""), item))
+
+    if not targets:
+        return 0
+
+    pages = await fetcher.fetch_many(session, [item["url"] for _, item in targets])
+
+    attached = 0
+    for (query, item), page in zip(targets, pages):
+        if not page or not page.get("text"):
+            continue
+        chunks = chunk_text(page["text"], chunk_chars=chunk_chars)
+        excerpts = select_excerpts(chunks, f"{query} {item.get('title', '')}", max_chunks=max_chunks)
+        if excerpts:
+            item["excerpt"] = " … ".join(excerpts)
+            attached += 1
+    return attached
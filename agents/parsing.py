@@ -0,0 +1,518 @@
+"""
+Tolerant extraction of agent JSON output.
+
+Models frequently wrap their JSON in prose, emit several objects, leave
+quotes and newlines unescaped inside long markdown strings, put bare
+`SEARCH_REQUEST: "..."` lines inside or around the JSON, or stop mid-object.
+`extract_agent_output` handles all of these for any role in a single
+linear scan that repairs each top-level object while collecting search
+requests, then hands the repaired text to `json.loads`.
+"""
+
+import json
+import re
+from typing import List, Dict, Any, Tuple
+
+SEARCH_MARKER = "SEARCH_REQUEST:"
+
+# Next interesting position at top level, inside a container, and inside a string
+_TOP_LEVEL = re.compile(r"\{|SEARCH_REQUEST:")
+_STRUCTURAL = re.compile(r'[{}\[\]"]|SEARCH_REQUEST:')
+_STRING_SPECIAL = re.compile(r'["\\\x00-\x1f]')
+_WHITESPACE = " \t\r\n"
+_VALID_ESCAPES = set('"\\/bfnrt')
+_HEX = set("0123456789abcdefABCDEF")
+_CONTROL_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t", "\b": "\\b", "\f": "\\f"}
+_VALUE_START = set('"{[]}-0123456789')
+# A raw newline followed by a line that looks like JSON structure (closing
+# bracket or the next key) most likely means the string's closing quote is missing
+_IMPLICIT_CLOSE = re.compile(r'\n\s*(?:[\]}]|"[A-Za-z_][\w ]*"\s*:)')
+
+
+def _skip_whitespace(text: str, pos: int) -> int:
+    n = len(text)
+    while pos < n and text[pos] in _WHITESPACE:
+        pos += 1
+    return pos
+
+
+def _closes_string(text: str, pos: int) -> bool:
+    """Decide whether a quote just before `pos` ends the string or is part of it."""
+    pos = _skip_whitespace(text, pos)
+    if pos >= len(text):
+        return True
+    c = text[pos]
+    if c in ":}]":
+        return True
+    if c != ",":
+        return False
+    # A comma only ends a string if a JSON value follows it
+    pos = _skip_whitespace(text, pos + 1)
+    if pos >= len(text):
+        return True
+    return text[pos] in _VALUE_START or text.startswith(("true", "false", "null", SEARCH_MARKER), pos)
+
+
+def _scan_string(text: str, start: int, implicit_close: bool = False) -> Tuple[str, int, bool]:
+    """
+    Scan a string literal starting at the opening quote.
+
+    With `implicit_close`, a raw newline followed by JSON structure ends
+    the string and a string holding an unescaped object is re-serialized
+    (used when the regular scan did not yield valid JSON).
+
+    Returns:
+        (repaired literal including quotes, position after it, repaired flag)
+    """
+    n = len(text)
+    if implicit_close and text.startswith("{", start + 1):
+        # A serialized object pasted into a string without escaping: scan it as
+        # JSON and re-serialize it if it is directly followed by the closing quote
+        inner, end, _, cut = _scan_object(text, start + 1, implicit_close)
+        if not cut and text.startswith('"', end):
+            return json.dumps(inner), end + 1, True
+
+    out = ['"']
+    pos = start + 1
+    repaired = False
+
+    while True:
+        m = _STRING_SPECIAL.search(text, pos)
+        if m is None:
+            # Unterminated string (truncated output)
+            out.append(text[pos:])
+            out.append('"')
+            return "".join(out), n, True
+
+        k = m.start()
+        out.append(text[pos:k])
+        c = text[k]
+
+        if c == "\\":
+            nxt = text[k + 1] if k + 1 < n else ""
+            if nxt in _VALID_ESCAPES:
+                out.append(text[k:k + 2])
+                pos = k + 2
+            elif nxt == "u" and len(text) >= k + 6 and all(h in _HEX for h in text[k + 2:k + 6]):
+                out.append(text[k:k + 6])
+                pos = k + 6
+            else:
+                out.append("\\\\")
+                pos = k + 1
+                repaired = True
+        elif c == '"':
+            if _closes_string(text, k + 1):
+                out.append('"')
+                return "".join(out), k + 1, repaired
+            out.append('\\"')
+            pos = k + 1
+            repaired = True
+        elif implicit_close and c == "\n" and _IMPLICIT_CLOSE.match(text, k):
+            out.append('"')
+            return "".join(out), k, True
+        else:
+            out.append(_CONTROL_ESCAPES.get(c, "\\u%04x" % ord(c)))
+            pos = k + 1
+            repaired = True
+
+
+def _strip_trailing_comma(out: List[str]) -> bool:
+    """Remove a dangling comma before a closing bracket; True if one was removed."""
+    for idx in range(len(out) - 1, -1, -1):
+        stripped = out[idx].rstrip(_WHITESPACE)
+        if not stripped:
+            continue
+        if stripped.endswith(","):
+            out[idx] = stripped[:-1]
+            return True
+        return False
+    return False
+
+
+def _scan_object(text: str, start: int, implicit_close: bool = False) -> Tuple[str, int, bool, bool]:
+    """
+    Scan a top-level object starting at `{`, repairing it on the way.
+
+    Returns:
+        (repaired object text, position after it, repaired flag, truncated flag)
+    """
+    n = len(text)
+    out: List[str] = []
+    stack: List[str] = []
+    pos = start
+    segment = start
+    repaired = False
+
+    while pos < n:
+        m = _STRUCTURAL.search(text, pos)
+        if m is None:
+            break
+        j = m.start()
+        token = m.group()
+
+        if token == '"':
+            out.append(text[segment:j])
+            literal, pos, fixed = _scan_string(text, j, implicit_close)
+            out.append(literal)
+            segment = pos
+            repaired |= fixed
+            continue
+
+        if token == "{" or token == "[":
+            stack.append("}" if token == "{" else "]")
+        elif token == "}" or token == "]":
+            out.append(text[segment:j])
+            repaired |= _strip_trailing_comma(out)
+            if stack[-1] != token:
+                repaired = True
+            out.append(stack.pop())
+            segment = j + 1
+            if not stack:
+                return "".join(out), j + 1, repaired, False
+        else:
+            # Bare SEARCH_REQUEST: marker inside the JSON; keep the quoted query that follows
+            out.append(text[segment:j])
+            segment = m.end()
+            repaired = True
+        pos = m.end()
+
+    # Truncated: close whatever is still open
+    out.append(text[segment:n])
+    _strip_trailing_comma(out)
+    out.extend(reversed(stack))
+    return "".join(out), n, True, True
+
+
+def clean_search_query(query: Any) -> str:
+    """Normalize a search request (strip marker, quotes and trailing punctuation)."""
+    query = str(query).strip()
+    if query.startswith(SEARCH_MARKER):
+        query = query[len(SEARCH_MARKER):]
+    return query.strip().strip(",").strip().strip('"').strip()
+
+
+def scan_response(response: str) -> Dict[str, Any]:
+    """
+    Single pass over a raw model response.
+
+    Returns:
+        Dict with "objects" ((start offset, repaired JSON text) of each top-level object),
+        "search_requests" (queries from SEARCH_REQUEST lines outside objects),
+        "repaired", "truncated" and "extra_text" flags
+    """
+    n = len(response)
+    objects = []
+    search_requests = []
+    repaired = False
+    truncated = False
+    extra_text = False
+    pos = 0
+
+    while pos < n:
+        m = _TOP_LEVEL.search(response, pos)
+        if m is None:
+            extra_text |= bool(response[pos:].strip())
+            break
+        extra_text |= bool(response[pos:m.start()].strip())
+
+        if m.group() == "{":
+            obj_text, pos, fixed, cut = _scan_object(response, m.start())
+            objects.append((m.start(), obj_text))
+            repaired |= fixed
+            truncated |= cut
+        else:
+            end = response.find("\n", m.end())
+            end = n if end == -1 else end
+            query = clean_search_query(response[m.end():end])
+            if query:
+                search_requests.append(query)
+            extra_text = True
+            pos = end
+
+    return {
+        "objects": objects,
+        "search_requests": search_requests,
+        "repaired": repaired,
+        "truncated": truncated,
+        "extra_text": extra_text
+    }
+
+
+def _dedupe(values: List[Any]) -> List[Any]:
+    seen = set()
+    unique = []
+    for value in values:
+        key = json.dumps(value, sort_keys=True) if not isinstance(value, str) else value
+        if key not in seen:
+            seen.add(key)
+            unique.append(value)
+    return unique
+
+
+def _load_objects(response: str, scan: Dict[str, Any]) -> List[Dict[str, Any]]:
+    parsed = []
+    for start, obj_text in scan["objects"]:
+        try:
+            value = json.loads(obj_text)
+        except json.JSONDecodeError:
+            # Retry this object assuming missing closing quotes at line ends
+            try:
+                value = json.loads(_scan_object(response, start, implicit_close=True)[0])
+            except json.JSONDecodeError:
+                continue
+        if isinstance(value, dict):
+            parsed.append(value)
+    return parsed
+
+
+def _merge(role: str, objects: List[Dict[str, Any]], extra_requests: List[str]) -> Dict[str, Any]:
+    """Merge several agent objects into one: first object wins, lists are combined."""
+    result = dict(objects[0])
+    result.setdefault("role", role)
+
+    results = [obj["result"] for obj in objects if obj.get("result") not in (None, "")]
+    if len(results) > 1 and all(isinstance(r, str) for r in results):
+        result["result"] = "\n\n".join(_dedupe(results))
+    elif results:
+        result["result"] = results[0]
+    else:
+        result.setdefault("result", "")
+
+    insights = []
+    requests = []
+    for obj in objects:
+        value = obj.get("insights")
+        if isinstance(value, list):
+            insights.extend(value)
+        elif value:
+            insights.append(value)
+        value = obj.get("search_requests")
+        if isinstance(value, list):
+            requests.extend(value)
+        elif isinstance(value, str) and value:
+            requests.append(value)
+
+    result["insights"] = _dedupe(insights)
+    cleaned = [clean_search_query(q) for q in requests + extra_requests]
+    result["search_requests"] = _dedupe([q for q in cleaned if q])
+    return result
+
+
+def extract_agent_output(response: str, role: str, _depth: int = 0) -> Dict[str, Any]:
+    """
+    Extract an agent's JSON output from a raw model response.
+
+    Well-formed JSON is parsed directly. Anything else goes through one
+    tolerant scan: each top-level object is repaired (unescaped quotes and
+    control characters, stray SEARCH_REQUEST markers, trailing commas,
+    truncation), all objects are merged, and SEARCH_REQUEST lines outside
+    the JSON are collected. A `result` that is itself a serialized agent
+    object is unwrapped.
+
+    Args:
+        response: Raw model output
+        role: Agent role (used when the output does not name one)
+
+    Returns:
+        Dict with at least role, result, insights and search_requests.
+        Recovered outputs also carry parsing_error=True and an
+        extraction_method of "extracted", "repaired", "merged",
+        "truncated" or "raw_text".
+    """
+    try:
+        value = json.loads(response)
+        if isinstance(value, dict):
+            result = _merge(role, [value], [])
+            return _unwrap_nested(result, role, _depth)
+    except (json.JSONDecodeError, TypeError):
+        pass
+
+    scan = scan_response(response or "")
+    objects = _load_objects(response or "", scan)
+
+    if not objects:
+        # No usable JSON at all: keep the text itself as the result
+        return {
+            "role": role,
+            "result": response,
+            "insights": [],
+            "search_requests": _dedupe(scan["search_requests"]),
+            "parsing_error": True,
+            "extraction_method": "raw_text"
+        }
+
+    result = _merge(role, objects, scan["search_requests"])
+    if scan["truncated"]:
+        method = "truncated"
+    elif len(objects) > 1:
+        method = "merged"
+    elif scan["repaired"]:
+        method = "repaired"
+    else:
+        method = "extracted"
+
+    result["parsing_error"] = True
+    result["extraction_method"] = method
+    return _unwrap_nested(result, role, _depth)
+
+
+def _unwrap_nested(result: Dict[str, Any], role: str, depth: int) -> Dict[str, Any]:
+    """Replace a `result` holding a serialized agent object by that object's content."""
+    inner = result.get("result")
+    if depth > 0 or not isinstance(inner, str) or not inner.lstrip().startswith("{") or '"result"' not in inner:
+        return result
+
+    nested = extract_agent_output(inner, role, _depth=depth + 1)
+    if nested.get("extraction_method") == "raw_text":
+        return result
+
+    result["result"] = nested.get("result", "")
+    result["insights"] = _dedupe(result.get("insights", []) + nested.get("insights", []))
+    result["search_requests"] = _dedupe(result.get("search_requests", []) + nested.get("search_requests", []))
+    result["parsing_error"] = True
+    result.setdefault("extraction_method", "nested")
+    return result
+
+
+_STREAM_KEY = '"search_requests"'
+_STREAM_TOKENS = re.compile(r'"search_requests"|SEARCH_REQUEST:')
+_STREAM_HOLD = max(len(_STREAM_KEY), len(SEARCH_MARKER)) - 1
+
+
+class SearchRequestStream:
+    """
+    Incremental recognizer of search requests in a streamed model response.
+
+    Feed response fragments as they arrive; every `search_requests` array
+    entry and every `SEARCH_REQUEST:` line is returned by `feed` as soon as
+    it is complete, so searches can start before generation finishes.
+    Text is dropped from the buffer once it has been scanned, so only an
+    unfinished entry or line is carried over and the work per fragment is
+    proportional to the fragment size.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.line_scanned = 0  # buffer offset up to which a pending line has no newline
+        self.state = "scan"  # scan | key | array | line
+        self.seen = set()
+
+    def _emit(self, raw: str, found: List[str]):
+        query = clean_search_query(raw)
+        if query and query not in self.seen:
+            self.seen.add(query)
+            found.append(query)
+
+    def _read_string(self, start: int) -> Tuple[Any, int]:
+        """Read a quoted entry; returns (value or None if incomplete, position after it)."""
+        text = self.buffer
+        k = start + 1
+        while True:
+            k = text.find('"', k)
+            if k == -1:
+                return None, start
+            backslashes = 0
+            while text[k - 1 - backslashes] == "\\":
+                backslashes += 1
+            if backslashes % 2 == 0:
+                # Only accept the quote once the following character shows it closes the entry
+                nxt = _skip_whitespace(text, k + 1)
+                if nxt >= len(text):
+                    return None, start
+                if text[nxt] in ",]\n" or text[k + 1:nxt].count("\n"):
+                    break
+            k += 1
+        literal = text[start:k + 1]
+        try:
+            return json.loads(literal), k + 1
+        except json.JSONDecodeError:
+            return literal[1:-1], k + 1
+
+    def feed(self, fragment: str) -> List[str]:
+        """
+        Consume the next response fragment.
+
+        Returns:
+            Search queries completed by this fragment (each reported once)
+        """
+        self.buffer += fragment
+        found: List[str] = []
+        text = self.buffer
+
+        while self.pos < len(text):
+            if self.state == "scan":
+                m = _STREAM_TOKENS.search(text, self.pos)
+                if m is None:
+                    # Keep a tail that could be the start of a split token
+                    self.pos = max(self.pos, len(text) - _STREAM_HOLD)
+                    break
+                self.pos = m.end()
+                self.state = "key" if m.group() == _STREAM_KEY else "line"
+
+            elif self.state == "key":
+                k = _skip_whitespace(text, self.pos)
+                if k < len(text) and text[k] == ":":
+                    k = _skip_whitespace(text, k + 1)
+                if k >= len(text):
+                    break
+                if text[k] == "[":
+                    self.pos = k + 1
+                    self.state = "array"
+                else:
+                    self.pos = k
+                    self.state = "scan"
+
+            elif self.state == "array":
+                k = _skip_whitespace(text, self.pos)
+                if k >= len(text):
+                    self.pos = k
+                    break
+                c = text[k]
+                if c == ",":
+                    self.pos = k + 1
+                elif c == "]":
+                    self.pos = k + 1
+                    self.state = "scan"
+                elif c == '"':
+                    value, end = self._read_string(k)
+                    if value is None:
+                        self.pos = k
+                        break
+                    if isinstance(value, str):
+                        self._emit(value, found)
+                    self.pos = end
+                elif text.startswith(SEARCH_MARKER, k):
+                    self.pos = k + len(SEARCH_MARKER)
+                elif SEARCH_MARKER.startswith(text[k:]):
+                    self.pos = k
+                    break
+                else:
+                    # Not a list of strings after all
+                    self.pos = k
+                    self.state = "scan"
+
+            else:  # line
+                end = text.find("\n", max(self.pos, self.line_scanned))
+                if end == -1:
+                    self.line_scanned = len(text)
+                    break
+                self._emit(text[self.pos:end], found)
+                self.pos = end
+                self.line_scanned = 0
+                self.state = "scan"
+
+        # Drop the scanned prefix so the next fragment is not appended to the whole response
+        self.buffer = text[self.pos:]
+        self.line_scanned = max(0, self.line_scanned - self.pos)
+        self.pos = 0
+        return found
+
+    def finish(self) -> List[str]:
+        """Flush a trailing `SEARCH_REQUEST:` line at the end of the stream."""
+        found: List[str] = []
+        if self.state == "line":
+            self._emit(self.buffer[self.pos:], found)
+            self.pos = len(self.buffer)
+            self.state = "scan"
+        return found
@@ -0,0 +1,165 @@
+"""
+Token-bucket rate limiting for web search requests.
+
+Each engine group (the set of upstream engines a SearXNG query fans out
+to) has its own bucket. Callers that cannot get a token immediately wait
+in a priority queue; when the queue is full new requests are rejected so
+callers can fall back instead of piling up behind timeouts.
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Dict, Any, List
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a rate-limit queue is full."""
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at `rate` tokens per second."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self) -> bool:
+        """Take a token if one is available."""
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def time_until_token(self) -> float:
+        """Seconds until a token becomes available (0 if one is available now)."""
+        self._refill()
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def penalize(self, seconds: float):
+        """Drain the bucket so no token is issued for `seconds` (e.g. after HTTP 429)."""
+        self._refill()
+        self.tokens = min(self.tokens, 0.0) - seconds * self.rate
+
+
+class _Group:
+    def __init__(self, rate: float, burst: int):
+        self.bucket = TokenBucket(rate, burst)
+        self.heap: List = []
+        self.dispatcher = None
+        self.metrics = {
+            "requests": 0,
+            "waited": 0,
+            "rejected": 0,
+            "throttled": 0,
+            "total_wait": 0.0,
+            "max_wait": 0.0
+        }
+
+
+class SearchRateLimiter:
+    """Per-engine-group token buckets with a bounded priority wait queue."""
+
+    def __init__(self, rate: float = 1.0, burst: int = 3, max_queue: int = 20, priorities: Dict[str, int] = None):
+        """
+        Initialize the rate limiter.
+
+        Args:
+            rate: Sustained requests per second per engine group
+            burst: Requests allowed back-to-back before throttling starts
+            max_queue: Maximum waiting requests per group before rejecting
+            priorities: Role -> priority (lower is served first)
+        """
+        self.rate = rate
+        self.burst = burst
+        self.max_queue = max_queue
+        self.priorities = priorities or {}
+        self._groups: Dict[str, _Group] = {}
+        self._seq = itertools.count()
+
+    def _group(self, name: str) -> _Group:
+        if name not in self._groups:
+            self._groups[name] = _Group(self.rate, self.burst)
+        return self._groups[name]
+
+    def priority_for(self, role: str = None) -> int:
+        """Priority of a role; unknown roles queue after all known ones."""
+        return self.priorities.get(role, len(self.priorities))
+
+    async def acquire(self, group: str, role: str = None) -> float:
+        """
+        Wait for a token of the given engine group.
+
+        Args:
+            group: Engine group name
+            role: Requesting agent role (determines queue priority)
+
+        Returns:
+            Seconds spent waiting
+
+        Raises:
+            RateLimitExceeded: If the group's wait queue is full
+        """
+        g = self._group(group)
+        g.metrics["requests"] += 1
+
+        if not g.heap and g.bucket.try_take():
+            return 0.0
+
+        if len(g.heap) >= self.max_queue:
+            g.metrics["rejected"] += 1
+            raise RateLimitExceeded(f"Search queue for '{group}' is full ({self.max_queue} waiting)")
+
+        start = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(g.heap, (self.priority_for(role), next(self._seq), future))
+        if g.dispatcher is None or g.dispatcher.done():
+            g.dispatcher = asyncio.ensure_future(self._dispatch(g))
+
+        await future
+
+        waited = time.monotonic() - start
+        g.metrics["waited"] += 1
+        g.metrics["total_wait"] += waited
+        g.metrics["max_wait"] = max(g.metrics["max_wait"], waited)
+        return waited
+
+    async def _dispatch(self, g: _Group):
+        """Hand out tokens to queued waiters in priority order as they refill."""
+        while g.heap:
+            wait = g.bucket.time_until_token()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            _, _, future = heapq.heappop(g.heap)
+            if future.done():  # Waiter was cancelled
+                continue
+            g.bucket.try_take()
+            future.set_result(None)
+
+    def penalize(self, group: str, seconds: float):
+        """Back off a group after the upstream signalled throttling."""
+        g = self._group(group)
+        g.metrics["throttled"] += 1
+        g.bucket.penalize(seconds)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Per-group metrics including current queue depth and the average wait of queued requests."""
+        stats = {}
+        for name, g in self._groups.items():
+            m = dict(g.metrics)
+            m["queued"] = len(g.heap)
+            m["avg_wait"] = m["total_wait"] / m["waited"] if m["waited"] else 0.0
+            stats[name] = m
+        return stats
@@ -0,0 +1,195 @@
+"""
+Local full-text index of previously retrieved web search results.
+
+Every SearXNG hit (title, snippet, url, query, timestamp) is appended to a
+SQLite FTS5 table so repeat topics can be answered with BM25 ranking in
+well under a millisecond, and runs can continue when SearXNG is down.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import List, Dict, Any, Optional
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL DEFAULT '',
+    snippet TEXT NOT NULL DEFAULT '',
+    query TEXT NOT NULL DEFAULT '',
+    ts REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_ts ON results(ts);
+CREATE VIRTUAL TABLE IF NOT EXISTS results_fts USING fts5(
+    title, snippet, query,
+    content='results', content_rowid='id',
+    tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS results_ai AFTER INSERT ON results BEGIN
+    INSERT INTO results_fts(rowid, title, snippet, query)
+    VALUES (new.id, new.title, new.snippet, new.query);
+END;
+CREATE TRIGGER IF NOT EXISTS results_ad AFTER DELETE ON results BEGIN
+    INSERT INTO results_fts(results_fts, rowid, title, snippet, query)
+    VALUES ('delete', old.id, old.title, old.snippet, old.query);
+END;
+CREATE TRIGGER IF NOT EXISTS results_au AFTER UPDATE ON results BEGIN
+    INSERT INTO results_fts(results_fts, rowid, title, snippet, query)
+    VALUES ('delete', old.id, old.title, old.snippet, old.query);
+    INSERT INTO results_fts(rowid, title, snippet, query)
+    VALUES (new.id, new.title, new.snippet, new.query);
+END;
+"""
+
+
+def _query_terms(query: str) -> List[str]:
+    """Distinct lower-cased terms of a free-text query."""
+    return list(dict.fromkeys(t for t in _TOKEN.findall(query.lower()) if len(t) > 1))
+
+
+def _match_expression(query: str) -> Optional[str]:
+    """Turn free text into an FTS5 OR-query of quoted terms (BM25 ranks by overlap)."""
+    terms = _query_terms(query)
+    if not terms:
+        return None
+    return " OR ".join(f'"{t}"' for t in terms)
+
+
+class SearchIndex:
+    """BM25 full-text index over search results backed by SQLite FTS5."""
+
+    def __init__(self, path: str):
+        """
+        Open (or create) the index.
+
+        Args:
+            path: SQLite database file, or ":memory:"
+        """
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def add_results(self, query: str, items: List[Dict[str, Any]], timestamp: float = None) -> int:
+        """
+        Append search result items, refreshing entries whose URL is already indexed.
+
+        Args:
+            query: Query that produced the items
+            items: Dicts with title, snippet and url
+            timestamp: Retrieval time (epoch seconds, defaults to now)
+
+        Returns:
+            Number of items written
+        """
+        ts = timestamp if timestamp is not None else time.time()
+        rows = [
+            (item["url"], item.get("title", ""), item.get("snippet", ""), query, ts)
+            for item in items if item.get("url")
+        ]
+        if not rows:
+            return 0
+
+        with self._lock, self._conn:
+            self._conn.executemany(
+                """
+                INSERT INTO results (url, title, snippet, query, ts) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    title = excluded.title,
+                    snippet = excluded.snippet,
+                    query = excluded.query,
+                    ts = excluded.ts
+                """,
+                rows
+            )
+        return len(rows)
+
+    def search(
+        self,
+        query: str,
+        limit: int = 5,
+        max_age: float = None,
+        min_coverage: float = 0.0
+    ) -> List[Dict[str, Any]]:
+        """
+        Rank indexed results against a query with BM25.
+
+        The OR-query matches any entry sharing a single term with the query;
+        `min_coverage` keeps only entries that contain at least that
+        fraction of the query's terms (stemmed as by the index).
+
+        Args:
+            query: Free-text query
+            limit: Maximum number of results
+            max_age: Only return results retrieved within this many seconds
+            min_coverage: Minimum fraction of query terms an entry must contain
+
+        Returns:
+            List of dicts with title, snippet, url, query, timestamp, score
+            (lower score is a better match) and coverage
+        """
+        expression = _match_expression(query)
+        if expression is None:
+            return []
+        terms = _query_terms(query)
+
+        sql = """
+            SELECT r.id, r.title, r.snippet, r.url, r.query, r.ts, bm25(results_fts, 4.0, 1.0, 2.0) AS score
+            FROM results_fts JOIN results r ON r.id = results_fts.rowid
+            WHERE results_fts MATCH ?
+        """
+        params: List[Any] = [expression]
+        if max_age is not None:
+            sql += " AND r.ts >= ?"
+            params.append(time.time() - max_age)
+        sql += " ORDER BY score LIMIT ?"
+        # Look further down the ranking when low-coverage entries are dropped
+        params.append(limit if min_coverage <= 0 else limit * 4)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+            matched = self._term_matches([row[0] for row in rows], terms)
+
+        hits = []
+        for rowid, title, snippet, url, q, ts, score in rows:
+            coverage = matched.get(rowid, 0) / len(terms)
+            if coverage < min_coverage:
+                continue
+            hits.append({
+                "title": title, "snippet": snippet, "url": url, "query": q,
+                "timestamp": ts, "score": score, "coverage": coverage
+            })
+        return hits[:limit]
+
+    def _term_matches(self, rowids: List[int], terms: List[str]) -> Dict[int, int]:
+        """Number of query terms each of the given entries contains."""
+        if not rowids:
+            return {}
+        counts: Dict[int, int] = {}
+        placeholders = ",".join("?" * len(rowids))
+        for term in terms:
+            for (rowid,) in self._conn.execute(
+                f"SELECT rowid FROM results_fts WHERE results_fts MATCH ? AND rowid IN ({placeholders})",
+                [f'"{term}"', *rowids]
+            ):
+                counts[rowid] = counts.get(rowid, 0) + 1
+        return counts
+
+    def count(self) -> int:
+        """Return the number of indexed results."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
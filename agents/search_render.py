@@ -0,0 +1,102 @@
+"""
+Compact rendering of web search results for follow-up prompts.
+"""
+
+import re
+from typing import List, Dict, Any
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token for English text)."""
+    return (len(text) + 3) // 4
+
+
+def _clean(text: Any, max_chars: int) -> str:
+    text = _WHITESPACE.sub(" ", str(text or "")).strip()
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars].rsplit(" ", 1)[0]
+    return (cut or text[:max_chars]) + "…"
+
+
+def extract_search_item(result: Dict[str, Any]) -> Dict[str, str]:
+    """Keep only the title/snippet/url triple of a raw SearXNG result."""
+    return {
+        "title": _clean(result.get("title", ""), 200),
+        "snippet": _clean(result.get("content", ""), 500),
+        "url": result.get("url", "")
+    }
+
+
+def _items_for(search_result: Dict[str, Any]) -> List[Dict[str, str]]:
+    if search_result.get("items"):
+        return search_result["items"]
+    # Results produced before items were captured only carry URLs
+    return [{"title": "", "snippet": "", "url": url} for url in search_result.get("urls", [])]
+
+
+def render_search_results(
+        search_results: List[Dict[str, Any]],
+        token_budget: int = 1500,
+        snippet_chars: int = 300,
+        excerpt_chars: int = 1200) -> str:
+    """
+    Render search results as a compact, deduplicated list within a token budget.
+
+    Results are interleaved by rank across queries so that the top hits of
+    every query make it in before lower-ranked ones, and a URL returned by
+    several queries is listed once.
+
+    Args:
+        search_results: Result dicts as returned by `web_search`
+        token_budget: Approximate maximum number of tokens to emit
+        snippet_chars: Maximum characters kept per snippet
+        excerpt_chars: Maximum characters kept per fetched page excerpt
+
+    Returns:
+        Plain-text block suitable for embedding in a prompt
+    """
+    queries = [r.get("query", "") for r in search_results if r.get("query")]
+    header = "Queries: " + "; ".join(queries) if queries else "Search results"
+    errors = [f"(search for \"{r.get('query', '')}\" failed: {r['error']})"
+              for r in search_results if r.get("error")]
+
+    ranked = [_items_for(r) for r in search_results]
+    interleaved = []
+    for rank in range(max((len(items) for items in ranked), default=0)):
+        for items in ranked:
+            if rank < len(items):
+                interleaved.append(items[rank])
+
+    lines = [header] + errors
+    used = estimate_tokens("\n".join(lines))
+    seen = set()
+    count = 0
+
+    for item in interleaved:
+        url = item.get("url", "")
+        if not url or url in seen:
+            continue
+        seen.add(url)
+
+        entry = f"[{count + 1}] {item.get('title') or url}\n{url}"
+        if item.get("excerpt"):
+            snippet = _clean(item["excerpt"], excerpt_chars)
+        else:
+            snippet = _clean(item.get("snippet", ""), snippet_chars)
+        if snippet:
+            entry += f"\n{snippet}"
+
+        cost = estimate_tokens(entry) + 1
+        if used + cost > token_budget:
+            break
+        lines.append(entry)
+        used += cost
+        count += 1
+
+    if count == 0 and not errors:
+        lines.append("No results found." if not seen else "(results omitted: token budget exhausted)")
+
+    return "\n".join(lines)
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Benchmark for agent output parsing built from the runs stored in exports/.
+
+Two corpora are measured:
+
+- real: responses as they were recorded (results that failed to parse
+  still hold the raw model output)
+- synthetic: cleanly parsed agent outputs re-serialized and damaged the way
+  models damage them (truncation, trailing text, unescaped quotes, several
+  objects, ...), so the expected content is known
+
+Every strategy reports its success rate (usable object returned), its
+exact-content rate on the synthetic corpus and its throughput.
+
+Usage: python bench_parsing.py [rounds] [variants per object]
+"""
+
+import asyncio
+import contextlib
+import glob
+import importlib.util
+import json
+import os
+import random
+import sys
+import time
+from typing import List, Dict, Any, Tuple, Callable, Optional
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from agents.parsing import extract_agent_output
+
+
+# ======================
+# CORPUS
+# ======================
+def _load_results(export_dir: str) -> List[Dict[str, Any]]:
+    results = []
+    for path in sorted(glob.glob(os.path.join(export_dir, "*.json"))):
+        with open(path, "r", encoding="utf-8") as f:
+            results.extend(json.load(f).get("results", []))
+    return results
+
+
+def harvest_responses(export_dir: str = "exports") -> List[Tuple[str, str]]:
+    """
+    Collect raw agent responses from exported runs.
+
+    Results that failed to parse still hold the raw model output in
+    "result"; parsed results are re-serialized as the model returned them.
+    """
+    responses = []
+    for entry in _load_results(export_dir):
+        role = entry.get("role", "unknown")
+        if entry.get("parsing_error") and isinstance(entry.get("result"), str):
+            if entry["result"].strip(" ."):  # Skip empty placeholders
+                responses.append((role, entry["result"]))
+        else:
+            responses.append((role, json.dumps(agent_object(entry), indent=2)))
+    return responses
+
+
+def agent_object(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """The part of an exported result the model itself produced."""
+    return {
+        "role": entry.get("role"),
+        "result": entry.get("result", ""),
+        "insights": entry.get("insights", []),
+        "search_requests": entry.get("search_requests", [])
+    }
+
+
+def harvest_objects(export_dir: str = "exports") -> List[Dict[str, Any]]:
+    """Cleanly parsed agent outputs with a text result (ground truth for mutations)."""
+    return [
+        agent_object(entry) for entry in _load_results(export_dir)
+        if not entry.get("parsing_error") and isinstance(entry.get("result"), str) and entry["result"].strip()
+    ]
+
+
+# ======================
+# MUTATORS
+# ======================
+def _serialize(obj: Dict[str, Any]) -> str:
+    return json.dumps(obj, indent=2, ensure_ascii=False)
+
+
+def mutate_clean(obj: Dict[str, Any], rng: random.Random) -> str:
+    return _serialize(obj)
+
+
+def mutate_prose(obj: Dict[str, Any], rng: random.Random) -> str:
+    """Prose before the JSON, as in "Here's my output in JSON format:"."""
+    intro = rng.choice([
+        "Here's my output in JSON format:\n\n",
+        f"As a {obj['role']}, I've completed the analysis. Here is the result:\n\n",
+        "```json\n",
+    ])
+    outro = "\n```" if intro.startswith("```") else ""
+    return intro + _serialize(obj) + outro
+
+
+def mutate_trailing(obj: Dict[str, Any], rng: random.Random) -> str:
+    """SEARCH_REQUEST lines and commentary after the object."""
+    tail = rng.choice([
+        '\nSEARCH_REQUEST: "market size {role} 2024"',
+        '\n\nSEARCH_REQUEST: "competitor pricing"\nSEARCH_REQUEST: "industry trends"',
+        "\n\nLet me know if you need any further details!",
+    ])
+    return _serialize(obj) + tail.format(role=obj["role"])
+
+
+def mutate_unescaped(obj: Dict[str, Any], rng: random.Random) -> str:
+    """Quotes and newlines inside the result left unescaped."""
+    words = obj["result"].split(" ")
+    k = rng.randrange(len(words))
+    words[k] = f'"{words[k]}"'
+    raw_result = " ".join(words).replace("\n\n", "\n")
+    placeholder = "\x00RESULT\x00"
+    text = _serialize({**obj, "result": placeholder})
+    return text.replace(json.dumps(placeholder), '"' + raw_result + '"')
+
+
+def mutate_truncated(obj: Dict[str, Any], rng: random.Random) -> str:
+    """Generation stopped somewhere in the second half of the object."""
+    text = _serialize(obj)
+    return text[:int(len(text) * rng.uniform(0.5, 0.95))]
+
+
+def mutate_multiple(obj: Dict[str, Any], rng: random.Random) -> str:
+    """The answer split over two objects (second one adds insights)."""
+    first = {**obj, "insights": obj["insights"][:1]}
+    second = {**obj, "insights": obj["insights"][1:] or ["Additional insight"]}
+    return _serialize(first) + "\n\n" + _serialize(second)
+
+
+MUTATORS: Dict[str, Callable[[Dict[str, Any], random.Random], str]] = {
+    "clean": mutate_clean,
+    "prose": mutate_prose,
+    "trailing": mutate_trailing,
+    "unescaped": mutate_unescaped,
+    "truncated": mutate_truncated,
+    "multiple": mutate_multiple,
+}
+
+
+def build_synthetic_corpus(objects: List[Dict[str, Any]], variants: int = 3, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    Damage every object with every mutator.
+
+    Returns:
+        List of dicts with mutation, role, text and the expected object
+    """
+    rng = random.Random(seed)
+    corpus = []
+    for obj in objects:
+        for name, mutate in MUTATORS.items():
+            for _ in range(1 if name == "clean" else variants):
+                corpus.append({"mutation": name, "role": obj["role"], "text": mutate(obj, rng), "expected": obj})
+    return corpus
+
+
+def content_matches(parsed: Dict[str, Any], case: Dict[str, Any]) -> bool:
+    """Whether the parsed result text is what the model meant to say."""
+    expected = case["expected"]["result"]
+    got = parsed.get("result")
+    if not isinstance(got, str):
+        return False
+    if case["mutation"] == "truncated":
+        return bool(got) and expected.startswith(got)
+    if case["mutation"] == "unescaped":
+        return got.replace("\n\n", "\n").replace('"', "") == expected.replace("\n\n", "\n").replace('"', "")
+    return got == expected
+
+
+# ======================
+# STRATEGIES
+# ======================
+# The baseline agents/engine.py, unmodified (`git show fae668b:agents/engine.py`)
+LEGACY_ENGINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "legacy_engine.py")
+_legacy = {}
+
+
+def _legacy_engine():
+    """Load the baseline engine once, with its model, search and memory calls stubbed out."""
+    if not _legacy:
+        spec = importlib.util.spec_from_file_location("legacy_engine", LEGACY_ENGINE_PATH)
+        engine = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(engine)
+
+        async def first_call(session, prompt):
+            return _legacy["response"]
+
+        async def no_call(*args, **kwargs):
+            return ""
+
+        engine.enhanced_call_ollama_with_tools = first_call
+        engine.call_ollama = no_call  # Follow-up answers never parse; the first result is kept
+        engine.web_search = no_call
+        engine.build_subagent_prompt = lambda *args, **kwargs: ""
+        _legacy.update(engine=engine, loop=asyncio.new_event_loop(), devnull=open(os.devnull, "w"))
+    return _legacy["engine"]
+
+
+def legacy_parse(response: str, role: str) -> Optional[Dict[str, Any]]:
+    """
+    The baseline run_subagent, fed the response instead of a model call.
+
+    Its role-specific recovery runs as it did (log lines included, sent to
+    /dev/null); the raw-text fallback and empty responses count as
+    failures, placeholder results (see `is_legacy_placeholder`) as successes.
+    """
+    engine = _legacy_engine()
+    _legacy["response"] = response
+    with contextlib.redirect_stdout(_legacy["devnull"]):
+        result = _legacy["loop"].run_until_complete(engine.run_subagent(None, role, "", {}))
+    if not response.strip() or not isinstance(result, dict):
+        return None
+    if result.get("parsing_error") and result.get("result") == response:
+        return None
+    return result
+
+
+def is_legacy_placeholder(parsed: Dict[str, Any]) -> bool:
+    """Whether a legacy researcher consolidation made up its result instead of recovering one."""
+    return bool(parsed.get("consolidated")) and str(parsed.get("result", "")).startswith("Research conducted on ")
+
+
+_decoder = json.JSONDecoder()
+
+
+def first_object_parse(response: str, role: str) -> Optional[Dict[str, Any]]:
+    """Decode the first complete JSON object, ignoring what follows it."""
+    start = response.find("{")
+    while start != -1:
+        try:
+            value, _ = _decoder.raw_decode(response, start)
+            if isinstance(value, dict):
+                return value
+        except json.JSONDecodeError:
+            pass
+        start = response.find("{", start + 1)
+    return None
+
+
+def tolerant_parse(response: str, role: str) -> Optional[Dict[str, Any]]:
+    result = extract_agent_output(response, role)
+    return None if result.get("extraction_method") == "raw_text" else result
+
+
+STRATEGIES: Dict[str, Callable[[str, str], Optional[Dict[str, Any]]]] = {
+    "legacy": legacy_parse,
+    "first_object": first_object_parse,
+    "tolerant": tolerant_parse,
+}
+
+
+# ======================
+# MEASUREMENT
+# ======================
+def measure(parser, cases: List[Dict[str, Any]], rounds: int) -> Dict[str, float]:
+    """Success rate, exact-content rate (when expectations exist) and throughput."""
+    succeeded = 0
+    correct = 0
+    for case in cases:
+        parsed = parser(case["text"], case["role"])
+        if parsed is not None:
+            succeeded += 1
+            if "expected" in case and content_matches(parsed, case):
+                correct += 1
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for case in cases:
+            parser(case["text"], case["role"])
+    elapsed = time.perf_counter() - start
+
+    total_bytes = sum(len(case["text"]) for case in cases) * rounds
+    return {
+        "cases": len(cases),
+        "success": succeeded / len(cases),
+        "correct": correct / len(cases),
+        "parses_per_sec": rounds * len(cases) / elapsed,
+        "mb_per_sec": total_bytes / elapsed / 1e6
+    }
+
+
+def print_row(label: str, strategy: str, stats: Dict[str, float], with_correct: bool):
+    correct = f"{stats['correct']:>8.0%}" if with_correct else f"{'-':>8}"
+    print(f"{label:<12} {strategy:<13} {stats['cases']:>5} {stats['success']:>8.0%} {correct} "
+          f"{stats['parses_per_sec']:>12,.0f} {stats['mb_per_sec']:>8.1f}")
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    variants = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    real = [{"role": role, "text": text} for role, text in harvest_responses()]
+    objects = harvest_objects()
+    if not real:
+        print("❌ No responses found in exports/")
+        return
+    synthetic = build_synthetic_corpus(objects, variants)
+
+    print(f"📊 Corpus: {len(real)} real responses, {len(synthetic)} synthetic variants "
+          f"of {len(objects)} objects, {rounds} rounds\n")
+    print(f"{'corpus':<12} {'strategy':<13} {'cases':>5} {'success':>8} {'correct':>8} {'parses/s':>12} {'MB/s':>8}")
+
+    for name, parser in STRATEGIES.items():
+        print_row("real", name, measure(parser, real, rounds), with_correct=False)
+
+    for mutation in MUTATORS:
+        cases = [case for case in synthetic if case["mutation"] == mutation]
+        for name, parser in STRATEGIES.items():
+            print_row(mutation, name, measure(parser, cases, rounds), with_correct=True)
+
+    print()
+    for name, parser in STRATEGIES.items():
+        print_row("synthetic", name, measure(parser, synthetic, rounds), with_correct=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""Shared test fixtures: local aiohttp servers standing in for Ollama, SearXNG and the memory server."""
+
+import pytest_asyncio
+from aiohttp import web
+
+
+@pytest_asyncio.fixture
+async def serve_app():
+    """
+    Serve aiohttp applications on free localhost ports for the duration of a test.
+
+    Yields an async function taking a `web.Application` and returning its
+    base URL (e.g. "http://127.0.0.1:54321"); every served app is shut
+    down when the test ends.
+    """
+    runners = []
+
+    async def serve(app: web.Application) -> str:
+        runner = web.AppRunner(app)
+        await runner.setup()
+        runners.append(runner)
+        await web.TCPSite(runner, "127.0.0.1", 0).start()
+        host, port = runner.addresses[0][:2]
+        return f"http://{host}:{port}"
+
+    yield serve
+
+    for runner in reversed(runners):
+        await runner.cleanup()
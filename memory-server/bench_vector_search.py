@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Recall-vs-latency benchmark of approximate (IVF) against exact vector search.
+
+The store is filled with clustered synthetic embeddings (real embedding
+sets are clustered by topic; uniform random vectors are the worst case for
+any partitioning index). Queries are fresh points from the same clusters.
+For every nprobe the table shows recall@k against exact search and the
+mean query latency of `SimpleVectorStore.query`.
+
+Usage: python bench_vector_search.py [rows] [dim] [queries]
+"""
+
+import os
+import sys
+import time
+from typing import Dict, List
+
+import numpy as np
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from storage.simple_vector_store import SimpleVectorStore
+
+K = 10
+NPROBES = [1, 2, 4, 8, 16, 32]
+
+
+def clustered_vectors(rows: int, dim: int, clusters: int, rng: np.random.Generator) -> np.ndarray:
+    """Unit vectors scattered around random cluster centers."""
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, rows)
+    points = centers[labels] + rng.normal(scale=3.0, size=(rows, dim)).astype(np.float32)
+    return points / np.linalg.norm(points, axis=1, keepdims=True)
+
+
+def build_store(vectors: np.ndarray) -> SimpleVectorStore:
+    store = SimpleVectorStore(ivf_min_rows=0)
+    ids = [str(i) for i in range(len(vectors))]
+    for start in range(0, len(vectors), 10000):
+        end = start + 10000
+        store.add(ids[start:end], vectors[start:end], [""] * len(ids[start:end]), [{} for _ in ids[start:end]])
+    return store
+
+
+def run_queries(store: SimpleVectorStore, queries: np.ndarray) -> Dict[str, object]:
+    start = time.perf_counter()
+    results = [store.query(query, n_results=K)["ids"][0] for query in queries]
+    return {"ids": results, "ms": (time.perf_counter() - start) / len(queries) * 1000}
+
+
+def recall(approximate: List[List[str]], exact: List[List[str]]) -> float:
+    return float(np.mean([len(set(a) & set(e)) / len(e) for a, e in zip(approximate, exact)]))
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    dim = int(sys.argv[2]) if len(sys.argv) > 2 else 768
+    n_queries = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+
+    rng = np.random.default_rng(0)
+    data = clustered_vectors(rows + n_queries, dim, clusters=64, rng=rng)
+    vectors, queries = data[:rows], data[rows:]
+
+    start = time.perf_counter()
+    store = build_store(vectors)
+    print(f"📊 {rows} x {dim} vectors, {n_queries} queries, recall@{K}")
+    print(f"   insert + IVF training: {time.perf_counter() - start:.1f}s, {len(store._ivf.centroids)} lists\n")
+
+    ivf = store._ivf
+    store._ivf = None
+    exact = run_queries(store, queries)
+    store._ivf = ivf
+
+    print(f"{'search':<14} {'recall':>7} {'ms/query':>9} {'speedup':>8}")
+    print(f"{'exact':<14} {1.0:>7.3f} {exact['ms']:>9.2f} {1.0:>7.1f}x")
+    for nprobe in NPROBES:
+        store.ivf_nprobe = nprobe
+        result = run_queries(store, queries)
+        print(f"{'ivf nprobe=' + str(nprobe):<14} {recall(result['ids'], exact['ids']):>7.3f} "
+              f"{result['ms']:>9.2f} {exact['ms'] / result['ms']:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
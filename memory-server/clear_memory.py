@@ -16,8 +16,17 @@ parent_dir = Path(__file__).parent
 sys.path.insert(0, str(parent_dir))
 
 from storage.simple_vector_store import SimpleVectorStore
+from storage.vector_log import VectorLog
 from config.settings import CHROMA_PERSIST_DIR
 
+STORE_DIR = os.path.join(CHROMA_PERSIST_DIR, "vector_store")
+LEGACY_FILE = os.path.join(CHROMA_PERSIST_DIR, "vector_store.json")
+
+
+def _open_store() -> SimpleVectorStore:
+    """Open the persisted store (migrating a legacy JSON file if present)."""
+    return SimpleVectorStore(persist_dir=STORE_DIR, legacy_file=LEGACY_FILE)
+
 
 def clear_vector_store(confirm: bool = True) -> bool:
     """
@@ -30,10 +39,8 @@ def clear_vector_store(confirm: bool = True) -> bool:
         True if successful, False otherwise
     """
     try:
-        persist_file = os.path.join(CHROMA_PERSIST_DIR, "vector_store.json")
-
         # Initialize store to check current state
-        store = SimpleVectorStore(persist_file=persist_file)
+        store = _open_store()
         count = store.count()
 
         if count == 0:
@@ -47,14 +54,8 @@ def clear_vector_store(confirm: bool = True) -> bool:
                 print("❌ Operation cancelled by user")
                 return False
 
-        # Clear the store by resetting all its data
-        store.vectors = []
-        store.documents = []
-        store.metadatas = []
-        store.ids = []
-
-        # Save empty state
-        store._save_to_file()
+        # Clear the store and save the empty state
+        store.clear()
         print(f"✅ Cleared vector store: {count} entries removed")
         return True
 
@@ -65,7 +66,8 @@ def clear_vector_store(confirm: bool = True) -> bool:
 
 def clear_simple_vector_store(confirm: bool = True) -> bool:
     """
-    Clear the simple vector store persistence file.
+    Delete the simple vector store persistence files (store directory and
+    any legacy JSON file).
 
     Args:
         confirm: Whether to ask for confirmation before clearing
@@ -74,26 +76,29 @@ def clear_simple_vector_store(confirm: bool = True) -> bool:
         True if successful, False otherwise
     """
     try:
-        persist_file = os.path.join(CHROMA_PERSIST_DIR, "vector_store.json")
+        log = VectorLog(STORE_DIR)
+        legacy_files = [f for f in (LEGACY_FILE, LEGACY_FILE + ".migrated") if os.path.exists(f)]
 
-        if not os.path.exists(persist_file):
-            print(f"ℹ️  Simple vector store file does not exist: {persist_file}")
+        if not log.exists() and not legacy_files:
+            print(f"ℹ️  Simple vector store files do not exist: {STORE_DIR}")
             return True
 
         # Get file size for info
-        file_size = os.path.getsize(persist_file)
+        file_size = log.size_bytes() + sum(os.path.getsize(f) for f in legacy_files)
         file_size_kb = file_size / 1024
 
         if confirm:
-            print(f"⚠️  About to delete simple vector store file ({file_size_kb:.1f} KB)")
+            print(f"⚠️  About to delete simple vector store files ({file_size_kb:.1f} KB)")
             response = input("Are you sure? (type 'yes' to confirm): ")
             if response.lower() != 'yes':
                 print("❌ Operation cancelled by user")
                 return False
 
-        # Delete the file
-        os.remove(persist_file)
-        print(f"✅ Deleted simple vector store file: {persist_file}")
+        # Delete the files
+        log.remove()
+        for legacy_file in legacy_files:
+            os.remove(legacy_file)
+        print(f"✅ Deleted simple vector store files: {STORE_DIR}")
         return True
 
     except Exception as e:
@@ -109,17 +114,19 @@ def get_memory_stats() -> dict:
         Dict with memory statistics
     """
     stats = {
-        "vector_store": {"exists": False, "count": 0}
+        "vector_store": {"exists": False, "count": 0, "dimension": None, "model": None}
     }
 
     try:
         # Check vector store
-        persist_file = os.path.join(CHROMA_PERSIST_DIR, "vector_store.json")
-        if os.path.exists(persist_file):
+        if VectorLog(STORE_DIR).exists() or os.path.exists(LEGACY_FILE):
             try:
-                store = SimpleVectorStore(persist_file=persist_file)
+                # Answered from the store manifest without loading any entries
+                store = _open_store()
                 stats["vector_store"]["exists"] = True
                 stats["vector_store"]["count"] = store.count()
+                stats["vector_store"]["dimension"] = store.dimension
+                stats["vector_store"]["model"] = store.model
             except Exception:
                 pass
 
@@ -140,16 +147,16 @@ def show_stats():
     vector_store = stats["vector_store"]
     if vector_store["exists"]:
         print(f"Vector Store: {vector_store['count']} entries")
+        print(f"Dimension: {vector_store['dimension'] or '-'}  Embedding Model: {vector_store['model'] or 'unknown'}")
     else:
         print("Vector Store: Not found")
 
-    persist_file = os.path.join(CHROMA_PERSIST_DIR, "vector_store.json")
-    if os.path.exists(persist_file):
-        file_size = os.path.getsize(persist_file)
-        file_size_kb = file_size / 1024
-        print(f"Vector Store File: {file_size_kb:.1f} KB")
+    log = VectorLog(STORE_DIR)
+    if log.exists():
+        file_size_kb = log.size_bytes() / 1024
+        print(f"Vector Store Files: {file_size_kb:.1f} KB")
     else:
-        print("Vector Store File: Not found")
+        print("Vector Store Files: Not found")
 
     print(f"\nTotal Memory Entries: {vector_store['count']}")
 
@@ -12,7 +12,33 @@ MEMORY_SERVER_URL = os.getenv("MEMORY_SERVER_URL", "http://localhost:8000")
 _project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 CHROMA_PERSIST_DIR = os.getenv("CHROMA_PERSIST_DIR", os.path.join(_project_root, "storage", "vector_memory"))
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "nomic-embed-text")
+# "ollama" calls the Ollama API; "local" embeds in-process (hashed n-grams, no service needed)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "ollama")
+LOCAL_EMBEDDING_DIM = int(os.getenv("LOCAL_EMBEDDING_DIM", "768"))
 OLLAMA_EMBEDDING_URL = os.getenv("OLLAMA_EMBEDDING_URL", "http://localhost:11434/api/embeddings")
+# Batched embedding endpoint (list input); older Ollama versions fall back to single calls
+OLLAMA_EMBED_BATCH_URL = os.getenv("OLLAMA_EMBED_BATCH_URL", OLLAMA_EMBEDDING_URL.replace("/api/embeddings", "/api/embed"))
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+EMBEDDING_CONCURRENCY = int(os.getenv("EMBEDDING_CONCURRENCY", "4"))
+# Window in which concurrent embed requests are merged into one batch
+EMBEDDING_BATCH_WINDOW_MS = float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", "5"))
+# Persistent embedding cache keyed by (model, sha256(text)); set EMBEDDING_CACHE=false to disable
+EMBEDDING_CACHE = os.getenv("EMBEDDING_CACHE", "true").lower() in ("1", "true", "yes")
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", os.path.join(CHROMA_PERSIST_DIR, "embedding_cache.sqlite3"))
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "50000"))
+# Long texts are embedded as overlapping chunks; search scores a memory by its
+# best ("max") or average ("mean") chunk similarity
+CHUNK_CHARS = int(os.getenv("CHUNK_CHARS", "2000"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "200"))
+CHUNK_AGGREGATION = os.getenv("CHUNK_AGGREGATION", "max")
+# Deleted rows are reclaimed once they exceed this fraction of the store
+VECTOR_COMPACT_THRESHOLD = float(os.getenv("VECTOR_COMPACT_THRESHOLD", "0.25"))
+# Approximate search: "ivf" partitions stores of at least IVF_MIN_ROWS vectors
+# into k-means lists and scans IVF_NPROBE of them per query ("none" = always exact)
+VECTOR_INDEX = os.getenv("VECTOR_INDEX", "ivf")
+IVF_MIN_ROWS = int(os.getenv("IVF_MIN_ROWS", "20000"))
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "8"))
+IVF_LISTS = int(os.getenv("IVF_LISTS", "0"))  # 0 = about sqrt(rows)
 OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434/api/generate")
 
 # Server Configuration
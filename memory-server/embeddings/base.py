@@ -0,0 +1,70 @@
+"""Embedder interface and backend selection."""
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List
+
+
+class Embedder(ABC):
+    """
+    Interface of an embedding backend.
+
+    Backends implement `embed_batch`; `embed`, `get_stats` and `close` have
+    defaults. `remote` tells whether calls leave the process (and are worth
+    batching and caching).
+    """
+
+    model: str
+    remote: bool = False
+
+    async def embed(self, text: str) -> List[float]:
+        """
+        Generate embedding for a single text string.
+
+        Args:
+            text: Text to embed
+
+        Returns:
+            List of float values representing the embedding vector
+        """
+        return (await self.embed_batch([text]))[0]
+
+    @abstractmethod
+    async def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        Generate embeddings for multiple texts.
+
+        Args:
+            texts: List of texts to embed
+
+        Returns:
+            List of embedding vectors, in input order
+        """
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Backend statistics (none by default)."""
+        return {}
+
+    async def close(self):
+        """Release backend resources (nothing by default)."""
+
+
+def create_embedder(backend: str = None) -> Embedder:
+    """
+    Create the configured embedding backend.
+
+    Args:
+        backend: "ollama" or "local" (defaults to EMBEDDING_BACKEND; an
+            EMBEDDING_MODEL of "local" also selects the local backend)
+
+    Returns:
+        Embedder instance
+    """
+    from config.settings import EMBEDDING_BACKEND, EMBEDDING_MODEL
+
+    backend = (backend or EMBEDDING_BACKEND).lower()
+    if backend == "local" or EMBEDDING_MODEL.startswith("local"):
+        from embeddings.local_embedder import LocalEmbedder
+        return LocalEmbedder()
+    if backend == "ollama":
+        from embeddings.ollama_embedder import OllamaEmbedder
+        return OllamaEmbedder()
+    raise ValueError(f"Unknown embedding backend: {backend}. Valid backends: ['ollama', 'local']")
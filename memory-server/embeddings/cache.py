@@ -0,0 +1,211 @@
+"""Persistent embedding cache keyed by model and text hash."""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    model TEXT NOT NULL,
+    text_hash BLOB NOT NULL,
+    vector BLOB NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (model, text_hash)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings(last_used);
+"""
+
+
+def text_hash(text: str) -> bytes:
+    """SHA-256 digest of a text (cache key together with the model name)."""
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    """SQLite store of float32 embedding vectors with least-recently-used eviction."""
+
+    def __init__(self, path: str, max_entries: int = 50000):
+        """
+        Open (or create) the cache.
+
+        Args:
+            path: SQLite database file, or ":memory:"
+            max_entries: Entries kept before the least recently used are evicted
+        """
+        self.path = path
+        self.max_entries = max_entries
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        # Row count kept in memory so writes do not scan the table
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, model: str, texts: List[str]) -> Dict[str, List[float]]:
+        """
+        Look up cached vectors.
+
+        Args:
+            model: Embedding model name
+            texts: Texts to look up
+
+        Returns:
+            Dict of text -> vector for the texts found in the cache
+        """
+        keys = {text_hash(text): text for text in texts}
+        found: Dict[str, List[float]] = {}
+        if not keys:
+            return found
+
+        hashes = list(keys)
+        with self._lock:
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? "
+                    f"AND text_hash IN ({','.join('?' * len(chunk))})",
+                    [model, *chunk]
+                ).fetchall()
+                for digest, blob in rows:
+                    found[keys[digest]] = np.frombuffer(blob, dtype=np.float32).tolist()
+
+            if found:
+                now = time.time()
+                with self._conn:
+                    self._conn.executemany(
+                        "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                        [(now, model, text_hash(text)) for text in found]
+                    )
+
+        self.hits += sum(1 for text in texts if text in found)
+        self.misses += sum(1 for text in texts if text not in found)
+        return found
+
+    def put_many(self, model: str, texts: List[str], vectors: List[List[float]]) -> None:
+        """Store vectors for texts, evicting the least recently used entries beyond max_entries."""
+        if not texts:
+            return
+        now = time.time()
+        rows = [
+            (model, text_hash(text), np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for text, vector in zip(texts, vectors)
+        ]
+        with self._lock, self._conn:
+            # New keys are inserted (and counted); keys already cached are refreshed
+            added = self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (model, text_hash, vector, last_used) VALUES (?, ?, ?, ?)",
+                rows
+            ).rowcount
+            if added < len(rows):
+                self._conn.executemany(
+                    "UPDATE embeddings SET vector = ?, last_used = ? WHERE model = ? AND text_hash = ?",
+                    [(blob, used, row_model, digest) for row_model, digest, blob, used in rows]
+                )
+            self._count += added
+            excess = self._count - self.max_entries
+            if excess > 0:
+                self._count -= self._conn.execute(
+                    "DELETE FROM embeddings WHERE (model, text_hash) IN "
+                    "(SELECT model, text_hash FROM embeddings ORDER BY last_used LIMIT ?)",
+                    (excess,)
+                ).rowcount
+
+    def count(self) -> int:
+        """Return the number of cached vectors."""
+        return self._count
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters since startup and current size."""
+        lookups = self.hits + self.misses
+        return {
+            "cache_hits": self.hits,
+            "cache_misses": self.misses,
+            "cache_hit_rate": self.hits / lookups if lookups else 0.0,
+            "cache_entries": self.count()
+        }
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+class CachedEmbedder:
+    """Embedder wrapper that answers repeated texts from an EmbeddingCache."""
+
+    def __init__(self, embedder, cache: Optional[EmbeddingCache]):
+        """
+        Initialize the cached embedder.
+
+        Args:
+            embedder: Backend with async `embed` / `embed_batch` (an Embedder, e.g. OllamaEmbedder)
+            cache: Embedding cache, or None to disable caching
+        """
+        self.embedder = embedder
+        self.cache = cache
+
+    @property
+    def model(self) -> str:
+        return self.embedder.model
+
+    async def embed(self, text: str) -> List[float]:
+        """
+        Generate embedding for a single text string, using the cache first.
+
+        Args:
+            text: Text to embed
+
+        Returns:
+            List of float values representing the embedding vector
+        """
+        if self.cache is None:
+            return await self.embedder.embed(text)
+
+        cached = self.cache.get_many(self.model, [text])
+        if text in cached:
+            return cached[text]
+
+        vector = await self.embedder.embed(text)
+        self.cache.put_many(self.model, [text], [vector])
+        return vector
+
+    async def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        Generate embeddings for multiple texts; only cache misses reach the backend.
+
+        Args:
+            texts: List of texts to embed
+
+        Returns:
+            List of embedding vectors, in input order
+        """
+        if self.cache is None:
+            return await self.embedder.embed_batch(texts)
+
+        vectors = self.cache.get_many(self.model, texts)
+        missing = list(dict.fromkeys(text for text in texts if text not in vectors))
+        if missing:
+            embedded = await self.embedder.embed_batch(missing)
+            self.cache.put_many(self.model, missing, embedded)
+            vectors.update(zip(missing, embedded))
+        return [vectors[text] for text in texts]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Backend statistics merged with cache statistics."""
+        stats = self.embedder.get_stats() if hasattr(self.embedder, "get_stats") else {}
+        if self.cache is not None:
+            stats.update(self.cache.get_stats())
+        return stats
+
+    async def close(self):
+        """Close the backend (the cache commits every write and stays usable)."""
+        await self.embedder.close()
@@ -0,0 +1,50 @@
+"""Splitting of long memory texts into overlapping chunks for embedding."""
+import re
+from typing import List
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+
+def chunk_text(text: str, chunk_chars: int = 2000, overlap: int = 200) -> List[str]:
+    """
+    Split text into overlapping chunks that fit the embedding model's context.
+
+    Breaks are placed at the last paragraph, line or word boundary in the
+    second half of each window, so chunks rarely cut through a sentence.
+    Texts that fit in one chunk are returned unchanged.
+
+    Args:
+        text: Text to split
+        chunk_chars: Maximum characters per chunk
+        overlap: Characters shared by consecutive chunks
+
+    Returns:
+        List of chunks (a single element for short texts)
+    """
+    if len(text) <= chunk_chars:
+        return [text]
+
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + chunk_chars, len(text))
+        if end < len(text):
+            window = text[start + chunk_chars // 2:end]
+            paragraphs = list(_PARAGRAPH_BREAK.finditer(window))
+            if paragraphs:
+                end = start + chunk_chars // 2 + paragraphs[-1].end()
+            else:
+                for separator in ("\n", ". ", " "):
+                    k = window.rfind(separator)
+                    if k != -1:
+                        end = start + chunk_chars // 2 + k + len(separator)
+                        break
+
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+
+    return chunks
@@ -0,0 +1,65 @@
+"""In-process embedding backend based on hashed word and character n-grams."""
+import asyncio
+from typing import List
+
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer
+
+from config.settings import LOCAL_EMBEDDING_DIM
+from embeddings.base import Embedder
+
+# Batches below this size are embedded inline instead of in a worker thread
+_INLINE_BATCH = 64
+
+
+class LocalEmbedder(Embedder):
+    """
+    CPU embedder that needs no external service.
+
+    Texts are mapped to signed hashed counts of word unigrams/bigrams and
+    character 3-5 grams, then L2-normalized. The mapping is fixed (no
+    fitting), so vectors are stable across restarts and processes. It
+    captures lexical rather than semantic similarity.
+    """
+
+    def __init__(self, dim: int = None):
+        """
+        Initialize the local embedder.
+
+        Args:
+            dim: Embedding dimension (defaults to config)
+        """
+        self.dim = dim or LOCAL_EMBEDDING_DIM
+        self.model = f"local-hashing-{self.dim}"
+        self._words = HashingVectorizer(
+            n_features=self.dim, analyzer="word", ngram_range=(1, 2), norm=None, alternate_sign=True
+        )
+        self._chars = HashingVectorizer(
+            n_features=self.dim, analyzer="char_wb", ngram_range=(3, 5), norm=None, alternate_sign=True
+        )
+
+    def _vectorize(self, texts: List[str]) -> np.ndarray:
+        """Embed texts as one float32 matrix with unit-length rows."""
+        # Word features carry more signal per match than the many char n-grams
+        counts = 2.0 * self._words.transform(texts) + self._chars.transform(texts)
+        matrix = counts.toarray().astype(np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    async def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        Generate embeddings for multiple texts in one vectorized pass.
+
+        Args:
+            texts: List of texts to embed
+
+        Returns:
+            List of embedding vectors, in input order
+        """
+        if not texts:
+            return []
+        if len(texts) < _INLINE_BATCH:
+            return self._vectorize(texts).tolist()
+        # Keep the event loop responsive for large batches
+        return (await asyncio.to_thread(self._vectorize, texts)).tolist()
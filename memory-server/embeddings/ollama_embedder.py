@@ -1,23 +1,69 @@
 """Ollama embedding service for generating vector embeddings."""
+import asyncio
 import aiohttp
-import json
 from typing import List, Optional
-from config.settings import OLLAMA_EMBEDDING_URL, EMBEDDING_MODEL
+from config.settings import (
+    OLLAMA_EMBEDDING_URL,
+    OLLAMA_EMBED_BATCH_URL,
+    EMBEDDING_MODEL,
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_CONCURRENCY
+)
+from embeddings.base import Embedder
 
 
-class OllamaEmbedder:
+class BatchEmbeddingUnsupported(Exception):
+    """Raised when the Ollama server has no /api/embed endpoint."""
+
+
+class OllamaEmbedder(Embedder):
     """Service for generating embeddings using Ollama."""
     
-    def __init__(self, model: str = None, base_url: str = None):
+    remote = True
+    
+    def __init__(
+        self,
+        model: str = None,
+        base_url: str = None,
+        batch_url: str = None,
+        batch_size: int = None,
+        concurrency: int = None
+    ):
         """
         Initialize Ollama embedder.
         
         Args:
             model: Embedding model name (defaults to config)
             base_url: Ollama embedding URL (defaults to config)
+            batch_url: Ollama batched embedding URL (defaults to config)
+            batch_size: Texts per batched request (defaults to config)
+            concurrency: Parallel single requests when batching is unavailable (defaults to config)
         """
         self.model = model or EMBEDDING_MODEL
         self.base_url = base_url or OLLAMA_EMBEDDING_URL
+        self.batch_url = batch_url or OLLAMA_EMBED_BATCH_URL
+        self.batch_size = batch_size or EMBEDDING_BATCH_SIZE
+        self.concurrency = concurrency or EMBEDDING_CONCURRENCY
+        self._batch_supported = True
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop = None
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Return the pooled HTTP session of the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=max(self.concurrency, 1) * 2, keepalive_timeout=60)
+            )
+            self._session_loop = loop
+        return self._session
+    
+    async def close(self):
+        """Close the pooled HTTP session."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._session_loop = None
     
     async def embed(self, text: str) -> List[float]:
         """
@@ -34,41 +80,93 @@ class OllamaEmbedder:
             "prompt": text
         }
         
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.post(
-                    self.base_url,
-                    json=payload,
-                    timeout=aiohttp.ClientTimeout(total=30)
-                ) as response:
-                    if response.status != 200:
-                        error_text = await response.text()
-                        raise Exception(f"Ollama embedding HTTP {response.status}: {error_text[:200]}")
-                    
-                    data = await response.json()
-                    
-                    # Ollama embeddings API returns {"embedding": [...]}
-                    if "embedding" in data:
-                        return data["embedding"]
-                    else:
-                        raise Exception(f"Unexpected response format: {list(data.keys())}")
-            
-            except aiohttp.ClientError as e:
-                raise Exception(f"Network error connecting to Ollama: {str(e)}")
+        try:
+            async with self._get_session().post(
+                self.base_url,
+                json=payload,
+                timeout=aiohttp.ClientTimeout(total=30)
+            ) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    raise Exception(f"Ollama embedding HTTP {response.status}: {error_text[:200]}")
+                
+                data = await response.json()
+                
+                # Ollama embeddings API returns {"embedding": [...]}
+                if "embedding" in data:
+                    return data["embedding"]
+                else:
+                    raise Exception(f"Unexpected response format: {list(data.keys())}")
+        
+        except aiohttp.ClientError as e:
+            raise Exception(f"Network error connecting to Ollama: {str(e)}")
+    
+    async def _embed_request(self, texts: List[str]) -> List[List[float]]:
+        """Embed a list of texts with one /api/embed request."""
+        payload = {
+            "model": self.model,
+            "input": texts
+        }
+        
+        try:
+            async with self._get_session().post(
+                self.batch_url,
+                json=payload,
+                timeout=aiohttp.ClientTimeout(total=120)
+            ) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    # An unknown route (not an unknown model) means an older Ollama
+                    if response.status == 405 or (response.status == 404 and "model" not in error_text.lower()):
+                        raise BatchEmbeddingUnsupported(error_text[:200])
+                    raise Exception(f"Ollama embedding HTTP {response.status}: {error_text[:200]}")
+                
+                data = await response.json()
+                
+                # Ollama embed API returns {"embeddings": [[...], ...]}
+                embeddings = data.get("embeddings")
+                if not isinstance(embeddings, list) or len(embeddings) != len(texts):
+                    raise Exception(f"Unexpected response format: {list(data.keys())}")
+                return embeddings
+        
+        except aiohttp.ClientError as e:
+            raise Exception(f"Network error connecting to Ollama: {str(e)}")
+    
+    async def _embed_concurrently(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts with single requests, at most `concurrency` in flight."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        
+        async def embed_one(text: str) -> List[float]:
+            async with semaphore:
+                return await self.embed(text)
+        
+        return list(await asyncio.gather(*(embed_one(text) for text in texts)))
     
-    async def embed_batch(self, texts: List[str]) -> List[List[float]]:
+    async def embed_batch(self, texts: List[str], batch_size: int = None) -> List[List[float]]:
         """
         Generate embeddings for multiple texts.
         
+        Texts are sent to /api/embed in batches of `batch_size`; servers
+        without that endpoint get bounded-concurrency single requests.
+        
         Args:
             texts: List of texts to embed
+            batch_size: Texts per request (defaults to the configured size)
             
         Returns:
-            List of embedding vectors
+            List of embedding vectors, in input order
         """
-        embeddings = []
-        for text in texts:
-            embedding = await self.embed(text)
-            embeddings.append(embedding)
-        return embeddings
-
+        if not texts:
+            return []
+        
+        batch_size = batch_size or self.batch_size
+        if self._batch_supported:
+            try:
+                embeddings = []
+                for start in range(0, len(texts), batch_size):
+                    embeddings.extend(await self._embed_request(texts[start:start + batch_size]))
+                return embeddings
+            except BatchEmbeddingUnsupported:
+                self._batch_supported = False
+        
+        return await self._embed_concurrently(texts)
@@ -0,0 +1,121 @@
+"""Micro-batching scheduler that merges concurrent embedding requests."""
+import asyncio
+from typing import Any, Dict, List, Set, Tuple
+from config.settings import EMBEDDING_BATCH_SIZE, EMBEDDING_BATCH_WINDOW_MS
+
+
+class EmbeddingScheduler:
+    """
+    Collects single embed requests into batched embedder calls.
+
+    Requests arriving within `max_wait` seconds of the first pending one
+    (or until `max_batch` texts are pending) are embedded with one
+    `embed_batch` call; every caller gets its own vector back. Identical
+    texts within a window are embedded once.
+    """
+
+    def __init__(self, embedder, max_batch: int = None, max_wait: float = None):
+        """
+        Initialize the scheduler.
+
+        Args:
+            embedder: Backend with async `embed_batch(texts)` (an Embedder, e.g. OllamaEmbedder)
+            max_batch: Maximum texts per batched call (defaults to config)
+            max_wait: Seconds to wait for more requests before flushing (defaults to config)
+        """
+        self.embedder = embedder
+        self.max_batch = max_batch or EMBEDDING_BATCH_SIZE
+        self.max_wait = EMBEDDING_BATCH_WINDOW_MS / 1000 if max_wait is None else max_wait
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer = None
+        # Running batch tasks (the event loop only keeps weak references to tasks)
+        self._tasks: Set[asyncio.Task] = set()
+        self.stats = {"requests": 0, "batches": 0, "texts_embedded": 0, "max_batch": 0}
+
+    @property
+    def model(self) -> str:
+        return self.embedder.model
+
+    async def embed(self, text: str) -> List[float]:
+        """
+        Embed a single text as part of the next batch.
+
+        Args:
+            text: Text to embed
+
+        Returns:
+            Embedding vector
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        self.stats["requests"] += 1
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    async def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed several texts.
+
+        Small batches join the current window; larger ones are already
+        batched and go straight to the embedder.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            Embedding vectors, in input order
+        """
+        if len(texts) >= self.max_batch:
+            self.stats["requests"] += len(texts)
+            return await self._embed(texts)
+        return list(await asyncio.gather(*(self.embed(text) for text in texts)))
+
+    def _flush(self):
+        """Hand all pending requests to one batched embedding call."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _embed(self, texts: List[str]) -> List[List[float]]:
+        self.stats["batches"] += 1
+        self.stats["texts_embedded"] += len(texts)
+        self.stats["max_batch"] = max(self.stats["max_batch"], len(texts))
+        return await self.embedder.embed_batch(texts)
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future]]):
+        unique = list(dict.fromkeys(text for text, _ in batch))
+        try:
+            vectors = dict(zip(unique, await self._embed(unique)))
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for text, future in batch:
+            if not future.done():
+                future.set_result(vectors[text])
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Batching statistics (average batch size shows how much work was merged)."""
+        stats = dict(self.stats)
+        stats["avg_batch"] = stats["texts_embedded"] / stats["batches"] if stats["batches"] else 0.0
+        return stats
+
+    async def close(self):
+        """Flush pending requests, wait for running batches and close the underlying embedder."""
+        self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self.embedder.close()
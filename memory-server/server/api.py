@@ -1,7 +1,8 @@
 """FastAPI REST API endpoints for memory server."""
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List
+from typing import Any, Dict, List, Optional
 import sys
 import os
 
@@ -14,23 +15,45 @@ from server.models import (
     MemoryStoreResponse,
     MemorySearchRequest,
     MemorySearchResponse,
+    MemoryStoreBatchRequest,
+    MemoryStoreBatchResponse,
+    MemorySearchBatchRequest,
+    MemorySearchBatchResponse,
     MemoryQueryRequest,
     MemoryQueryResponse,
     MemoryClearRequest,
     MemoryClearResponse,
+    MemoryDeleteRequest,
+    MemoryDeleteResponse,
+    MemoryCompactResponse,
     HealthResponse,
     MemorySearchResult
 )
 from storage.chroma_manager import ChromaManager
-from embeddings.ollama_embedder import OllamaEmbedder
+from embeddings.base import create_embedder
+from embeddings.scheduler import EmbeddingScheduler
+from embeddings.cache import EmbeddingCache, CachedEmbedder
+from embeddings.chunking import chunk_text
 from config.metadata import build_tags, validate_agent, VALID_AGENTS
-from config.settings import EMBEDDING_MODEL
-from clear_memory import clear_vector_store, clear_simple_vector_store
+from config.settings import (
+    EMBEDDING_CACHE, EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_ENTRIES,
+    CHUNK_CHARS, CHUNK_OVERLAP
+)
+from clear_memory import clear_simple_vector_store
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Release the embedder's pooled HTTP session on shutdown."""
+    yield
+    await embedder.close()
+
 
 app = FastAPI(
     title="Memory Server",
     description="Persistent vector memory for multi-agent system",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -43,8 +66,93 @@ app.add_middleware(
 )
 
 # Initialize services
-chroma_manager = ChromaManager()
-embedder = OllamaEmbedder()
+embedder = create_embedder()
+chroma_manager = ChromaManager(model=embedder.model)
+if embedder.remote:
+    # Repeated texts are served from the embedding cache; the remaining
+    # concurrent requests share batched embedding calls
+    embedder = CachedEmbedder(
+        EmbeddingScheduler(embedder),
+        EmbeddingCache(EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_ENTRIES) if EMBEDDING_CACHE else None
+    )
+
+
+def _request_tags(request: MemoryStoreRequest) -> List[str]:
+    """Build the tag list of a store request (derived tags plus request tags)."""
+    metadata = request.metadata or {}
+    tags = build_tags(
+        agent=request.agent,
+        topic=metadata.get("topic"),
+        output_type=metadata.get("output_type"),
+        utility=metadata.get("utility")
+    )
+    
+    # Add any additional tags from request
+    if request.tags:
+        tags.extend(request.tags)
+    return tags
+
+
+async def _embed_chunked(texts: List[str]) -> List[List[List[float]]]:
+    """
+    Embed texts as overlapping chunks in one batched pass.
+    
+    Args:
+        texts: Memory texts to embed
+        
+    Returns:
+        Per text, one embedding vector per chunk (a single vector for short texts)
+    """
+    # Texts that split into no chunks (e.g. long runs of whitespace) are embedded whole
+    chunked = [chunk_text(text, CHUNK_CHARS, CHUNK_OVERLAP) or [text] for text in texts]
+    vectors = await embedder.embed_batch([chunk for chunks in chunked for chunk in chunks])
+    
+    grouped = []
+    start = 0
+    for chunks in chunked:
+        grouped.append(vectors[start:start + len(chunks)])
+        start += len(chunks)
+    return grouped
+
+
+def _search_where(request: MemorySearchRequest) -> Optional[Dict[str, Any]]:
+    """Metadata filter of a search request (agent, any of the tags, and the request's own filter)."""
+    where = {}
+    if request.agent:
+        where["agent"] = request.agent
+    if request.tags:
+        where["tags"] = request.tags
+    if request.where:
+        where = {"$and": [where, request.where]} if where else request.where
+    return where or None
+
+
+def _check_filter(where: Optional[Dict[str, Any]]) -> None:
+    """Reject a filter whose range bounds do not match the stored field types (422)."""
+    try:
+        chroma_manager.validate_filter(where)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid filter: {str(e)}")
+
+
+def _search_response(request: MemorySearchRequest, results: List[dict]) -> MemorySearchResponse:
+    """Format search results."""
+    # Format results
+    formatted_results = [
+        MemorySearchResult(
+            id=r["id"],
+            text=r["text"],
+            metadata=r["metadata"],
+            distance=r.get("distance")
+        )
+        for r in results
+    ]
+    
+    return MemorySearchResponse(
+        results=formatted_results,
+        query=request.query,
+        n_results=len(formatted_results)
+    )
 
 
 @app.get("/memory/health", response_model=HealthResponse)
@@ -55,7 +163,8 @@ async def health_check():
         return HealthResponse(
             status="healthy",
             collection_stats=stats,
-            embedding_model=EMBEDDING_MODEL
+            embedding_model=embedder.model,
+            embedding_stats=embedder.get_stats()
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Health check failed: {str(e)}")
@@ -77,29 +186,18 @@ async def store_memory(request: MemoryStoreRequest):
                 detail=f"Invalid agent: {request.agent}. Valid agents: {VALID_AGENTS}"
             )
         
-        # Generate embedding
-        embedding = await embedder.embed(request.text)
-        
-        # Build tags
-        tags = build_tags(
-            agent=request.agent,
-            topic=request.metadata.get("topic") if request.metadata else None,
-            output_type=request.metadata.get("output_type") if request.metadata else None,
-            utility=request.metadata.get("utility") if request.metadata else None
-        )
-        
-        # Add any additional tags from request
-        if request.tags:
-            tags.extend(request.tags)
+        # Generate embeddings (one per chunk for long texts)
+        chunk_embeddings = (await _embed_chunked([request.text]))[0]
         
         # Store in ChromaDB
         memory_id = chroma_manager.store(
             text=request.text,
-            embedding=embedding,
+            embedding=chunk_embeddings[0],
             agent=request.agent,
             task=request.task,
-            tags=tags,
-            metadata=request.metadata
+            tags=_request_tags(request),
+            metadata=request.metadata,
+            chunk_embeddings=chunk_embeddings
         )
         
         return MemoryStoreResponse(
@@ -119,50 +217,91 @@ async def search_memory(request: MemorySearchRequest):
     
     The query text is embedded and used to find similar memories.
     """
+    _check_filter(_search_where(request))
+    
     try:
         # Generate embedding for query
         query_embedding = await embedder.embed(request.query)
         
-        # Build where clause for filtering
-        where = None
-        if request.agent:
-            where = {"agent": request.agent}
-        
-        # Perform search
+        # Agent and tag filters restrict the rows that are scored
         results = chroma_manager.search(
             query_embedding=query_embedding,
             n_results=request.n_results,
-            where=where
+            where=_search_where(request)
+        )
+        
+        return _search_response(request, results)
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+
+
+@app.post("/memory/store_batch", response_model=MemoryStoreBatchResponse)
+async def store_memory_batch(request: MemoryStoreBatchRequest):
+    """
+    Store several memories in one request.
+    
+    All texts (split into chunks when long) are embedded in one batched
+    pass and inserted with a single persistence write. The batch is rejected as a whole if any agent is
+    invalid.
+    """
+    invalid = [item.agent for item in request.items if not validate_agent(item.agent)]
+    if invalid:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid agent: {', '.join(sorted(set(invalid)))}. Valid agents: {VALID_AGENTS}"
         )
+    
+    try:
+        embeddings = await _embed_chunked([item.text for item in request.items])
         
-        # Filter by tags if specified
-        if request.tags:
-            filtered_results = []
-            for result in results:
-                entry_tags = result["metadata"].get("tags", "").split(",")
-                if any(tag.strip() in entry_tags for tag in request.tags):
-                    filtered_results.append(result)
-            results = filtered_results
+        ids = chroma_manager.store_batch([
+            {
+                "text": item.text,
+                "embeddings": embedding,
+                "agent": item.agent,
+                "task": item.task,
+                "tags": _request_tags(item),
+                "metadata": item.metadata
+            }
+            for item, embedding in zip(request.items, embeddings)
+        ])
         
-        # Format results
-        formatted_results = [
-            MemorySearchResult(
-                id=r["id"],
-                text=r["text"],
-                metadata=r["metadata"],
-                distance=r.get("distance")
-            )
-            for r in results
-        ]
+        return MemoryStoreBatchResponse(ids=ids, count=len(ids))
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to store memories: {str(e)}")
+
+
+@app.post("/memory/search_batch", response_model=MemorySearchBatchResponse)
+async def search_memory_batch(request: MemorySearchBatchRequest):
+    """
+    Run several semantic searches in one request.
+    
+    Queries are embedded in one batched pass and scored against the store
+    together (one matrix-matrix product when they cover most of it), each
+    with its own filters and number of results.
+    """
+    for q in request.queries:
+        _check_filter(_search_where(q))
+    
+    try:
+        query_embeddings = await embedder.embed_batch([q.query for q in request.queries])
         
-        return MemorySearchResponse(
-            results=formatted_results,
-            query=request.query,
-            n_results=len(formatted_results)
+        results = chroma_manager.search_many(
+            query_embeddings=query_embeddings,
+            n_results=[q.n_results for q in request.queries],
+            wheres=[_search_where(q) for q in request.queries]
         )
+        
+        responses = [
+            _search_response(q, query_results)
+            for q, query_results in zip(request.queries, results)
+        ]
+        return MemorySearchBatchResponse(results=responses, count=len(responses))
     
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Batch search failed: {str(e)}")
 
 
 @app.post("/memory/query_by_tags", response_model=MemoryQueryResponse)
@@ -172,12 +311,15 @@ async def query_by_tags(request: MemoryQueryRequest):
     
     Returns memories matching the specified filters.
     """
+    _check_filter(request.where)
+    
     try:
         # Query by tags
         results = chroma_manager.query_by_tags(
             agent=request.agent,
             tags=request.tags,
-            limit=request.limit
+            limit=request.limit,
+            where=request.where
         )
         
         # Format results
@@ -199,6 +341,34 @@ async def query_by_tags(request: MemoryQueryRequest):
         raise HTTPException(status_code=500, detail=f"Query failed: {str(e)}")
 
 
+@app.post("/memory/delete", response_model=MemoryDeleteResponse)
+async def delete_memory(request: MemoryDeleteRequest):
+    """
+    Delete memories by id and/or agent/task filter.
+    
+    Deleted entries disappear from search immediately; their storage is
+    reclaimed by compaction.
+    """
+    if not (request.ids or request.agent or request.task):
+        raise HTTPException(status_code=400, detail="Specify ids, agent or task to delete")
+    
+    try:
+        deleted = chroma_manager.delete(ids=request.ids, agent=request.agent, task=request.task)
+        return MemoryDeleteResponse(deleted=deleted, message=f"Deleted {deleted} memories")
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Delete failed: {str(e)}")
+
+
+@app.post("/memory/compact", response_model=MemoryCompactResponse)
+async def compact_memory():
+    """Reclaim the storage of deleted memories."""
+    try:
+        return MemoryCompactResponse(rows_reclaimed=chroma_manager.compact())
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Compaction failed: {str(e)}")
+
+
 @app.post("/memory/clear", response_model=MemoryClearResponse)
 async def clear_memory(request: MemoryClearRequest):
     """
@@ -211,15 +381,10 @@ async def clear_memory(request: MemoryClearRequest):
         entries_cleared = 0
         file_deleted = False
 
-        # Get initial count for reporting
-        initial_count = chroma_manager.get_stats()["total_entries"]
-
-        # Clear memory entries if requested
+        # Clear memory entries if requested (the served store is cleared in
+        # place so the running server does not keep or re-save old entries)
         if request.clear_data:
-            if clear_vector_store(confirm=False):  # API calls don't need confirmation
-                entries_cleared = initial_count
-            else:
-                raise HTTPException(status_code=500, detail="Failed to clear memory entries")
+            entries_cleared = chroma_manager.clear()
 
         # Clear persistence file if requested
         if request.clear_file:
@@ -1,8 +1,29 @@
 """Pydantic models for API request/response schemas."""
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 
+from storage.constants import RESERVED_METADATA_KEYS
+from storage.metadata_columns import validate_filter
+
+WHERE_DESCRIPTION = (
+    "Metadata filter: field values, lists (any of), or operators "
+    "$eq/$ne/$in/$nin/$gt/$gte/$lt/$lte, combined with $and/$or"
+)
+
+
+def _validate_metadata(metadata: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    reserved = sorted(set(metadata or {}) & set(RESERVED_METADATA_KEYS))
+    if reserved:
+        raise ValueError(f"Reserved metadata keys: {', '.join(reserved)}")
+    return metadata
+
+
+def _validate_where(where: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if where is not None:
+        validate_filter(where)
+    return where
+
 
 class MemoryStoreRequest(BaseModel):
     """Request model for storing memory."""
@@ -12,6 +33,8 @@ class MemoryStoreRequest(BaseModel):
     tags: Optional[List[str]] = Field(default=None, description="Additional tags")
     metadata: Optional[Dict[str, Any]] = Field(default=None, description="Additional metadata")
 
+    _check_metadata = field_validator("metadata")(_validate_metadata)
+
 
 class MemoryStoreResponse(BaseModel):
     """Response model for storing memory."""
@@ -26,6 +49,9 @@ class MemorySearchRequest(BaseModel):
     n_results: int = Field(default=5, ge=1, le=50, description="Number of results to return")
     agent: Optional[str] = Field(default=None, description="Filter by agent persona")
     tags: Optional[List[str]] = Field(default=None, description="Filter by tags")
+    where: Optional[Dict[str, Any]] = Field(default=None, description=WHERE_DESCRIPTION)
+
+    _check_where = field_validator("where")(_validate_where)
 
 
 class MemorySearchResult(BaseModel):
@@ -43,12 +69,39 @@ class MemorySearchResponse(BaseModel):
     n_results: int
 
 
+class MemoryStoreBatchRequest(BaseModel):
+    """Request model for storing several memories in one call."""
+    items: List[MemoryStoreRequest] = Field(..., min_length=1, max_length=256, description="Memories to store")
+
+
+class MemoryStoreBatchResponse(BaseModel):
+    """Response model for batch storing."""
+    ids: List[str] = Field(..., description="Memory entry IDs, in request order")
+    count: int = Field(..., description="Number of entries stored")
+    status: str = Field(default="success", description="Operation status")
+    message: str = Field(default="Memories stored successfully", description="Status message")
+
+
+class MemorySearchBatchRequest(BaseModel):
+    """Request model for running several semantic searches in one call."""
+    queries: List[MemorySearchRequest] = Field(..., min_length=1, max_length=64, description="Searches to run")
+
+
+class MemorySearchBatchResponse(BaseModel):
+    """Response model for batch search (one search response per query, in order)."""
+    results: List[MemorySearchResponse]
+    count: int
+
+
 class MemoryQueryRequest(BaseModel):
     """Request model for querying by tags."""
     agent: Optional[str] = Field(default=None, description="Filter by agent persona")
     tags: Optional[List[str]] = Field(default=None, description="Filter by tags")
+    where: Optional[Dict[str, Any]] = Field(default=None, description=WHERE_DESCRIPTION)
     limit: int = Field(default=10, ge=1, le=100, description="Maximum results to return")
 
+    _check_where = field_validator("where")(_validate_where)
+
 
 class MemoryQueryResponse(BaseModel):
     """Response model for querying by tags."""
@@ -71,9 +124,30 @@ class MemoryClearResponse(BaseModel):
     file_deleted: bool = Field(default=False, description="Whether persistence file was deleted")
 
 
+class MemoryDeleteRequest(BaseModel):
+    """Request model for deleting memories by id and/or filter."""
+    ids: Optional[List[str]] = Field(default=None, description="Memory entry IDs to delete")
+    agent: Optional[str] = Field(default=None, description="Delete all memories of this agent persona")
+    task: Optional[str] = Field(default=None, description="Delete all memories of this task")
+
+
+class MemoryDeleteResponse(BaseModel):
+    """Response model for deleting memories."""
+    status: str = Field(default="success", description="Operation status")
+    message: str = Field(default="Memories deleted successfully", description="Status message")
+    deleted: int = Field(default=0, description="Number of entries deleted")
+
+
+class MemoryCompactResponse(BaseModel):
+    """Response model for compacting the store."""
+    status: str = Field(default="success", description="Operation status")
+    rows_reclaimed: int = Field(default=0, description="Number of deleted rows removed from storage")
+
+
 class HealthResponse(BaseModel):
     """Health check response."""
     status: str
     collection_stats: Dict[str, Any]
     embedding_model: str
+    embedding_stats: Dict[str, Any] = Field(default_factory=dict, description="Embedding batching and cache statistics")
 
@@ -1,18 +1,40 @@
 """Simple vector store management for memory storage."""
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union
 from datetime import datetime
 import uuid
+from .constants import RESERVED_METADATA_KEYS
 from .simple_vector_store import SimpleVectorStore
 import os
-from config.settings import CHROMA_PERSIST_DIR
+from config.settings import (
+    CHROMA_PERSIST_DIR,
+    CHUNK_AGGREGATION,
+    VECTOR_COMPACT_THRESHOLD,
+    VECTOR_INDEX,
+    IVF_MIN_ROWS,
+    IVF_NPROBE,
+    IVF_LISTS
+)
 
 
 class ChromaManager:
     """Manages vector store operations for memory storage."""
 
-    def __init__(self):
-        persist_file = os.path.join(CHROMA_PERSIST_DIR, "vector_store.json")
-        self.collection = SimpleVectorStore(persist_file=persist_file)
+    def __init__(self, model: Optional[str] = None):
+        """
+        Open the persisted vector store.
+        
+        Args:
+            model: Embedding model name, recorded with the store
+        """
+        self.collection = SimpleVectorStore(
+            persist_dir=os.path.join(CHROMA_PERSIST_DIR, "vector_store"),
+            compact_threshold=VECTOR_COMPACT_THRESHOLD,
+            legacy_file=os.path.join(CHROMA_PERSIST_DIR, "vector_store.json"),
+            model=model,
+            ivf_min_rows=IVF_MIN_ROWS if VECTOR_INDEX == "ivf" else None,
+            ivf_nprobe=IVF_NPROBE,
+            ivf_lists=IVF_LISTS
+        )
     
     def store(
         self,
@@ -21,7 +43,8 @@ class ChromaManager:
         agent: str,
         task: str,
         tags: List[str],
-        metadata: Optional[Dict[str, Any]] = None
+        metadata: Optional[Dict[str, Any]] = None,
+        chunk_embeddings: Optional[List[List[float]]] = None
     ) -> str:
         """
         Store a memory entry with text, embedding, and metadata.
@@ -33,31 +56,83 @@ class ChromaManager:
             task: Task description
             tags: List of tags
             metadata: Additional metadata dict
+            chunk_embeddings: One vector per chunk of a long text (replaces `embedding`)
             
         Returns:
             Memory entry ID
         """
-        memory_id = str(uuid.uuid4())
-        timestamp = datetime.now().isoformat()
-        
-        # Prepare metadata
-        entry_metadata = {
+        return self.store_batch([{
+            "text": text,
+            "embedding": embedding,
+            "embeddings": chunk_embeddings,
             "agent": agent,
             "task": task,
-            "tags": ",".join(tags),  # ChromaDB stores as comma-separated string
-            "timestamp": timestamp,
-            **(metadata or {})
-        }
+            "tags": tags,
+            "metadata": metadata
+        }])[0]
+    
+    def store_batch(self, entries: List[Dict[str, Any]]) -> List[str]:
+        """
+        Store several memory entries with a single persistence write.
+        
+        Entries with an "embeddings" list (one vector per chunk of a long
+        text) are stored as a parent row holding the full text and the first
+        chunk vector, plus one row per further chunk that points back to the
+        parent through its "parent_id" metadata. Caller metadata cannot set
+        these chunk keys (`RESERVED_METADATA_KEYS` are dropped), so an entry
+        never turns into a hidden chunk row.
+        
+        Args:
+            entries: Dicts with text, embedding (or embeddings), agent, task,
+                tags and optional metadata (same fields as `store`)
+            
+        Returns:
+            Memory entry IDs, in order
+        """
+        timestamp = datetime.now().isoformat()
+        ids = [str(uuid.uuid4()) for _ in entries]
+        
+        row_ids = []
+        row_embeddings = []
+        row_documents = []
+        row_metadatas = []
+        for memory_id, entry in zip(ids, entries):
+            chunk_vectors = entry.get("embeddings") or [entry["embedding"]]
+            
+            # Prepare metadata
+            metadata = {
+                "agent": entry["agent"],
+                "task": entry["task"],
+                "tags": ",".join(entry["tags"]),  # ChromaDB stores as comma-separated string
+                "timestamp": timestamp,
+                **{
+                    key: value for key, value in (entry.get("metadata") or {}).items()
+                    if key not in RESERVED_METADATA_KEYS
+                }
+            }
+            if len(chunk_vectors) > 1:
+                metadata["chunk_count"] = len(chunk_vectors)
+            
+            row_ids.append(memory_id)
+            row_embeddings.append(chunk_vectors[0])
+            row_documents.append(entry["text"])
+            row_metadatas.append(metadata)
+            
+            for index, vector in enumerate(chunk_vectors[1:], start=1):
+                row_ids.append(f"{memory_id}#chunk{index}")
+                row_embeddings.append(vector)
+                row_documents.append("")
+                row_metadatas.append({**metadata, "parent_id": memory_id, "chunk_index": index})
         
         # Store in vector store
         self.collection.add(
-            ids=[memory_id],
-            embeddings=[embedding],
-            documents=[text],
-            metadatas=[entry_metadata]
+            ids=row_ids,
+            embeddings=row_embeddings,
+            documents=row_documents,
+            metadatas=row_metadatas
         )
         
-        return memory_id
+        return ids
     
     def search(
         self,
@@ -71,80 +146,157 @@ class ChromaManager:
         Args:
             query_embedding: Query vector embedding
             n_results: Number of results to return
-            where: Optional metadata filter (e.g., {"agent": "researcher"})
+            where: Optional metadata filter, e.g. {"agent": "researcher"},
+                {"tags": [...]} (any of the tags), or with operators
+                {"timestamp": {"$gte": "2024-05-01"}, "insights_count": {"$gte": 3}};
+                see `validate_filter`
             
         Returns:
             List of search results with metadata
         """
-        results = self.collection.query(
-            query_embeddings=query_embedding,
+        return self.search_many([query_embedding], n_results=n_results, wheres=[where])[0]
+    
+    def search_many(
+        self,
+        query_embeddings: List[List[float]],
+        n_results: Union[int, List[int]] = 5,
+        wheres: Optional[List[Optional[Dict[str, Any]]]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Semantic search for several queries in one similarity computation.
+        
+        Args:
+            query_embeddings: Query vector embeddings (a Q x D matrix)
+            n_results: Number of results to return, for all queries or per query
+            wheres: Optional metadata filter per query
+            
+        Returns:
+            One list of search results per query
+        """
+        results = self.collection.query_many(
+            query_embeddings=query_embeddings,
             n_results=n_results,
-            where=where
+            wheres=wheres,
+            aggregate=CHUNK_AGGREGATION
         )
         
         # Format results
-        formatted_results = []
-        if results["ids"] and len(results["ids"][0]) > 0:
-            for i in range(len(results["ids"][0])):
-                result = {
-                    "id": results["ids"][0][i],
-                    "text": results["documents"][0][i],
-                    "metadata": results["metadatas"][0][i],
-                    "distance": results["distances"][0][i] if len(results["distances"]) > 0 and i < len(results["distances"][0]) else None
+        return [
+            [
+                {
+                    "id": results["ids"][q][i],
+                    "text": results["documents"][q][i],
+                    "metadata": results["metadatas"][q][i],
+                    "distance": float(results["distances"][q][i])
                 }
-                formatted_results.append(result)
+                for i in range(len(results["ids"][q]))
+            ]
+            for q in range(len(query_embeddings))
+        ]
+    
+    def validate_filter(self, where: Optional[Dict[str, Any]]) -> None:
+        """
+        Check a metadata filter against the types of the stored fields.
         
-        return formatted_results
+        Raises:
+            ValueError: If the filter is malformed or a range bound does not
+                match its field's type
+        """
+        if where:
+            self.collection.validate_filter(where)
     
     def query_by_tags(
         self,
         agent: Optional[str] = None,
         tags: Optional[List[str]] = None,
-        limit: int = 10
+        limit: int = 10,
+        where: Optional[Dict[str, Any]] = None
     ) -> List[Dict[str, Any]]:
         """
-        Query memories by agent and/or tags.
+        Query memories by agent, tags and/or a metadata filter.
         
         Args:
             agent: Filter by agent persona
             tags: Filter by tags (any match)
             limit: Maximum results to return
+            where: Additional metadata filter (same language as `search`)
             
         Returns:
             List of matching memory entries
         """
-        where = {}
+        filters = {}
+        
+        if agent:
+            filters["agent"] = agent
+        if tags:
+            filters["tags"] = tags
+        if where:
+            filters = {"$and": [filters, where]} if filters else where
+        
+        # Agent and tag filters are answered from the store's row-id index, others from typed columns
+        all_results = self.collection.get(where=filters if filters else None, limit=limit)
         
+        return [
+            {
+                "id": all_results["ids"][i],
+                "text": all_results["documents"][i],
+                "metadata": all_results["metadatas"][i]
+            }
+            for i in range(len(all_results["ids"]))
+        ]
+    
+    def delete(
+        self,
+        ids: Optional[List[str]] = None,
+        agent: Optional[str] = None,
+        task: Optional[str] = None
+    ) -> int:
+        """
+        Delete memories by id and/or agent/task filter.
+        
+        Args:
+            ids: Memory entry IDs to delete
+            agent: Delete all memories of this agent persona
+            task: Delete all memories of this task
+            
+        Returns:
+            Number of entries deleted
+        """
+        where = {}
         if agent:
             where["agent"] = agent
+        if task:
+            where["task"] = task
+        return self.collection.delete(ids=ids, where=where or None)
+    
+    def compact(self) -> int:
+        """
+        Reclaim the storage of deleted entries.
         
-        # Get all entries and filter by tags if needed
-        all_results = self.collection.get(where=where if where else None, limit=limit)
-
-        formatted_results = []
-        if all_results["ids"]:
-            for i in range(len(all_results["ids"])):
-                entry_tags = all_results["metadatas"][i].get("tags", "").split(",")
-
-                # Filter by tags if specified
-                if tags:
-                    if not any(tag.strip() in entry_tags for tag in tags):
-                        continue
-
-                result = {
-                    "id": all_results["ids"][i],
-                    "text": all_results["documents"][i],
-                    "metadata": all_results["metadatas"][i]
-                }
-                formatted_results.append(result)
+        Returns:
+            Number of rows reclaimed
+        """
+        return self.collection.compact()
+    
+    def clear(self) -> int:
+        """
+        Remove all memory entries.
         
-        return formatted_results
+        Returns:
+            Number of entries removed
+        """
+        return self.collection.clear()
     
     def get_stats(self) -> Dict[str, Any]:
         """Get collection statistics."""
         count = self.collection.count()
         return {
             "total_entries": count,
+            "dimension": self.collection.dimension,
+            "embedding_model": self.collection.model,
+            "total_vectors": self.collection.vector_count(),
+            "tombstone_ratio": round(self.collection.tombstone_ratio(), 4),
+            "ann_index": "ivf" if self.collection.use_index else "exact",
             "collection_name": "multi_agent_memory"
         }
 
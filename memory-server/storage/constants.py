@@ -0,0 +1,4 @@
+"""Constants shared by the storage layer and the API schemas (no heavy imports)."""
+
+# Metadata keys the store sets itself to link chunk rows to their entry
+RESERVED_METADATA_KEYS = ("parent_id", "chunk_index", "chunk_count")
@@ -0,0 +1,149 @@
+"""Inverted-file (IVF) approximate nearest-neighbor index over the store's vectors."""
+from typing import Dict, List, Optional
+
+import numpy as np
+from sklearn.cluster import MiniBatchKMeans
+
+# Training sample per list: enough points for stable centroids without clustering the whole store
+_TRAIN_POINTS_PER_LIST = 64
+
+
+class IVFIndex:
+    """
+    Partitions unit-length vectors into lists around k-means centroids.
+
+    A search probes the `nprobe` lists whose centroids are closest to the
+    query and scores only their rows, trading recall for latency. Rows are
+    added to their nearest list incrementally; the index is retrained when
+    the store has grown well past the size it was trained on.
+    """
+
+    def __init__(self, n_lists: int = 0, nprobe: int = 8, seed: int = 0):
+        """
+        Initialize an untrained index.
+
+        Args:
+            n_lists: Number of lists (0 picks about sqrt(rows) at training time)
+            nprobe: Lists scanned per query (higher = better recall, slower)
+            seed: Random seed for training
+        """
+        self.n_lists = n_lists
+        self.nprobe = nprobe
+        self.seed = seed
+        self.centroids: Optional[np.ndarray] = None
+        self.assignments = np.zeros(0, dtype=np.int32)
+        self.trained_rows = 0
+        self._lists: Optional[List[np.ndarray]] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.centroids is not None
+
+    @property
+    def rows(self) -> int:
+        """Number of rows assigned to lists."""
+        return len(self.assignments)
+
+    def train(self, vectors: np.ndarray) -> None:
+        """
+        Cluster the vectors and assign every row to a list.
+
+        Args:
+            vectors: Unit-length float32 rows (the whole store)
+        """
+        n_lists = self.n_lists or max(1, int(np.sqrt(len(vectors))))
+        n_lists = min(n_lists, len(vectors))
+        rng = np.random.default_rng(self.seed)
+        sample_size = min(len(vectors), n_lists * _TRAIN_POINTS_PER_LIST)
+        sample = vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))]
+
+        kmeans = MiniBatchKMeans(
+            n_clusters=n_lists,
+            random_state=self.seed,
+            batch_size=min(sample_size, 4096),
+            n_init=1,
+            max_iter=20
+        ).fit(sample)
+        centroids = kmeans.cluster_centers_.astype(np.float32)
+        norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self.centroids = centroids / norms
+
+        self.assignments = np.zeros(0, dtype=np.int32)
+        self.trained_rows = len(vectors)
+        self.add(vectors)
+
+    def _nearest_lists(self, vectors: np.ndarray, k: int) -> np.ndarray:
+        """Indices of the k closest centroids per vector (unordered)."""
+        scores = vectors @ self.centroids.T
+        if k >= scores.shape[1]:
+            return np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+        return np.argpartition(-scores, k - 1, axis=1)[:, :k]
+
+    def add(self, vectors: np.ndarray) -> None:
+        """
+        Assign newly appended rows (in row order) to their nearest lists.
+
+        Args:
+            vectors: Unit-length float32 rows following the rows already indexed
+        """
+        if not len(vectors):
+            return
+        assigned = []
+        for start in range(0, len(vectors), 8192):
+            assigned.append(self._nearest_lists(vectors[start:start + 8192], 1)[:, 0].astype(np.int32))
+        self.assignments = np.concatenate([self.assignments, *assigned])
+        self._lists = None
+
+    def remap(self, live: np.ndarray) -> None:
+        """
+        Follow a compaction that kept only the given rows.
+
+        Args:
+            live: Old row indices that survive, in their new order
+        """
+        self.assignments = self.assignments[live[live < len(self.assignments)]]
+        self._lists = None
+
+    def needs_retraining(self, rows: int) -> bool:
+        """Whether the store grew enough since training to rebalance the lists."""
+        return not self.ready or rows > 4 * self.trained_rows
+
+    def _inverted_lists(self) -> List[np.ndarray]:
+        if self._lists is None:
+            order = np.argsort(self.assignments, kind="stable")
+            bounds = np.searchsorted(self.assignments[order], np.arange(len(self.centroids) + 1))
+            self._lists = [order[bounds[i]:bounds[i + 1]] for i in range(len(self.centroids))]
+        return self._lists
+
+    def candidates(self, queries: np.ndarray, nprobe: int = None) -> List[np.ndarray]:
+        """
+        Rows in the lists closest to each query.
+
+        Args:
+            queries: Unit-length float32 query rows
+            nprobe: Lists to scan per query (defaults to the index setting)
+
+        Returns:
+            One sorted array of row indices per query
+        """
+        lists = self._inverted_lists()
+        probes = self._nearest_lists(queries, nprobe or self.nprobe)
+        return [np.sort(np.concatenate([lists[j] for j in probe])) for probe in probes]
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Arrays to persist the index with."""
+        return {
+            "centroids": self.centroids,
+            "assignments": self.assignments,
+            "trained_rows": np.array(self.trained_rows)
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], nprobe: int = 8) -> "IVFIndex":
+        """Restore an index saved with `to_arrays`."""
+        index = cls(n_lists=len(arrays["centroids"]), nprobe=nprobe)
+        index.centroids = arrays["centroids"].astype(np.float32)
+        index.assignments = arrays["assignments"].astype(np.int32)
+        index.trained_rows = int(arrays["trained_rows"])
+        return index
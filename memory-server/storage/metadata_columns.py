@@ -0,0 +1,267 @@
+"""Typed metadata columns of the vector store and the metadata filter language."""
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+# Rows covered by the first columns; capacity doubles when a row falls outside
+_INITIAL_CAPACITY = 256
+# Missing values: NaN for numbers, this for timestamps, -1 for category codes
+_NO_TIME = np.iinfo(np.int64).min
+
+LOGICAL_OPERATORS = ("$and", "$or")
+SET_OPERATORS = ("$in", "$nin")
+RANGE_OPERATORS = ("$gt", "$gte", "$lt", "$lte")
+OPERATORS = ("$eq", "$ne") + SET_OPERATORS + RANGE_OPERATORS
+# Metadata fields holding ISO-8601 timestamps (as written by ChromaManager)
+TIME_FIELDS = ("timestamp",)
+
+
+def _check_range_bound(field: str, op: str, value: Any, time_fields: Iterable[str], kind: Optional[str]) -> None:
+    """Reject a range bound that cannot be compared with the field's values."""
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError(f"{op} expects a number or timestamp for field '{field}'")
+    if field in time_fields or kind == "time":
+        try:
+            to_timestamp(value)
+        except ValueError:
+            raise ValueError(f"{op} expects an ISO-8601 timestamp for field '{field}', got {value!r}")
+    elif kind == "number" and not _is_number(value):
+        raise ValueError(f"{op} expects a number for numeric field '{field}', got {value!r}")
+    elif kind is None and isinstance(value, str):
+        # Without a known column, string bounds are only meaningful as timestamps
+        try:
+            to_timestamp(value)
+        except ValueError:
+            raise ValueError(f"{op} expects a number or ISO-8601 timestamp for field '{field}', got {value!r}")
+
+
+def validate_filter(
+    where: Dict[str, Any],
+    time_fields: Iterable[str] = TIME_FIELDS,
+    kinds: Optional[Dict[str, str]] = None
+) -> None:
+    """
+    Check a metadata filter.
+
+    A filter maps fields to conditions, all of which must hold. A condition
+    is a value (equality), a list (any of its values), or a dict of
+    operators: `$eq`, `$ne`, `$in`, `$nin`, `$gt`, `$gte`, `$lt`, `$lte`.
+    `{"$and": [...]}` and `{"$or": [...]}` combine nested filters.
+
+    Range bounds must suit the field: ISO-8601 timestamps for time fields,
+    numbers for numeric columns (when `kinds` is given).
+
+    Args:
+        where: Filter to check
+        time_fields: Fields holding ISO-8601 timestamps
+        kinds: Column kind ("number", "time" or "category") per field, if known
+
+    Raises:
+        ValueError: If the filter is malformed
+    """
+    kinds = kinds or {}
+    if not isinstance(where, dict):
+        raise ValueError(f"Filter must be an object, got {type(where).__name__}")
+    for key, condition in where.items():
+        if key in LOGICAL_OPERATORS:
+            if not isinstance(condition, list) or not condition:
+                raise ValueError(f"{key} expects a non-empty list of filters")
+            for clause in condition:
+                validate_filter(clause, time_fields, kinds)
+        elif key.startswith("$"):
+            raise ValueError(f"Unknown logical operator {key}")
+        elif isinstance(condition, dict):
+            if not condition:
+                raise ValueError(f"Empty condition for field '{key}'")
+            for op, value in condition.items():
+                if op not in OPERATORS:
+                    raise ValueError(f"Unknown operator {op} for field '{key}'")
+                if op in SET_OPERATORS and not isinstance(value, list):
+                    raise ValueError(f"{op} expects a list for field '{key}'")
+                if op in RANGE_OPERATORS:
+                    _check_range_bound(key, op, value, time_fields, kinds.get(key))
+
+
+def to_timestamp(value: Any) -> int:
+    """
+    Microseconds since the epoch of an ISO-8601 timestamp.
+
+    Naive timestamps (as stored by `ChromaManager`) are taken as they are;
+    aware ones are converted to UTC first.
+
+    Raises:
+        ValueError: If the value is not an ISO-8601 string or datetime
+    """
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if not isinstance(value, datetime):
+        raise ValueError(f"Expected an ISO-8601 timestamp, got {value!r}")
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    delta = value - datetime(1970, 1, 1)
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def compare_value(value: Any, op: str, bound: Any) -> bool:
+    """Evaluate a range operator on one metadata value (missing or incomparable values never match)."""
+    if value is None:
+        return False
+    try:
+        return {
+            "$gt": value > bound,
+            "$gte": value >= bound,
+            "$lt": value < bound,
+            "$lte": value <= bound
+        }[op]
+    except TypeError:
+        return False
+
+
+class _Column:
+    """One typed column: "number" (float64), "time" (int64 microseconds) or "category" (int32 codes)."""
+
+    def __init__(self, kind: str, capacity: int):
+        self.kind = kind
+        if kind == "number":
+            self.data = np.full(capacity, np.nan)
+        elif kind == "time":
+            self.data = np.full(capacity, _NO_TIME, dtype=np.int64)
+        else:
+            self.data = np.full(capacity, -1, dtype=np.int32)
+            self.codes: Dict[Any, int] = {}
+
+    def grow(self, capacity: int) -> None:
+        grown = np.full(capacity, self.missing, dtype=self.data.dtype)
+        grown[:len(self.data)] = self.data
+        self.data = grown
+
+    @property
+    def missing(self):
+        return {"number": np.nan, "time": _NO_TIME, "category": -1}[self.kind]
+
+    def encode(self, value: Any) -> Any:
+        """Storage value of a metadata value (raises ValueError/TypeError if it does not fit the column)."""
+        if self.kind == "number":
+            if not _is_number(value):
+                raise TypeError(value)
+            return value
+        if self.kind == "time":
+            return to_timestamp(value)
+        if not isinstance(value, (str, bool)):
+            raise TypeError(value)
+        return self.codes.setdefault(value, len(self.codes))
+
+    def equals(self, values: List[Any], size: int) -> np.ndarray:
+        """Rows holding any of the values."""
+        data = self.data[:size]
+        if self.kind == "category":
+            codes = [self.codes[v] for v in values if isinstance(v, (str, bool)) and v in self.codes]
+            return np.isin(data, codes)
+        if self.kind == "time":
+            stamps = []
+            for v in values:
+                try:
+                    stamps.append(to_timestamp(v))
+                except (TypeError, ValueError):
+                    pass
+            return np.isin(data, stamps)
+        return np.isin(data, [v for v in values if _is_number(v)])
+
+    def compare(self, op: str, value: Any, size: int) -> np.ndarray:
+        """Rows whose value satisfies a range operator (missing values never do)."""
+        data = self.data[:size]
+        if self.kind == "time":
+            bound = to_timestamp(value)
+        elif _is_number(value):
+            bound = value
+        else:
+            raise ValueError(f"{op} expects a number, got {value!r}")
+        mask = {
+            "$gt": data > bound,
+            "$gte": data >= bound,
+            "$lt": data < bound,
+            "$lte": data <= bound
+        }[op]
+        if self.kind == "time":
+            mask &= data != _NO_TIME
+        return mask
+
+
+class MetadataColumns:
+    """
+    Scalar metadata fields stored column-wise in NumPy arrays.
+
+    The type of each column follows the first value seen: numbers become
+    float64, `time_fields` int64 microseconds, strings and booleans int32
+    category codes. A field that later receives a value of another type
+    (or a list/dict) loses its column, and filters on it scan the metadata
+    instead. Filters on columns are evaluated as vectorized masks.
+    """
+
+    def __init__(self, time_fields: Iterable[str] = ("timestamp",), skip_fields: Iterable[str] = ()):
+        """
+        Initialize empty columns.
+
+        Args:
+            time_fields: Fields holding ISO-8601 timestamps
+            skip_fields: Fields never stored as columns (e.g. tag strings)
+        """
+        self.time_fields = tuple(time_fields)
+        self.skip_fields = set(skip_fields)
+        self._capacity = 0
+        self._columns: Dict[str, _Column] = {}
+        self._mixed: set = set()
+
+    def clear(self) -> None:
+        """Drop every column."""
+        self._capacity = 0
+        self._columns = {}
+        self._mixed = set()
+
+    def kinds(self) -> Dict[str, str]:
+        """Column kind per field that has a column."""
+        return {field: column.kind for field, column in self._columns.items()}
+
+    def column(self, field: str) -> Optional[_Column]:
+        """The column of a field, or None when filters on it must scan the metadata."""
+        return self._columns.get(field)
+
+    def _grow(self, rows: int) -> None:
+        self._capacity = max(rows, 2 * self._capacity, _INITIAL_CAPACITY)
+        for column in self._columns.values():
+            column.grow(self._capacity)
+
+    def add(self, row: int, metadata: Dict[str, Any]) -> None:
+        """Write a row's metadata values into the columns."""
+        if row >= self._capacity:
+            self._grow(row + 1)
+        for field, value in metadata.items():
+            if value is None or field in self.skip_fields or field in self._mixed:
+                continue
+            column = self._columns.get(field)
+            if column is None:
+                if field in self.time_fields:
+                    kind = "time"
+                elif _is_number(value):
+                    kind = "number"
+                else:
+                    kind = "category"
+                column = self._columns[field] = _Column(kind, self._capacity)
+            try:
+                column.data[row] = column.encode(value)
+            except (TypeError, ValueError):
+                del self._columns[field]
+                self._mixed.add(field)
+
+    def rebuild(self, metadatas: List[Dict[str, Any]]) -> None:
+        """Re-build every column from scratch (after rows were renumbered)."""
+        self.clear()
+        if len(metadatas):
+            self._grow(len(metadatas))
+        for row, metadata in enumerate(metadatas):
+            self.add(row, metadata)
@@ -0,0 +1,142 @@
+"""Inverted index from metadata values to sorted row-id lists of the vector store."""
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+
+# Slots of a new posting list; its buffer doubles when full
+_INITIAL_POSTINGS = 8
+
+
+def split_tags(value: Any) -> List[str]:
+    """Tags of a metadata value (stored as a comma-separated string)."""
+    if isinstance(value, str):
+        return [tag.strip() for tag in value.split(",") if tag.strip()]
+    if isinstance(value, (list, tuple)):
+        return [str(tag).strip() for tag in value if str(tag).strip()]
+    return []
+
+
+class _Postings:
+    """Sorted int32 row ids of one indexed value, in a buffer with spare room."""
+
+    def __init__(self):
+        self.buffer = np.empty(_INITIAL_POSTINGS, dtype=np.int32)
+        self.size = 0
+
+    @property
+    def rows(self) -> np.ndarray:
+        return self.buffer[:self.size]
+
+    def add(self, row: int) -> None:
+        # Rows are appended in increasing order; anything else is inserted in place
+        if self.size and self.buffer[self.size - 1] >= row:
+            pos = int(np.searchsorted(self.rows, row))
+            if self.buffer[pos] == row:
+                return
+        else:
+            pos = self.size
+        if self.size == len(self.buffer):
+            grown = np.empty(2 * len(self.buffer), dtype=np.int32)
+            grown[:self.size] = self.rows
+            self.buffer = grown
+        self.buffer[pos + 1:self.size + 1] = self.buffer[pos:self.size]
+        self.buffer[pos] = row
+        self.size += 1
+
+    def remove(self, row: int) -> None:
+        pos = int(np.searchsorted(self.rows, row))
+        if pos < self.size and self.buffer[pos] == row:
+            self.buffer[pos:self.size - 1] = self.buffer[pos + 1:self.size]
+            self.size -= 1
+
+
+class MetadataIndex:
+    """
+    Maps each value of selected metadata fields to the sorted ids of its rows.
+
+    Scalar fields (e.g. "agent") index the row under its value; tag fields
+    (e.g. "tags") index it under every tag of the comma-separated string.
+    Only live rows are listed, so a filter is an OR of the row lists of the
+    requested values, ANDed across fields, without touching any metadata.
+    Memory grows with the number of (row, value) pairs, not with the number
+    of rows times the number of distinct values.
+    """
+
+    def __init__(self, fields: Iterable[str] = ("agent",), tag_fields: Iterable[str] = ("tags",)):
+        """
+        Initialize an empty index.
+
+        Args:
+            fields: Scalar metadata fields to index
+            tag_fields: Comma-separated tag fields to index per tag
+        """
+        self.fields = tuple(fields)
+        self.tag_fields = tuple(tag_fields)
+        self._postings: Dict[str, Dict[Any, _Postings]] = {}
+        self.clear()
+
+    def clear(self) -> None:
+        """Drop every row list."""
+        self._postings = {field: {} for field in self.fields + self.tag_fields}
+
+    def indexes(self, field: str) -> bool:
+        """Whether filters on this field can be answered from the index."""
+        return field in self._postings
+
+    def _keys(self, field: str, metadata: Dict[str, Any]) -> List[Any]:
+        value = metadata.get(field)
+        if field in self.tag_fields:
+            return split_tags(value)
+        if isinstance(value, (str, int, float, bool)):
+            return [value]
+        return []
+
+    def add(self, row: int, metadata: Dict[str, Any]) -> None:
+        """List the row under its metadata values."""
+        for field, postings in self._postings.items():
+            for key in self._keys(field, metadata):
+                rows = postings.get(key)
+                if rows is None:
+                    rows = postings[key] = _Postings()
+                rows.add(row)
+
+    def remove(self, row: int, metadata: Dict[str, Any]) -> None:
+        """Drop a deleted row from the lists of its metadata values."""
+        for field, postings in self._postings.items():
+            for key in self._keys(field, metadata):
+                if key in postings:
+                    postings[key].remove(row)
+
+    def rebuild(self, metadatas: List[Dict[str, Any]], live: np.ndarray) -> None:
+        """
+        Re-index from scratch (after rows were renumbered).
+
+        Args:
+            metadatas: Metadata of every row
+            live: Boolean mask of the rows to index
+        """
+        self.clear()
+        for row in np.flatnonzero(live).tolist():
+            self.add(row, metadatas[row])
+
+    def lookup(self, field: str, values: List[Any], size: int) -> np.ndarray:
+        """
+        Rows whose field holds any of the values.
+
+        Args:
+            field: Indexed field
+            values: Accepted values (tags, for tag fields)
+            size: Number of rows in the store
+
+        Returns:
+            Boolean mask of length `size` (a new array)
+        """
+        mask = np.zeros(size, dtype=bool)
+        postings = self._postings[field]
+        for value in values:
+            key = value.strip() if field in self.tag_fields and isinstance(value, str) else value
+            rows = postings.get(key)
+            if rows is not None:
+                ids = rows.rows
+                mask[ids[:np.searchsorted(ids, size)]] = True
+        return mask
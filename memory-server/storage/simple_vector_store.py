@@ -1,30 +1,165 @@
-"""Simple in-memory vector store using scikit-learn for testing."""
+"""Simple in-memory vector store with cosine similarity search."""
 import numpy as np
-from typing import List, Dict, Any, Optional, Tuple
-from sklearn.metrics.pairwise import cosine_similarity
+from typing import List, Dict, Any, Optional, Tuple, Union
 import json
 import os
-from datetime import datetime
+from .vector_log import VectorLog, migrate_legacy_json
+from .ivf_index import IVFIndex
+from .metadata_index import MetadataIndex
+from .metadata_columns import MetadataColumns, compare_value, validate_filter
+
+# Rows allocated for the first insert; capacity doubles when full
+_INITIAL_CAPACITY = 256
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first (partitions, then sorts only those k)."""
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    if k < len(scores):
+        top = np.argpartition(-scores, k - 1)[:k]
+        return top[np.argsort(-scores[top], kind="stable")]
+    return np.argsort(-scores, kind="stable")
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize the rows of a float32 matrix in place (zero rows stay zero)."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix /= norms
+    return matrix
 
 
 class SimpleVectorStore:
-    """Simple in-memory vector store with cosine similarity search."""
+    """
+    Simple in-memory vector store with cosine similarity search.
+
+    Vectors live in one preallocated float32 matrix whose rows are
+    L2-normalized on insert, so a search is a single dot product against
+    the stored rows without copying or re-normalizing them.
+
+    Ids map to rows through a dict. Deleted and replaced rows are
+    tombstoned (skipped by every read) and reclaimed by `compact()`, which
+    runs automatically once the tombstoned share of rows exceeds
+    `compact_threshold`.
 
-    def __init__(self, persist_file: str = None):
+    Persistence appends each write to a `VectorLog` (raw float32 rows plus
+    a JSONL operation log) instead of rewriting the whole store. Opening a
+    persisted store only reads its manifest: counts and dimension come from
+    there, and the vector file is memory-mapped and the log replayed on the
+    first operation that needs entries.
+
+    Filters on the `index_fields` and `tag_fields` of the metadata are
+    answered from a `MetadataIndex` of sorted row-id lists; other scalar fields are
+    kept in typed `MetadataColumns` so range and set conditions are
+    vectorized. Both are kept up to date on every write and rebuilt when
+    the log is replayed.
+
+    With `ivf_min_rows` set, stores of at least that many rows are searched
+    through an `IVFIndex` (probing `ivf_nprobe` lists per query); smaller
+    stores, and filtered queries the probed lists cannot satisfy, use
+    exact search.
+    """
+
+    def __init__(
+        self,
+        persist_dir: str = None,
+        compact_threshold: float = 0.25,
+        legacy_file: str = None,
+        fsync: bool = True,
+        model: str = None,
+        ivf_min_rows: Optional[int] = None,
+        ivf_nprobe: int = 8,
+        ivf_lists: int = 0,
+        index_fields: Tuple[str, ...] = ("agent",),
+        tag_fields: Tuple[str, ...] = ("tags",),
+        time_fields: Tuple[str, ...] = ("timestamp",)
+    ):
         """
         Initialize the vector store.
 
         Args:
-            persist_file: Optional file path to persist/load data
+            persist_dir: Optional directory to persist/load data
+            compact_threshold: Tombstoned fraction of rows that triggers compaction
+            legacy_file: Old `vector_store.json` to migrate when persist_dir holds no store yet
+            fsync: Flush every write to disk before returning
+            model: Embedding model of the vectors (recorded in the manifest)
+            ivf_min_rows: Row count from which the IVF index is used (None disables it)
+            ivf_nprobe: Lists scanned per query by the IVF index
+            ivf_lists: Number of IVF lists (0 = about sqrt(rows))
+            index_fields: Metadata fields whose values get row-id lists
+            tag_fields: Comma-separated metadata fields indexed per tag
+            time_fields: ISO-8601 timestamp fields, compared as points in time
         """
-        self.vectors: List[List[float]] = []
+        self._matrix: Optional[np.ndarray] = None
+        self._deleted = np.zeros(0, dtype=bool)
+        self._size = 0
+        self._row_of: Dict[str, int] = {}
         self.documents: List[str] = []
         self.metadatas: List[Dict[str, Any]] = []
         self.ids: List[str] = []
-        self.persist_file = persist_file
+        self._live_rows = 0
+        self._live_entries = 0
+        self._chunk_rows = 0
+        self._parents: Optional[np.ndarray] = None
+        self._index = MetadataIndex(index_fields, tag_fields)
+        self._columns = MetadataColumns(time_fields, skip_fields=tag_fields)
+        self.persist_dir = persist_dir
+        self.compact_threshold = compact_threshold
+        self.model = model
+        self._log: Optional[VectorLog] = None
+        self._loaded = True
+        self.ivf_min_rows = ivf_min_rows
+        self.ivf_nprobe = ivf_nprobe
+        self.ivf_lists = ivf_lists
+        self._ivf: Optional[IVFIndex] = None
+        self._ivf_saved_rows = 0
+
+        if persist_dir:
+            if legacy_file and os.path.exists(legacy_file) and not VectorLog(persist_dir).exists():
+                migrated = migrate_legacy_json(legacy_file, persist_dir)
+                print(f"📦 Migrated {migrated} entries from {legacy_file} to {persist_dir}")
+            self._log = VectorLog(persist_dir, fsync=fsync)
+            if self._log.exists():
+                stored_model = self._log.manifest.get("model")
+                if model and stored_model and stored_model != model:
+                    print(f"⚠️  Vector store was built with embedding model '{stored_model}', now embedding with '{model}'")
+                self.model = model or stored_model
+                self._loaded = False
+            else:
+                self._snapshot()
 
-        if persist_file and os.path.exists(persist_file):
-            self._load_from_file()
+    @property
+    def vectors(self) -> np.ndarray:
+        """Stored unit-length vectors, one row per entry (a view, not a copy)."""
+        self._ensure_loaded()
+        if self._matrix is None:
+            return np.empty((0, 0), dtype=np.float32)
+        return self._matrix[:self._size]
+
+    @property
+    def dimension(self) -> Optional[int]:
+        """Embedding dimension, fixed by the first insert."""
+        if not self._loaded:
+            return self._log.dimension
+        return None if self._matrix is None else self._matrix.shape[1]
+
+    def _reserve(self, rows: int, dim: int) -> None:
+        """Make room for `rows` more vectors, growing capacity geometrically (and off the memory map)."""
+        if self._matrix is None:
+            self._matrix = np.zeros((max(_INITIAL_CAPACITY, rows), dim), dtype=np.float32)
+            self._deleted = np.zeros(len(self._matrix), dtype=bool)
+            return
+        if dim != self._matrix.shape[1]:
+            raise ValueError(f"Embedding dimension {dim} does not match store dimension {self._matrix.shape[1]}")
+        needed = self._size + rows
+        if needed > len(self._matrix) or not self._matrix.flags.writeable:
+            grown = np.zeros((max(needed, 2 * len(self._matrix)), dim), dtype=np.float32)
+            grown[:self._size] = self._matrix[:self._size]
+            self._matrix = grown
+            deleted = np.zeros(len(grown), dtype=bool)
+            deleted[:self._size] = self._deleted[:self._size]
+            self._deleted = deleted
 
     def add(
         self,
@@ -34,22 +169,204 @@ class SimpleVectorStore:
         metadatas: List[Dict[str, Any]]
     ) -> None:
         """Add vectors, documents, and metadata to the store."""
-        for i, (id_val, embedding, document, metadata) in enumerate(zip(ids, embeddings, documents, metadatas)):
-            if id_val in self.ids:
-                # Update existing
-                idx = self.ids.index(id_val)
-                self.vectors[idx] = embedding
-                self.documents[idx] = document
-                self.metadatas[idx] = metadata
-            else:
-                # Add new
-                self.ids.append(id_val)
-                self.vectors.append(embedding)
-                self.documents.append(document)
-                self.metadatas.append(metadata)
+        if not ids:
+            return
+        self._ensure_loaded()
+        vectors = _normalize_rows(np.array(embeddings, dtype=np.float32).reshape(len(ids), -1))
+        self._reserve(len(ids), vectors.shape[1])
+
+        records = []
+        for id_val, vector, document, metadata in zip(ids, vectors, documents, metadatas):
+            idx, replaced_chunks = self._insert(id_val, document, metadata)
+            self._matrix[idx] = vector
+            if replaced_chunks:
+                records.append({"op": "delete", "rows": replaced_chunks})
+            records.append({"op": "add", "row": idx, "id": id_val, "document": document, "metadata": metadata})
+
+        if self._log:
+            self._persist(vectors, records)
+        self._update_index(vectors)
+        if self.tombstone_ratio() > self.compact_threshold:
+            self.compact()
+
+    def _update_index(self, new_vectors: np.ndarray) -> None:
+        """Index appended rows, (re)training the IVF index when the store outgrew it."""
+        if self.ivf_min_rows is None or self._size < self.ivf_min_rows:
+            return
+        if self._ivf is None or self._ivf.needs_retraining(self._size) or \
+                self._ivf.rows != self._size - len(new_vectors):
+            self._ivf = IVFIndex(n_lists=self.ivf_lists, nprobe=self.ivf_nprobe)
+            self._ivf.train(self.vectors)
+        else:
+            self._ivf.add(new_vectors)
+
+        # Rows indexed after the last save are assigned again on load; keep that share small
+        if self._log and self._ivf.rows - self._ivf_saved_rows > self._ivf_saved_rows // 4:
+            self._save_index()
+
+    def _save_index(self) -> None:
+        self._log.save_index(self._ivf.to_arrays())
+        self._ivf_saved_rows = self._ivf.rows
+
+    def _insert(self, id_val: str, document: str, metadata: Dict[str, Any]) -> Tuple[int, List[int]]:
+        """
+        Append an entry row, replacing an existing id together with its chunk rows.
+
+        Returns:
+            Row index of the entry and the chunk rows of the replaced entry
+        """
+        replaced_chunks = []
+        if id_val in self._row_of:
+            old = self._row_of[id_val]
+            parent_rows = self._parent_rows()
+            if parent_rows is not None:
+                chunks = (parent_rows == old) & ~self._deleted[:self._size]
+                chunks[old] = False
+                replaced_chunks = np.flatnonzero(chunks).tolist()
+            for row in [old] + replaced_chunks:
+                self._tombstone(row)
+        idx = self._size
+        self._size += 1
+        self._row_of[id_val] = idx
+        self.ids.append(id_val)
+        self.documents.append(document)
+        self.metadatas.append(metadata)
+        self._index.add(idx, metadata)
+        self._columns.add(idx, metadata)
+        self._live_rows += 1
+        if "parent_id" not in metadata:
+            self._live_entries += 1
+        else:
+            self._chunk_rows += 1
+        self._parents = None
+        return idx, replaced_chunks
+
+    def _tombstone(self, row: int) -> None:
+        """Mark a row deleted."""
+        if self._deleted[row]:
+            return
+        self._deleted[row] = True
+        self._index.remove(row, self.metadatas[row])
+        self._live_rows -= 1
+        if "parent_id" not in self.metadatas[row]:
+            self._live_entries -= 1
+        if self._row_of.get(self.ids[row]) == row:
+            del self._row_of[self.ids[row]]
+        self._parents = None
+
+    def clear(self) -> int:
+        """
+        Remove every entry (and persist the empty store).
+
+        Returns:
+            Number of entries removed (chunk rows not included)
+        """
+        removed = self.count()
+        self._matrix = None
+        self._deleted = np.zeros(0, dtype=bool)
+        self._size = 0
+        self._row_of = {}
+        self.documents = []
+        self.metadatas = []
+        self.ids = []
+        self._live_rows = 0
+        self._live_entries = 0
+        self._chunk_rows = 0
+        self._parents = None
+        self._index.clear()
+        self._columns.clear()
+        self._loaded = True
+        self._ivf = None
+        self._ivf_saved_rows = 0
+
+        if self._log:
+            self._snapshot()
+        return removed
+
+    def delete(
+        self,
+        ids: Optional[List[str]] = None,
+        where: Optional[Dict[str, Any]] = None
+    ) -> int:
+        """
+        Delete entries by id and/or metadata filter.
+
+        Chunk rows of a deleted entry are deleted with it.
+
+        Args:
+            ids: Entry ids to delete (unknown ids are ignored)
+            where: Delete every entry whose metadata matches this filter
+
+        Returns:
+            Number of entries deleted (chunk rows not included)
+        """
+        self._ensure_loaded()
+        rows = {self._row_of[id_val] for id_val in ids or [] if id_val in self._row_of}
+        if where:
+            rows.update(np.flatnonzero(self._where_mask(where, ~self._deleted[:self._size])).tolist())
+        if not rows:
+            return 0
+
+        parent_rows = self._parent_rows()
+        if parent_rows is not None:
+            chunks = np.isin(parent_rows, list(rows)) & ~self._deleted[:self._size]
+            rows.update(np.flatnonzero(chunks).tolist())
+
+        deleted = 0
+        for i in rows:
+            self._tombstone(i)
+            if "parent_id" not in self.metadatas[i]:
+                deleted += 1
 
-        if self.persist_file:
-            self._save_to_file()
+        if self.tombstone_ratio() > self.compact_threshold:
+            self.compact()
+        elif self._log:
+            self._persist(None, [{"op": "delete", "rows": sorted(rows)}])
+        return deleted
+
+    def tombstone_ratio(self) -> float:
+        """Fraction of allocated rows that are deleted but not yet reclaimed."""
+        if not self._loaded:
+            manifest = self._log.manifest
+            rows = manifest.get("rows", 0)
+            return (rows - manifest.get("vectors", 0)) / rows if rows else 0.0
+        return (self._size - self._live_rows) / self._size if self._size else 0.0
+
+    def compact(self) -> int:
+        """
+        Rewrite the matrix and entry lists without tombstoned rows.
+
+        Returns:
+            Number of rows reclaimed
+        """
+        self._ensure_loaded()
+        live = np.flatnonzero(~self._deleted[:self._size])
+        reclaimed = self._size - len(live)
+        if reclaimed:
+            matrix = self._matrix[live]
+            rows = live.tolist()
+            self.ids = [self.ids[i] for i in rows]
+            self.documents = [self.documents[i] for i in rows]
+            self.metadatas = [self.metadatas[i] for i in rows]
+            self._row_of = {id_val: i for i, id_val in enumerate(self.ids)}
+            self._chunk_rows = sum("parent_id" in metadata for metadata in self.metadatas)
+            self._parents = None
+            self._index.rebuild(self.metadatas, np.ones(len(self.metadatas), dtype=bool))
+            self._columns.rebuild(self.metadatas)
+            self._matrix = None
+            self._size = 0
+            if len(matrix):
+                self._reserve(len(matrix), matrix.shape[1])
+                self._matrix[:len(matrix)] = matrix
+                self._size = len(matrix)
+            if self._ivf is not None:
+                self._ivf.remap(live)
+
+        if reclaimed and self._log:
+            self._snapshot()
+            if self._ivf is not None:
+                self._save_index()
+        return reclaimed
 
     def query(
         self,
@@ -68,72 +385,230 @@ class SimpleVectorStore:
         Returns:
             Dict with ids, documents, metadatas, and distances
         """
-        if not self.vectors:
+        results = self.query_many([query_embeddings], n_results=n_results, wheres=[where])
+        if not results["ids"][0]:
             return {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        return results
 
-        query_vector = np.array(query_embeddings)
-        stored_vectors = np.array(self.vectors)
+    def query_many(
+        self,
+        query_embeddings: Union[np.ndarray, List[List[float]]],
+        n_results: Union[int, List[int]] = 5,
+        wheres: Optional[List[Optional[Dict[str, Any]]]] = None,
+        aggregate: str = "max"
+    ) -> Dict[str, List]:
+        """
+        Query the vector store with several vectors at once.
 
-        # Calculate cosine similarities
-        similarities = cosine_similarity([query_vector], stored_vectors)[0]
+        Metadata filters are applied first as row masks (each distinct
+        filter is evaluated once), so only candidate rows are scored. When
+        the candidates of the batch add up to about a pass over the store,
+        all queries with more than a sliver of it are scored in one
+        matrix-matrix product against the whole matrix; otherwise each
+        query scores just its rows. Top-k selection partitions the scores
+        and sorts only the k best. Chunk rows (metadata with a "parent_id")
+        are scored together with their parent entry and only the parent is
+        returned.
 
-        # Apply metadata filter if provided
-        if where:
-            filtered_indices = []
-            for i, metadata in enumerate(self.metadatas):
-                if all(metadata.get(k) == v for k, v in where.items()):
-                    filtered_indices.append(i)
-        else:
-            filtered_indices = list(range(len(self.vectors)))
+        Args:
+            query_embeddings: Q x D matrix of query embeddings (array or list of vectors)
+            n_results: Number of results to return, for all queries or per query
+            wheres: Optional metadata filter per query
+            aggregate: How chunk similarities combine per parent ("max" or "mean")
 
-        if not filtered_indices:
-            return {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        Returns:
+            Dict with ids, documents, metadatas, and distances, each holding
+            one list per query
+        """
+        self._ensure_loaded()
+        wheres = wheres or [None] * len(query_embeddings)
+        results = {"ids": [], "documents": [], "metadatas": [], "distances": []}
 
-        # Sort by similarity and get top results
-        filtered_similarities = similarities[filtered_indices]
-        sorted_indices = np.argsort(filtered_similarities)[::-1]  # Sort descending
+        if not self._size or not len(query_embeddings):
+            for _ in query_embeddings:
+                for key in results:
+                    results[key].append([])
+            return results
 
-        top_indices = sorted_indices[:n_results]
-        result_indices = [filtered_indices[i] for i in top_indices]
+        queries = _normalize_rows(np.array(query_embeddings, dtype=np.float32).reshape(len(query_embeddings), -1))
+        ks = [n_results] * len(queries) if isinstance(n_results, int) else list(n_results)
+        parent_rows = self._parent_rows()
+        live_mask = ~self._deleted[:self._size]
+        live_rows = np.flatnonzero(live_mask)
+        probed = self._ivf.candidates(queries, self.ivf_nprobe) if self.use_index else [None] * len(queries)
 
-        # Convert similarities to distances (1 - similarity)
-        distances = [1.0 - similarities[i] for i in result_indices]
+        # Filter first: each query only scores the rows its filter (and probed lists) allow
+        filtered: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        candidate_rows = []
+        for where, probe, k in zip(wheres, probed, ks):
+            if where:
+                key = json.dumps(where, sort_keys=True, default=str)
+                if key not in filtered:
+                    mask = self._where_mask(where, live_mask)
+                    filtered[key] = (mask, np.flatnonzero(mask))
+                mask, rows = filtered[key]
+            else:
+                mask, rows = live_mask, live_rows
+            if probe is not None:
+                # Fall back to exact search if the probed lists hold too few matches
+                probed_rows = probe[mask[probe]]
+                if len(probed_rows) >= min(k, len(rows)):
+                    rows = probed_rows
+            candidate_rows.append(rows)
 
-        return {
-            "ids": [[self.ids[i] for i in result_indices]],
-            "documents": [[self.documents[i] for i in result_indices]],
-            "metadatas": [[self.metadatas[i] for i in result_indices]],
-            "distances": [distances]
-        }
+        # One product with the whole matrix costs about a pass over it (plus little per extra query);
+        # scoring a query's rows alone costs about a pass over those rows
+        total = sum(len(rows) for rows in candidate_rows)
+        shared = total > self._size or any(len(rows) > self._size // 2 for rows in candidate_rows)
+        broad = [q for q, rows in enumerate(candidate_rows) if shared and len(rows) > self._size // 64]
+        broad_scores = {}
+        if broad:
+            # Stored rows are unit length, so the product gives cosine similarities
+            broad_scores = dict(zip(broad, queries[broad] @ self.vectors.T))
+
+        for q, rows in enumerate(candidate_rows):
+            if q in broad_scores:
+                scores = broad_scores[q][rows]
+            else:
+                scores = self.vectors[rows] @ queries[q]
+
+            candidates = rows
+            if parent_rows is not None and len(candidates):
+                # Combine chunk scores per parent entry
+                candidates, inverse = np.unique(parent_rows[rows], return_inverse=True)
+                if aggregate == "mean":
+                    scores = np.bincount(inverse, weights=scores) / np.bincount(inverse)
+                else:
+                    best = np.full(len(candidates), -np.inf)
+                    np.maximum.at(best, inverse, scores)
+                    scores = best
+
+            order = _top_k(scores, ks[q])
+            result_indices = candidates[order].tolist()
+
+            results["ids"].append([self.ids[i] for i in result_indices])
+            results["documents"].append([self.documents[i] for i in result_indices])
+            results["metadatas"].append([self.metadatas[i] for i in result_indices])
+            # Convert similarities to distances (1 - similarity)
+            results["distances"].append([1.0 - float(scores[k]) for k in order])
+
+        return results
+
+    def validate_filter(self, where: Dict[str, Any]) -> None:
+        """
+        Check a metadata filter against the store's columns.
+
+        Range bounds must match the column type of their field (numbers for
+        numeric fields, ISO-8601 timestamps for time fields).
+
+        Raises:
+            ValueError: If the filter is malformed
+        """
+        self._ensure_loaded()
+        validate_filter(where, self._columns.time_fields, self._columns.kinds())
+
+    def _where_mask(self, where: Dict[str, Any], live_mask: np.ndarray) -> np.ndarray:
+        """
+        Boolean mask of the live rows matching a metadata filter.
+
+        See `validate_filter` for the filter language. A list value matches
+        any of its elements; on tag fields a value matches entries carrying
+        that tag.
+
+        Raises:
+            ValueError: If the filter is malformed
+        """
+        self.validate_filter(where)
+        return self._filter_mask(where) & live_mask
+
+    def _filter_mask(self, where: Dict[str, Any]) -> np.ndarray:
+        mask = np.ones(self._size, dtype=bool)
+        for key, condition in where.items():
+            if key == "$and":
+                for clause in condition:
+                    mask &= self._filter_mask(clause)
+            elif key == "$or":
+                mask &= np.logical_or.reduce([self._filter_mask(clause) for clause in condition])
+            elif isinstance(condition, dict):
+                for op, value in condition.items():
+                    mask &= self._condition_mask(key, op, value)
+            elif isinstance(condition, (list, tuple, set)):
+                mask &= self._condition_mask(key, "$in", list(condition))
+            else:
+                mask &= self._condition_mask(key, "$eq", condition)
+        return mask
+
+    def _condition_mask(self, field: str, op: str, value: Any) -> np.ndarray:
+        """
+        Rows satisfying one operator on one field.
+
+        Equality and set operators use the metadata index or the field's
+        column; range operators use numeric and timestamp columns. Fields
+        without a suitable column are scanned.
+        """
+        if op in ("$eq", "$ne", "$in", "$nin"):
+            values = value if op in ("$in", "$nin") else [value]
+            column = self._columns.column(field)
+            if self._index.indexes(field):
+                matched = self._index.lookup(field, values, self._size)
+            elif column is not None:
+                matched = column.equals(values, self._size)
+            else:
+                matched = np.fromiter(
+                    (metadata.get(field) in values for metadata in self.metadatas), dtype=bool, count=self._size
+                )
+            return ~matched if op in ("$ne", "$nin") else matched
+
+        if field in self._index.tag_fields:
+            raise ValueError(f"{op} is not supported on tag field '{field}'")
+        column = self._columns.column(field)
+        if column is not None and column.kind != "category":
+            return column.compare(op, value, self._size)
+        return np.fromiter(
+            (compare_value(metadata.get(field), op, value) for metadata in self.metadatas), dtype=bool, count=self._size
+        )
+
+    @property
+    def use_index(self) -> bool:
+        """Whether queries currently go through the IVF index."""
+        if not self._loaded:
+            return self.ivf_min_rows is not None and self._log.manifest.get("rows", 0) >= self.ivf_min_rows
+        return self._ivf is not None and self._ivf.ready and self._size >= (self.ivf_min_rows or 0)
+
+    def _parent_rows(self) -> Optional[np.ndarray]:
+        """Row index of each row's parent entry (itself for non-chunk rows), or None without chunks."""
+        if not self._chunk_rows:
+            return None
+        if self._parents is None:
+            self._parents = np.array([
+                self._row_of.get(metadata.get("parent_id"), i) for i, metadata in enumerate(self.metadatas)
+            ], dtype=np.int64)
+        return self._parents
 
     def get(
         self,
         where: Optional[Dict[str, Any]] = None,
         limit: int = 10
     ) -> Dict[str, List]:
-        """Get entries by metadata filter."""
-        if not where:
-            # Return all entries up to limit
-            end_idx = min(limit, len(self.ids))
-            return {
-                "ids": self.ids[:end_idx],
-                "documents": self.documents[:end_idx],
-                "metadatas": self.metadatas[:end_idx]
-            }
+        """Get entries by metadata filter (chunk rows are not returned)."""
+        self._ensure_loaded()
+        live_mask = ~self._deleted[:self._size]
+        mask = self._where_mask(where, live_mask) if where else live_mask
 
         # Filter by metadata
         filtered_ids = []
         filtered_documents = []
         filtered_metadatas = []
 
-        for i, metadata in enumerate(self.metadatas):
-            if all(metadata.get(k) == v for k, v in where.items()):
-                filtered_ids.append(self.ids[i])
-                filtered_documents.append(self.documents[i])
-                filtered_metadatas.append(self.metadatas[i])
+        for i in np.flatnonzero(mask).tolist():
+            if "parent_id" in self.metadatas[i]:
+                continue
+            filtered_ids.append(self.ids[i])
+            filtered_documents.append(self.documents[i])
+            filtered_metadatas.append(self.metadatas[i])
 
-                if len(filtered_ids) >= limit:
-                    break
+            if len(filtered_ids) >= limit:
+                break
 
         return {
             "ids": filtered_ids,
@@ -142,39 +617,74 @@ class SimpleVectorStore:
         }
 
     def count(self) -> int:
-        """Return the number of entries in the store."""
-        return len(self.ids)
+        """Return the number of entries in the store (chunk rows not included)."""
+        if not self._loaded:
+            return self._log.manifest.get("count", 0)
+        return self._live_entries
 
-    def _save_to_file(self):
-        """Save data to file."""
-        if not self.persist_file:
-            return
+    def vector_count(self) -> int:
+        """Return the number of stored vectors, chunk rows included."""
+        if not self._loaded:
+            return self._log.manifest.get("vectors", 0)
+        return self._live_rows
 
-        data = {
-            "vectors": self.vectors,
-            "documents": self.documents,
-            "metadatas": self.metadatas,
-            "ids": self.ids,
-            "saved_at": datetime.now().isoformat()
-        }
+    def _persist(self, vectors: Optional[np.ndarray], records: List[Dict[str, Any]]):
+        """Append a write to the log (or rewrite the store if its files were deleted)."""
+        if self._log.exists():
+            self._log.append(vectors, records)
+            self._update_manifest()
+        else:
+            self._snapshot()
 
-        os.makedirs(os.path.dirname(self.persist_file), exist_ok=True)
-        with open(self.persist_file, 'w') as f:
-            json.dump(data, f, indent=2)
+    def _update_manifest(self):
+        """Record current counts (and model) in the manifest so opening the store can report them."""
+        self._log.update_manifest(
+            count=self._live_entries,
+            vectors=self._live_rows,
+            rows=self._size,
+            model=self.model
+        )
 
-    def _load_from_file(self):
-        """Load data from file."""
-        if not self.persist_file or not os.path.exists(self.persist_file):
+    def _snapshot(self):
+        """Write the live rows as a new log generation (replaces the files atomically)."""
+        live = np.flatnonzero(~self._deleted[:self._size]).tolist()
+        records = [
+            {"op": "add", "row": row, "id": self.ids[i], "document": self.documents[i], "metadata": self.metadatas[i]}
+            for row, i in enumerate(live)
+        ]
+        self._log.snapshot(self.vectors[live], records)
+        self._update_manifest()
+
+    def _ensure_loaded(self):
+        """Replay the log on first use of a persisted store."""
+        if self._loaded:
             return
+        self._loaded = True
+
+        # The memory-mapped rows are used as they are until the first insert
+        vectors, records = self._log.load()
+        if len(vectors):
+            self._matrix = vectors
+            self._deleted = np.zeros(len(vectors), dtype=bool)
 
-        try:
-            with open(self.persist_file, 'r') as f:
-                data = json.load(f)
+        for record in records:
+            if record["op"] == "add":
+                self._insert(record["id"], record["document"], record["metadata"])
+            elif record["op"] == "delete":
+                for row in record["rows"]:
+                    self._tombstone(row)
 
-            self.vectors = data.get("vectors", [])
-            self.documents = data.get("documents", [])
-            self.metadatas = data.get("metadatas", [])
-            self.ids = data.get("ids", [])
-        except Exception as e:
-            print(f"Error loading vector store from file: {e}")
+        manifest = self._log.manifest
+        if (manifest.get("count"), manifest.get("vectors"), manifest.get("rows")) != \
+                (self._live_entries, self._live_rows, self._size):
+            self._update_manifest()
 
+        if self.ivf_min_rows is not None and self._size >= self.ivf_min_rows:
+            arrays = self._log.load_index()
+            if arrays is not None and len(arrays["assignments"]) <= self._size:
+                self._ivf = IVFIndex.from_arrays(arrays, nprobe=self.ivf_nprobe)
+                self._ivf_saved_rows = self._ivf.rows
+                self._ivf.add(self.vectors[self._ivf.rows:])
+            else:
+                self._ivf = None
+            self._update_index(np.empty((0, self._matrix.shape[1]), dtype=np.float32))
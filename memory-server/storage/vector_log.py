@@ -0,0 +1,362 @@
+"""Append-only on-disk format of the vector store, and migration from the legacy JSON file."""
+import json
+import os
+import shutil
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+MANIFEST = "manifest.json"
+
+
+def _fsync_dir(path: str) -> None:
+    """Persist a rename inside `path` (no-op where directories cannot be opened)."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class VectorLog:
+    """
+    Files of a persisted vector store.
+
+    A store directory holds one generation of
+      - ``vectors.<gen>.f32``: raw float32 rows, appended in row order
+      - ``records.<gen>.jsonl``: one JSON line per operation ("add" of a
+        row with its id, document and metadata, or "delete" of rows); this
+        is the write-ahead log the in-memory state is replayed from
+      - ``ivf.<gen>.npz``: optional approximate-search index over the rows
+      - ``manifest.json``: current generation and vector dimension, plus
+        entry/vector/row counts and the embedding model so a store can be
+        described without reading the other files
+
+    Appends write the vector rows before the records that reference them,
+    so a crash leaves at most an unreferenced tail that `load()` trims.
+    Snapshots write a new generation and switch to it by atomically
+    replacing the manifest.
+    """
+
+    def __init__(self, path: str, fsync: bool = True):
+        """
+        Initialize the log.
+
+        Args:
+            path: Store directory
+            fsync: Flush every append to disk before returning
+        """
+        self.path = path
+        self.fsync = fsync
+        self.manifest: Dict[str, Any] = {"generation": 0, "dimension": None}
+        if self.exists():
+            with open(os.path.join(path, MANIFEST), "r") as f:
+                self.manifest.update(json.load(f))
+
+    def exists(self) -> bool:
+        """Whether the directory holds a store."""
+        return os.path.exists(os.path.join(self.path, MANIFEST))
+
+    @property
+    def dimension(self) -> Optional[int]:
+        return self.manifest.get("dimension")
+
+    def _file(self, kind: str, generation: int = None) -> str:
+        generation = self.manifest["generation"] if generation is None else generation
+        suffix = {"vectors": "f32", "records": "jsonl", "ivf": "npz"}[kind]
+        return os.path.join(self.path, f"{kind}.{generation}.{suffix}")
+
+    @property
+    def vectors_file(self) -> str:
+        return self._file("vectors")
+
+    @property
+    def records_file(self) -> str:
+        return self._file("records")
+
+    def _write_manifest(self, manifest: Dict[str, Any], durable: bool = True) -> None:
+        """Atomically replace the manifest (fsynced unless it only updates counts)."""
+        os.makedirs(self.path, exist_ok=True)
+        tmp = os.path.join(self.path, MANIFEST + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(manifest, f)
+            if durable:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp, os.path.join(self.path, MANIFEST))
+        if durable:
+            _fsync_dir(self.path)
+        self.manifest = manifest
+
+    def update_manifest(self, **fields: Any) -> None:
+        """
+        Update descriptive manifest fields (counts, model).
+
+        These writes are not fsynced: after a crash the counts may be stale
+        until the store is next loaded, which recomputes them.
+        """
+        if any(self.manifest.get(key) != value for key, value in fields.items()):
+            self._write_manifest({**self.manifest, **fields}, durable=False)
+
+    def load(self) -> Tuple[np.ndarray, List[Dict[str, Any]]]:
+        """
+        Read the current generation, dropping any torn tail.
+
+        Returns:
+            (vectors, records): read-only memory-mapped float32 matrix with
+            one row per "add" record, and the operation records in write order
+        """
+        dimension = self.dimension
+        if not self.exists() or not dimension:
+            return np.empty((0, dimension or 0), dtype=np.float32), []
+
+        records: List[Dict[str, Any]] = []
+        good_bytes = 0
+        if os.path.exists(self.records_file):
+            with open(self.records_file, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        break
+                    good_bytes += len(line)
+
+        file_bytes = os.path.getsize(self.vectors_file) if os.path.exists(self.vectors_file) else 0
+        rows = file_bytes // (dimension * 4)
+
+        # Keep records whose vector rows made it to disk
+        added = 0
+        for n, record in enumerate(records):
+            if record["op"] == "add":
+                if record["row"] != added or record["row"] >= rows:
+                    records = records[:n]
+                    break
+                added += 1
+
+        # Trim torn or unreferenced tails so later appends stay aligned
+        if os.path.exists(self.records_file) and good_bytes != os.path.getsize(self.records_file):
+            with open(self.records_file, "r+b") as f:
+                f.truncate(good_bytes)
+        if file_bytes != added * dimension * 4:
+            with open(self.vectors_file, "r+b") as f:
+                f.truncate(added * dimension * 4)
+
+        if not added:
+            return np.empty((0, dimension), dtype=np.float32), records
+        return np.memmap(self.vectors_file, dtype=np.float32, mode="r", shape=(added, dimension)), records
+
+    def append(self, vectors: Optional[np.ndarray], records: List[Dict[str, Any]]) -> None:
+        """
+        Append vector rows and the records that reference them.
+
+        Args:
+            vectors: float32 rows to append (None for delete-only writes)
+            records: Operation records, one JSON line each
+        """
+        if vectors is not None and len(vectors) and self.dimension is None:
+            self._write_manifest({**self.manifest, "dimension": int(vectors.shape[1])})
+        elif not self.exists():
+            self._write_manifest(self.manifest)
+
+        if vectors is not None and len(vectors):
+            with open(self.vectors_file, "ab") as f:
+                f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+
+        with open(self.records_file, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(record) + "\n" for record in records))
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+
+    def snapshot(self, vectors: np.ndarray, records: List[Dict[str, Any]]) -> None:
+        """
+        Replace the store contents with a new generation.
+
+        Args:
+            vectors: float32 rows of the new generation
+            records: "add" records for those rows, in row order
+        """
+        old_generation = self.manifest["generation"]
+        generation = old_generation + 1
+        os.makedirs(self.path, exist_ok=True)
+
+        with open(self._file("vectors", generation), "wb") as f:
+            f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        with open(self._file("records", generation), "w", encoding="utf-8") as f:
+            f.write("".join(json.dumps(record) + "\n" for record in records))
+            f.flush()
+            os.fsync(f.fileno())
+
+        dimension = int(vectors.shape[1]) if len(vectors) else None
+        self._write_manifest({**self.manifest, "generation": generation, "dimension": dimension})
+
+        for kind in ("vectors", "records", "ivf"):
+            try:
+                os.remove(self._file(kind, old_generation))
+            except FileNotFoundError:
+                pass
+
+    def save_index(self, arrays: Dict[str, np.ndarray]) -> None:
+        """Atomically write the approximate-search index of the current generation."""
+        path = self._file("ivf")
+        with open(path + ".tmp", "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(path + ".tmp", path)
+
+    def load_index(self) -> Optional[Dict[str, np.ndarray]]:
+        """Read the saved index of the current generation, if any."""
+        try:
+            with np.load(self._file("ivf")) as data:
+                return {key: data[key] for key in data.files}
+        except (OSError, ValueError):
+            return None
+
+    def size_bytes(self) -> int:
+        """Total size of the store files."""
+        if not os.path.isdir(self.path):
+            return 0
+        return sum(os.path.getsize(os.path.join(self.path, name)) for name in os.listdir(self.path))
+
+    def remove(self) -> None:
+        """Delete the store directory."""
+        shutil.rmtree(self.path, ignore_errors=True)
+        self.manifest = {"generation": 0, "dimension": None}
+
+
+class _JsonStream:
+    """Reads top-level arrays of a large JSON object element by element."""
+
+    def __init__(self, f, chunk_size: int = 1 << 20):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self, size: int = None) -> bool:
+        if self.eof:
+            return False
+        data = self.f.read(size or self.chunk_size)
+        if not data:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character ("" at end of input)."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buf) or not self._fill():
+                return self.buf[self.pos:self.pos + 1]
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} at offset {self.pos} of legacy store")
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Decode the next JSON value, reading more input until it is complete."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                # A value ending at the buffer edge may be a cut-off number
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except ValueError:
+                if self.eof:
+                    raise
+            # Double the pending text so long values are not re-decoded chunk by chunk
+            self._fill(max(self.chunk_size, len(self.buf) - self.pos))
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        """Yield (key, element) for array values and (key, value) for other values."""
+        self.expect("{")
+        while self.peek() not in ("}", ""):
+            if self.peek() == ",":
+                self.pos += 1
+            key = self.value()
+            self.expect(":")
+            if self.peek() == "[":
+                self.pos += 1
+                while self.peek() != "]":
+                    if self.peek() == ",":
+                        self.pos += 1
+                    yield key, self.value()
+                self.pos += 1
+            else:
+                yield key, self.value()
+
+
+def migrate_legacy_json(legacy_file: str, path: str) -> int:
+    """
+    Convert a legacy ``vector_store.json`` into the log format, once.
+
+    Vectors are streamed straight into the vector file; the legacy file is
+    renamed to ``*.migrated`` afterwards so the migration does not repeat.
+
+    Args:
+        legacy_file: Pretty-printed JSON file written by older versions
+        path: Store directory to create
+
+    Returns:
+        Number of rows migrated
+    """
+    os.makedirs(path, exist_ok=True)
+    log = VectorLog(path)
+    vectors_tmp = os.path.join(path, "vectors.migrating")
+    columns: Dict[str, List[Any]] = {"documents": [], "metadatas": [], "ids": []}
+    rows = 0
+    dimension = None
+
+    with open(legacy_file, "r", encoding="utf-8") as src, open(vectors_tmp, "wb") as dst:
+        for key, value in _JsonStream(src).items():
+            if key == "vectors":
+                vector = np.asarray(value, dtype=np.float32)
+                norm = np.linalg.norm(vector)
+                dst.write((vector / norm if norm else vector).tobytes())
+                dimension = len(vector)
+                rows += 1
+            elif key in columns:
+                columns[key].append(value)
+
+    records = [
+        {"op": "add", "row": row, "id": id_val, "document": document, "metadata": metadata}
+        for row, (id_val, document, metadata) in enumerate(
+            zip(columns["ids"][:rows], columns["documents"], columns["metadatas"])
+        )
+    ]
+    generation = log.manifest["generation"] + 1
+    os.replace(vectors_tmp, log._file("vectors", generation))
+    with open(log._file("records", generation), "w", encoding="utf-8") as f:
+        f.write("".join(json.dumps(record) + "\n" for record in records))
+        f.flush()
+        os.fsync(f.fileno())
+    log._write_manifest({
+        **log.manifest,
+        "generation": generation,
+        "dimension": dimension,
+        "count": len(records),
+        "vectors": len(records),
+        "rows": len(records)
+    })
+
+    os.replace(legacy_file, legacy_file + ".migrated")
+    return len(records)
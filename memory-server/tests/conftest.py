@@ -0,0 +1,12 @@
+"""Shared test configuration: in-process embeddings, a throwaway store and the repository's local test servers."""
+import os
+import sys
+import tempfile
+
+# Must run before config.settings is imported by any test module
+os.environ.setdefault("EMBEDDING_BACKEND", "local")
+os.environ.setdefault("CHROMA_PERSIST_DIR", tempfile.mkdtemp(prefix="memory-server-tests-"))
+
+# The repository root conftest is not collected when pytest runs from memory-server/
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from conftest import serve_app  # noqa: E402,F401
@@ -91,3 +91,246 @@ def test_query_by_tags_endpoint():
     assert "count" in data
     assert isinstance(data["results"], list)
 
+
+class FakeEmbedder:
+    """Deterministic embedder that counts calls instead of contacting Ollama."""
+
+    def __init__(self):
+        self.batch_calls = 0
+
+    async def embed(self, text):
+        return (await self.embed_batch([text]))[0]
+
+    async def embed_batch(self, texts):
+        self.batch_calls += 1
+        vectors = []
+        for text in texts:
+            vector = [0.0] * 8
+            for word in text.lower().split():
+                vector[sum(map(ord, word)) % 8] += 1.0
+            vectors.append(vector)
+        return vectors
+
+
+@pytest.fixture
+def batch_client(tmp_path, monkeypatch):
+    """API client backed by a temporary store and the fake embedder."""
+    import server.api as api
+    import storage.chroma_manager as chroma_module
+
+    monkeypatch.setattr(chroma_module, "CHROMA_PERSIST_DIR", str(tmp_path))
+    fake = FakeEmbedder()
+    monkeypatch.setattr(api, "chroma_manager", chroma_module.ChromaManager())
+    monkeypatch.setattr(api, "embedder", fake)
+    return TestClient(api.app), fake, api
+
+
+def test_store_batch_endpoint(batch_client):
+    """A batch is embedded in one pass and persisted with one write."""
+    client, fake, api = batch_client
+    writes = []
+    log = api.chroma_manager.collection._log
+    original_append = log.append
+    log.append = lambda vectors, records: (writes.append(len(records)), original_append(vectors, records))
+
+    items = [
+        {"text": "invoice automation pain points", "agent": "researcher", "task": "t"},
+        {"text": "pricing tiers for the SaaS", "agent": "strategist", "task": "t", "tags": ["pricing"]},
+        {"text": "event driven architecture", "agent": "architect", "task": "t"},
+    ]
+    response = client.post("/memory/store_batch", json={"items": items})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["count"] == 3 and len(set(data["ids"])) == 3
+    assert fake.batch_calls == 1
+    assert writes == [3]
+    assert api.chroma_manager.get_stats()["total_entries"] == 3
+
+
+def test_store_batch_rejects_invalid_agent(batch_client):
+    """One invalid agent rejects the whole batch without storing anything."""
+    client, _, api = batch_client
+    items = [
+        {"text": "ok", "agent": "researcher", "task": "t"},
+        {"text": "bad", "agent": "invalid_agent", "task": "t"},
+    ]
+    response = client.post("/memory/store_batch", json={"items": items})
+
+    assert response.status_code == 400
+    assert "Invalid agent" in response.json()["detail"]
+    assert api.chroma_manager.get_stats()["total_entries"] == 0
+
+
+def test_store_rejects_reserved_metadata_keys(batch_client):
+    """Chunk keys managed by the store cannot be set through the API."""
+    client, _, api = batch_client
+    payload = {"text": "spoof", "agent": "researcher", "task": "t", "metadata": {"parent_id": "x"}}
+
+    assert client.post("/memory/store", json=payload).status_code == 422
+    assert client.post("/memory/store_batch", json={"items": [payload]}).status_code == 422
+    assert api.chroma_manager.get_stats()["total_entries"] == 0
+
+
+def test_search_batch_endpoint(batch_client):
+    """Batch search returns one response per query with its own filters and limits."""
+    client, fake, _ = batch_client
+    items = [
+        {"text": "invoice automation pain points", "agent": "researcher", "task": "t"},
+        {"text": "invoice automation market size", "agent": "strategist", "task": "t", "tags": ["market"]},
+        {"text": "event driven architecture", "agent": "architect", "task": "t"},
+    ]
+    client.post("/memory/store_batch", json={"items": items})
+
+    queries = [
+        {"query": "invoice automation", "n_results": 1},
+        {"query": "invoice automation", "n_results": 5, "agent": "strategist"},
+        {"query": "architecture", "n_results": 5, "tags": ["market"]},
+    ]
+    response = client.post("/memory/search_batch", json={"queries": queries})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["count"] == 3
+    first, second, third = data["results"]
+    assert first["n_results"] == 1
+    assert [r["metadata"]["agent"] for r in second["results"]] == ["strategist"]
+    assert [r["text"] for r in third["results"]] == ["invoice automation market size"]
+    # One batched embedding pass for the store and one for the searches
+    assert fake.batch_calls == 2
+
+
+def test_search_batch_matches_single_search(batch_client):
+    """Batched results equal those of individual searches."""
+    client, _, _ = batch_client
+    items = [{"text": f"memory number {i} about topic {i % 3}", "agent": "researcher", "task": "t"} for i in range(10)]
+    client.post("/memory/store_batch", json={"items": items})
+
+    queries = [{"query": f"topic {i}", "n_results": 3} for i in range(3)]
+    batch = client.post("/memory/search_batch", json={"queries": queries}).json()["results"]
+    single = [client.post("/memory/search", json=q).json() for q in queries]
+
+    assert [[r["id"] for r in b["results"]] for b in batch] == [[r["id"] for r in s["results"]] for s in single]
+
+
+def test_store_long_text_is_chunked(batch_client, monkeypatch):
+    """A long text is embedded chunk by chunk and found through any of its chunks."""
+    client, fake, api = batch_client
+    monkeypatch.setattr(api, "CHUNK_CHARS", 200)
+    monkeypatch.setattr(api, "CHUNK_OVERLAP", 20)
+
+    text = "invoice automation " * 20 + "kubernetes cluster autoscaling " * 10
+    response = client.post("/memory/store", json={"text": text, "agent": "architect", "task": "t"})
+    assert response.status_code == 200
+    memory_id = response.json()["id"]
+    assert fake.batch_calls == 1
+
+    stats = api.chroma_manager.get_stats()
+    assert stats["total_entries"] == 1
+    assert stats["total_vectors"] > 1
+
+    response = client.post("/memory/search", json={"query": "kubernetes cluster autoscaling", "n_results": 5})
+    results = response.json()["results"]
+    assert len(results) == 1
+    assert results[0]["id"] == memory_id
+    assert results[0]["text"] == text
+
+
+def test_store_whitespace_text_longer_than_a_chunk(batch_client, monkeypatch):
+    """A long whitespace-only text yields no chunks and is embedded as a whole."""
+    client, _, api = batch_client
+    monkeypatch.setattr(api, "CHUNK_CHARS", 200)
+
+    response = client.post("/memory/store", json={"text": " \n" * 300, "agent": "architect", "task": "t"})
+    assert response.status_code == 200
+    assert api.chroma_manager.get_stats()["total_vectors"] == 1
+
+
+def test_store_and_search_with_local_backend():
+    """With the local backend the full store/search path works without Ollama."""
+    import server.api as api
+    if api.embedder.remote:
+        pytest.skip("EMBEDDING_BACKEND is not local")
+
+    texts = ["Churn drivers for invoicing SaaS", "Microservice layout for the billing engine"]
+    for text, agent in zip(texts, ["researcher", "architect"]):
+        response = client.post("/memory/store", json={"text": text, "agent": agent, "task": "local"})
+        assert response.status_code == 200
+
+    response = client.post("/memory/search", json={"query": "billing engine microservices", "n_results": 1})
+    assert response.status_code == 200
+    assert response.json()["results"][0]["text"] == texts[1]
+    assert client.get("/memory/health").json()["embedding_model"] == api.embedder.model
+
+
+def test_clear_endpoint_empties_served_store(batch_client):
+    """Clearing data empties the store the running server searches."""
+    client, fake, api = batch_client
+    items = [{"text": f"entry {i}", "agent": "researcher", "task": "t"} for i in range(3)]
+    client.post("/memory/store_batch", json={"items": items})
+
+    response = client.post("/memory/clear", json={"clear_data": True, "clear_file": False})
+    assert response.status_code == 200
+    assert response.json()["entries_cleared"] == 3
+    assert client.post("/memory/search", json={"query": "entry", "n_results": 5}).json()["results"] == []
+
+
+def test_delete_and_compact_endpoints(batch_client):
+    """Entries can be deleted by id or agent and their rows reclaimed."""
+    client, fake, api = batch_client
+    items = [{"text": f"entry {i}", "agent": agent, "task": "t"} for i, agent in enumerate(["researcher", "researcher", "architect"])]
+    ids = client.post("/memory/store_batch", json={"items": items}).json()["ids"]
+
+    assert client.post("/memory/delete", json={}).status_code == 400
+    assert client.post("/memory/delete", json={"ids": [ids[2]]}).json()["deleted"] == 1
+    assert client.post("/memory/delete", json={"agent": "researcher"}).json()["deleted"] == 2
+    assert client.post("/memory/search", json={"query": "entry", "n_results": 5}).json()["results"] == []
+
+    api.chroma_manager.collection.compact_threshold = 1.0
+    client.post("/memory/store_batch", json={"items": items[:1]})
+    client.post("/memory/delete", json={"task": "t"})
+    assert client.post("/memory/compact").json()["rows_reclaimed"] == 1
+
+
+def test_search_and_query_with_metadata_filter(batch_client):
+    """Range, set and boolean filters reach the store; malformed filters are rejected."""
+    client, _, _ = batch_client
+    items = [
+        {"text": f"finding {i}", "agent": "researcher" if i < 4 else "strategist", "task": "t",
+         "metadata": {"insights_count": i}}
+        for i in range(6)
+    ]
+    client.post("/memory/store_batch", json={"items": items})
+
+    where = {"insights_count": {"$gte": 2}, "timestamp": {"$gte": "2000-01-01T00:00:00"}}
+    response = client.post("/memory/search", json={"query": "finding", "n_results": 10, "agent": "researcher", "where": where})
+    assert response.status_code == 200
+    assert sorted(r["text"] for r in response.json()["results"]) == ["finding 2", "finding 3"]
+
+    where = {"$or": [{"insights_count": {"$in": [0, 5]}}, {"insights_count": {"$lt": 1}}]}
+    response = client.post("/memory/query_by_tags", json={"where": where, "limit": 10})
+    assert sorted(r["text"] for r in response.json()["results"]) == ["finding 0", "finding 5"]
+
+    response = client.post("/memory/search", json={"query": "finding", "where": {"insights_count": {"$near": 3}}})
+    assert response.status_code == 422
+
+
+def test_range_bounds_must_match_field_types(batch_client):
+    """A range bound of the wrong type for its field is a 422, not a failed search."""
+    client, _, _ = batch_client
+    client.post("/memory/store_batch", json={"items": [
+        {"text": "finding", "agent": "researcher", "task": "t", "metadata": {"insights_count": 3}}
+    ]})
+
+    for where in (
+        {"insights_count": {"$gte": "3"}},
+        {"timestamp": {"$gte": "not-a-date"}},
+        {"timestamp": {"$lt": 5}},
+        {"insights_count": {"$gte": "2024-05-01T00:00:00"}}
+    ):
+        response = client.post("/memory/search", json={"query": "finding", "where": where})
+        assert response.status_code == 422, where
+        response = client.post("/memory/search_batch", json={"queries": [{"query": "finding", "where": where}]})
+        assert response.status_code == 422, where
+        response = client.post("/memory/query_by_tags", json={"where": where})
+        assert response.status_code == 422, where
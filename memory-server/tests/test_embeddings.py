@@ -1,6 +1,9 @@
 """Tests for Ollama embedding service."""
 import pytest
+import pytest_asyncio
 import asyncio
+import numpy as np
+from aiohttp import web
 from embeddings.ollama_embedder import OllamaEmbedder
 
 
@@ -19,6 +22,8 @@ async def test_embed_generates_vector():
     except Exception as e:
         # Skip test if Ollama is not available
         pytest.skip(f"Ollama not available: {str(e)}")
+    finally:
+        await embedder.close()
 
 
 @pytest.mark.asyncio
@@ -35,4 +40,245 @@ async def test_embed_batch():
         assert all(isinstance(emb, list) for emb in embeddings)
     except Exception as e:
         pytest.skip(f"Ollama not available: {str(e)}")
+    finally:
+        await embedder.close()
 
+
+def fake_vector(text):
+    return [float(len(text)), float(sum(map(ord, text)) % 97)]
+
+
+@pytest_asyncio.fixture
+async def fake_ollama(request, serve_app):
+    """Local stand-in for Ollama; request.param=False simulates a server without /api/embed."""
+    stats = {"embed": [], "embeddings": 0, "active": 0, "peak": 0}
+
+    async def embed(req):
+        body = await req.json()
+        stats["embed"].append(len(body["input"]))
+        return web.json_response({"model": body["model"], "embeddings": [fake_vector(t) for t in body["input"]]})
+
+    async def embeddings(req):
+        body = await req.json()
+        stats["embeddings"] += 1
+        stats["active"] += 1
+        stats["peak"] = max(stats["peak"], stats["active"])
+        await asyncio.sleep(0.01)
+        stats["active"] -= 1
+        return web.json_response({"embedding": fake_vector(body["prompt"])})
+
+    app = web.Application()
+    app.router.add_post("/api/embeddings", embeddings)
+    if request.param:
+        app.router.add_post("/api/embed", embed)
+
+    return {"base": await serve_app(app), "stats": stats}
+
+
+def make_embedder(base, **kwargs):
+    return OllamaEmbedder(
+        model="test-embed",
+        base_url=f"{base}/api/embeddings",
+        batch_url=f"{base}/api/embed",
+        **kwargs
+    )
+
+
+TEXTS = [f"text number {i}" for i in range(10)]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("fake_ollama", [True], indirect=True)
+async def test_embed_batch_uses_list_endpoint(fake_ollama):
+    """Texts are sent in batches of batch_size over one pooled session, in order."""
+    embedder = make_embedder(fake_ollama["base"], batch_size=4)
+    try:
+        embeddings = await embedder.embed_batch(TEXTS)
+        session = embedder._session
+        await embedder.embed_batch(TEXTS[:2])
+        assert embedder._session is session
+    finally:
+        await embedder.close()
+
+    assert embeddings == [fake_vector(t) for t in TEXTS]
+    assert fake_ollama["stats"]["embed"] == [4, 4, 2, 2]
+    assert fake_ollama["stats"]["embeddings"] == 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("fake_ollama", [False], indirect=True)
+async def test_embed_batch_falls_back_to_bounded_single_calls(fake_ollama):
+    """Older servers get concurrent single calls, never more than `concurrency` at once."""
+    embedder = make_embedder(fake_ollama["base"], concurrency=3)
+    try:
+        embeddings = await embedder.embed_batch(TEXTS)
+    finally:
+        await embedder.close()
+
+    assert embeddings == [fake_vector(t) for t in TEXTS]
+    assert fake_ollama["stats"]["embeddings"] == len(TEXTS)
+    assert 1 < fake_ollama["stats"]["peak"] <= 3
+    assert embedder._batch_supported is False
+
+
+class CountingEmbedder:
+    """Backend recording every batched call."""
+
+    model = "counting"
+
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+        self.closed = False
+
+    async def embed_batch(self, texts):
+        self.calls.append(list(texts))
+        await asyncio.sleep(0)
+        if self.fail:
+            raise RuntimeError("backend down")
+        return [fake_vector(t) for t in texts]
+
+    async def close(self):
+        self.closed = True
+
+
+@pytest.mark.asyncio
+async def test_scheduler_merges_concurrent_requests():
+    """Concurrent single embeds become one batched call; duplicates are embedded once."""
+    from embeddings.scheduler import EmbeddingScheduler
+    backend = CountingEmbedder()
+    scheduler = EmbeddingScheduler(backend, max_batch=32, max_wait=0.01)
+
+    texts = TEXTS + TEXTS[:3]
+    vectors = await asyncio.gather(*(scheduler.embed(t) for t in texts))
+
+    assert vectors == [fake_vector(t) for t in texts]
+    assert backend.calls == [TEXTS]
+    assert scheduler.get_stats()["requests"] == len(texts)
+
+
+@pytest.mark.asyncio
+async def test_scheduler_flushes_at_max_batch():
+    """A full batch is sent without waiting for the window to close."""
+    from embeddings.scheduler import EmbeddingScheduler
+    backend = CountingEmbedder()
+    scheduler = EmbeddingScheduler(backend, max_batch=4, max_wait=10)
+
+    vectors = await asyncio.wait_for(asyncio.gather(*(scheduler.embed(t) for t in TEXTS[:8])), timeout=1)
+
+    assert len(vectors) == 8
+    assert [len(call) for call in backend.calls] == [4, 4]
+
+
+@pytest.mark.asyncio
+async def test_scheduler_propagates_errors():
+    """Every caller of a failed batch sees the backend error."""
+    from embeddings.scheduler import EmbeddingScheduler
+    scheduler = EmbeddingScheduler(CountingEmbedder(fail=True), max_wait=0.001)
+
+    results = await asyncio.gather(scheduler.embed("a"), scheduler.embed("b"), return_exceptions=True)
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+@pytest.mark.asyncio
+async def test_scheduler_close_finishes_pending_batches():
+    """Closing flushes the open window and waits for running batches before closing the backend."""
+    from embeddings.scheduler import EmbeddingScheduler
+    backend = CountingEmbedder()
+    scheduler = EmbeddingScheduler(backend, max_batch=32, max_wait=10)
+
+    request = asyncio.ensure_future(scheduler.embed("a"))
+    await asyncio.sleep(0)
+    await scheduler.close()
+
+    assert backend.calls == [["a"]] and backend.closed
+    assert not scheduler._tasks
+    assert request.done() and request.result() == fake_vector("a")
+
+
+@pytest.mark.asyncio
+async def test_cached_embedder_skips_backend_for_repeats(tmp_path):
+    """Repeated texts are answered from the persistent cache, across restarts."""
+    from embeddings.cache import EmbeddingCache, CachedEmbedder
+    path = str(tmp_path / "cache.sqlite3")
+    backend = CountingEmbedder()
+    embedder = CachedEmbedder(backend, EmbeddingCache(path))
+
+    first = await embedder.embed_batch(["alpha", "beta", "alpha"])
+    second = await embedder.embed_batch(["beta", "gamma"])
+
+    assert backend.calls == [["alpha", "beta"], ["gamma"]]
+    assert first[0] == first[2] == pytest.approx(fake_vector("alpha"))
+    assert second[0] == pytest.approx(fake_vector("beta"))
+
+    reopened = CachedEmbedder(CountingEmbedder(), EmbeddingCache(path))
+    await reopened.embed_batch(["alpha", "gamma"])
+    assert reopened.embedder.calls == []
+    assert reopened.get_stats()["cache_hit_rate"] == 1.0
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    """Beyond max_entries the least recently used vectors are dropped; keys include the model."""
+    from embeddings.cache import EmbeddingCache
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite3"), max_entries=2)
+
+    cache.put_many("m", ["a", "b"], [[1.0], [2.0]])
+    cache.get_many("m", ["a"])  # "a" is now more recent than "b"
+    cache.put_many("m", ["c"], [[3.0]])
+
+    assert set(cache.get_many("m", ["a", "b", "c"])) == {"a", "c"}
+    assert cache.get_many("other-model", ["a"]) == {}
+    assert cache.count() == 2
+
+
+def test_cache_counts_rows_without_scanning(tmp_path):
+    """Writes keep the row count in memory; re-cached texts are refreshed, not counted twice."""
+    from embeddings.cache import EmbeddingCache
+    path = str(tmp_path / "cache.sqlite3")
+    cache = EmbeddingCache(path, max_entries=3)
+    statements = []
+    cache._conn.set_trace_callback(statements.append)
+
+    cache.put_many("m", ["a", "b"], [[1.0], [2.0]])
+    cache.put_many("m", ["b", "c", "c"], [[5.0], [3.0], [3.0]])
+    assert cache.count() == 3
+    assert cache.get_many("m", ["b"]) == {"b": [5.0]}
+
+    cache.put_many("m", ["d", "e"], [[4.0], [6.0]])
+    assert cache.count() == 3
+    assert not any("COUNT(*)" in sql for sql in statements)
+
+    cache.close()
+    assert EmbeddingCache(path, max_entries=3).count() == 3
+
+
+@pytest.mark.asyncio
+async def test_local_embedder_is_deterministic_and_lexical():
+    """Local vectors are unit length, stable, and rank shared wording highest."""
+    from embeddings.local_embedder import LocalEmbedder
+
+    embedder = LocalEmbedder(dim=256)
+    texts = ["invoice automation for small businesses", "automating invoices for SMEs", "kubernetes autoscaling"]
+    vectors = np.array(await embedder.embed_batch(texts))
+
+    assert vectors.shape == (3, 256)
+    assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0)
+    assert np.allclose(await LocalEmbedder(dim=256).embed(texts[0]), vectors[0], atol=1e-6)
+    assert vectors[0] @ vectors[1] > vectors[0] @ vectors[2]
+    assert await embedder.embed_batch([]) == []
+
+    # Large batches (worker thread) give the same vectors
+    many = await embedder.embed_batch(texts * 30)
+    assert np.allclose(many[:3], vectors, atol=1e-6)
+
+
+def test_create_embedder_selects_backend():
+    """The backend is chosen by name; unknown names are rejected."""
+    from embeddings.base import create_embedder
+    from embeddings.local_embedder import LocalEmbedder
+
+    assert isinstance(create_embedder("local"), LocalEmbedder)
+    assert create_embedder("ollama").remote
+    with pytest.raises(ValueError):
+        create_embedder("word2vec")
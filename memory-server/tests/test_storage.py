@@ -19,18 +19,10 @@ def temp_storage_dir(tmp_path):
 @pytest.fixture
 def chroma_manager(temp_storage_dir, monkeypatch):
     """Create ChromaManager with temporary storage."""
-    monkeypatch.setenv("CHROMA_PERSIST_DIR", temp_storage_dir)
-    # Reimport to get new config
-    import importlib
-    import sys
-    # Remove from cache if exists
-    modules_to_reload = ['memory_server.chroma.client', 'memory_server.storage.chroma_manager']
-    for mod in modules_to_reload:
-        if mod in sys.modules:
-            del sys.modules[mod]
-    
-    from storage.chroma_manager import ChromaManager
-    manager = ChromaManager()
+    import storage.chroma_manager as chroma_module
+    # ChromaManager reads the setting imported at module load
+    monkeypatch.setattr(chroma_module, "CHROMA_PERSIST_DIR", temp_storage_dir)
+    manager = chroma_module.ChromaManager()
     return manager
 
 
@@ -120,3 +112,509 @@ def test_get_stats(chroma_manager):
     assert "collection_name" in stats
     assert stats["collection_name"] == "multi_agent_memory"
 
+
+def test_store_batch_and_search_many(tmp_path, monkeypatch):
+    """Batch insert and multi-query search agree with single-query search."""
+    import storage.chroma_manager as chroma_module
+    monkeypatch.setattr(chroma_module, "CHROMA_PERSIST_DIR", str(tmp_path))
+    manager = chroma_module.ChromaManager()
+
+    ids = manager.store_batch([
+        {"text": "Researcher entry", "embedding": [1.0, 0.0, 0.0], "agent": "researcher", "task": "t", "tags": ["a"]},
+        {"text": "Strategist entry", "embedding": [0.0, 1.0, 0.0], "agent": "strategist", "task": "t", "tags": ["b"]},
+        {"text": "Architect entry", "embedding": [0.0, 0.0, 1.0], "agent": "architect", "task": "t", "tags": []},
+    ])
+    assert len(ids) == 3
+
+    queries = [[0.9, 0.1, 0.0], [0.0, 0.2, 0.9]]
+    batched = manager.search_many(queries, n_results=2, wheres=[None, {"agent": "strategist"}])
+
+    assert [r["text"] for r in batched[0]] == ["Researcher entry", "Strategist entry"]
+    assert [r["text"] for r in batched[1]] == ["Strategist entry"]
+    assert batched[0] == manager.search(queries[0], n_results=2)
+
+    # Reloading from disk sees every entry of the batch
+    assert chroma_module.ChromaManager().get_stats()["total_entries"] == 3
+
+
+def test_chunk_text_overlaps_at_word_boundaries():
+    """Long texts are split into overlapping chunks; short texts stay whole."""
+    from embeddings.chunking import chunk_text
+
+    assert chunk_text("short text", chunk_chars=100) == ["short text"]
+
+    text = " ".join(f"word{i}" for i in range(400))
+    chunks = chunk_text(text, chunk_chars=300, overlap=50)
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 300 for chunk in chunks)
+    assert all(chunk.split()[-1].startswith("word") for chunk in chunks)
+    assert chunks[0].split()[-1] in chunks[1]
+    assert chunks[-1].endswith("word399")
+
+
+@pytest.mark.parametrize("aggregate", ["max", "mean"])
+def test_multi_vector_entry_returned_once(tmp_path, monkeypatch, aggregate):
+    """Chunk rows are scored with their parent, which is returned once with its full text."""
+    import storage.chroma_manager as chroma_module
+    monkeypatch.setattr(chroma_module, "CHROMA_PERSIST_DIR", str(tmp_path))
+    monkeypatch.setattr(chroma_module, "CHUNK_AGGREGATION", aggregate)
+    manager = chroma_module.ChromaManager()
+
+    long_id, short_id = manager.store_batch([
+        {"text": "long report", "embeddings": [[1.0, 0.0, 0.0], [0.0, 0.0, 1.0], [0.0, 0.1, 1.0]],
+         "agent": "researcher", "task": "t", "tags": []},
+        {"text": "short note", "embedding": [0.0, 1.0, 0.0], "agent": "strategist", "task": "t", "tags": []},
+    ])
+
+    results = manager.search([0.0, 0.0, 1.0], n_results=5)
+    assert [r["id"] for r in results] == [long_id, short_id]
+    assert results[0]["text"] == "long report"
+    assert results[0]["metadata"]["chunk_count"] == 3
+    if aggregate == "max":
+        assert results[0]["distance"] == pytest.approx(0.0, abs=1e-6)
+    else:
+        assert results[0]["distance"] > 0.2
+
+    # Agent filters apply to chunk rows too
+    assert manager.search([0.0, 0.0, 1.0], where={"agent": "strategist"})[0]["id"] == short_id
+
+    assert [r["id"] for r in manager.query_by_tags()] == [long_id, short_id]
+    stats = manager.get_stats()
+    assert stats["total_entries"] == 2
+    assert stats["total_vectors"] == 4
+
+
+def test_client_metadata_cannot_make_a_chunk_row(chroma_manager):
+    """Reserved chunk keys in caller metadata are dropped, so the entry stays searchable."""
+    memory_id = chroma_manager.store(
+        text="Spoofed entry",
+        embedding=[1.0, 0.0],
+        agent="researcher",
+        task="t",
+        tags=[],
+        metadata={"parent_id": "other", "chunk_index": 2, "source": "client"}
+    )
+
+    results = chroma_manager.search([1.0, 0.0], n_results=5)
+    assert [r["id"] for r in results] == [memory_id]
+    assert results[0]["metadata"]["source"] == "client"
+    assert "parent_id" not in results[0]["metadata"] and "chunk_index" not in results[0]["metadata"]
+    assert chroma_manager.get_stats()["total_entries"] == 1
+
+
+def test_vector_matrix_grows_and_stays_normalized(tmp_path):
+    """Vectors live in one float32 matrix of unit rows that grows past its capacity."""
+    import numpy as np
+    from storage.simple_vector_store import SimpleVectorStore, _INITIAL_CAPACITY
+
+    store = SimpleVectorStore(persist_dir=str(tmp_path / "store"))
+    rng = np.random.default_rng(0)
+    n = _INITIAL_CAPACITY + 10
+    embeddings = rng.normal(size=(n, 16)) * 5
+    store.add([f"id{i}" for i in range(n)], embeddings.tolist(), [f"doc{i}" for i in range(n)], [{}] * n)
+
+    assert store.vectors.dtype == np.float32 and store.vectors.shape == (n, 16)
+    assert np.allclose(np.linalg.norm(store.vectors, axis=1), 1.0, atol=1e-5)
+
+    # Updating an id replaces its entry
+    store.add(["id3"], [embeddings[7].tolist()], ["updated"], [{}])
+    assert store.count() == n
+    assert sorted(store.query(embeddings[7].tolist(), n_results=2)["documents"][0]) == ["doc7", "updated"]
+
+    # Distances match cosine similarity on the raw vectors
+    query = rng.normal(size=16)
+    expected = embeddings @ query / (np.linalg.norm(embeddings, axis=1) * np.linalg.norm(query))
+    expected[3] = expected[7]
+    result = store.query(query.tolist(), n_results=5)
+    top = np.sort(expected)[::-1][:5]
+    assert np.allclose(1.0 - np.array(result["distances"][0]), top, atol=1e-5)
+
+    with pytest.raises(ValueError):
+        store.add(["bad"], [[1.0, 2.0]], ["wrong dimension"], [{}])
+
+    # Reloading restores the same matrix
+    reloaded = SimpleVectorStore(persist_dir=str(tmp_path / "store"))
+    assert np.allclose(reloaded.vectors, store.vectors, atol=1e-6)
+
+    assert store.clear() == n
+    assert store.count() == 0 and store.query(query.tolist())["ids"] == []
+    assert SimpleVectorStore(persist_dir=str(tmp_path / "store")).count() == 0
+
+
+def test_delete_tombstones_then_compacts(tmp_path):
+    """Deleted entries vanish from reads at once and are reclaimed past the threshold."""
+    from storage.simple_vector_store import SimpleVectorStore
+
+    store = SimpleVectorStore(persist_dir=str(tmp_path / "store"), compact_threshold=0.5)
+    ids = [f"id{i}" for i in range(10)]
+    store.add(
+        ids + ["id0#chunk1"],
+        [[1.0, float(i)] for i in range(10)] + [[0.0, 1.0]],
+        [f"doc{i}" for i in range(10)] + [""],
+        [{"agent": "researcher" if i < 5 else "architect"} for i in range(10)] + [{"agent": "researcher", "parent_id": "id0"}]
+    )
+
+    # Deleting a parent removes its chunk rows; unknown ids are ignored
+    assert store.delete(ids=["id0", "missing"]) == 1
+    assert store.vector_count() == 9
+    assert "id0" not in store.query([0.0, 1.0], n_results=20)["ids"][0]
+    assert store.tombstone_ratio() == pytest.approx(2 / 11)
+
+    assert store.delete(where={"agent": "researcher"}) == 4
+    assert store.count() == 5
+    assert store.tombstone_ratio() == 0.0  # 6/11 tombstoned > 0.5 -> compacted
+    assert store.vectors.shape == (5, 2)
+    assert store.get(limit=20)["ids"] == ids[5:]
+
+    # Re-adding a deleted id creates a fresh entry
+    store.add(["id1"], [[1.0, 1.0]], ["again"], [{"agent": "researcher"}])
+    assert store.query([1.0, 1.0], n_results=1)["documents"][0] == ["again"]
+
+    reloaded = SimpleVectorStore(persist_dir=str(tmp_path / "store"))
+    assert sorted(reloaded.get(limit=20)["ids"]) == sorted(ids[5:] + ["id1"])
+
+
+def test_replacing_a_chunked_entry_drops_its_chunks(tmp_path):
+    """Re-adding an id with fewer chunks tombstones the old chunk rows, also after a reload."""
+    from storage.simple_vector_store import SimpleVectorStore
+
+    store = SimpleVectorStore(persist_dir=str(tmp_path / "store"), compact_threshold=0.9)
+    store.add(["a", "b", "a#chunk1"], [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]], ["doc a", "doc b", ""],
+              [{}, {}, {"parent_id": "a"}])
+    store.add(["a"], [[1.0, 0.0, 0.0]], ["short a"], [{}])
+
+    reloaded = SimpleVectorStore(persist_dir=str(tmp_path / "store"))
+    for s in (store, reloaded):
+        assert (s.count(), s.vector_count()) == (2, 2)
+        result = s.query([0.0, 0.0, 1.0], n_results=5)
+        assert sorted(result["ids"][0]) == ["a", "b"]
+        assert min(result["distances"][0]) > 0.5
+
+
+def test_filtered_top_k_matches_full_sort():
+    """Filtered queries score only matching rows and return the same top k as a full sort."""
+    import numpy as np
+    from storage.simple_vector_store import SimpleVectorStore
+
+    rng = np.random.default_rng(1)
+    n = 600
+    embeddings = rng.normal(size=(n, 8))
+    agents = ["researcher", "architect", "planner"]
+    store = SimpleVectorStore()
+    store.add(
+        [f"id{i}" for i in range(n)], embeddings.tolist(), [f"doc{i}" for i in range(n)],
+        [{"agent": agents[i % 3], "task": f"t{i % 2}"} for i in range(n)]
+    )
+    store.delete(ids=["id0", "id6"])
+
+    unit = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    queries = rng.normal(size=(3, 8))
+    wheres = [None, {"agent": "researcher"}, {"agent": "researcher", "task": "t0"}]
+    results = store.query_many(queries.tolist(), n_results=7, wheres=wheres)
+
+    for query, where, ids, distances in zip(queries, wheres, results["ids"], results["distances"]):
+        allowed = [
+            i for i in range(n)
+            if i not in (0, 6) and all({"agent": agents[i % 3], "task": f"t{i % 2}"}[k] == v for k, v in (where or {}).items())
+        ]
+        scores = unit[allowed] @ (query / np.linalg.norm(query))
+        expected = [f"id{allowed[k]}" for k in np.argsort(-scores)[:7]]
+        assert ids == expected
+        assert distances == sorted(distances)
+
+    assert store.query(queries[0].tolist(), n_results=0)["ids"] == []
+    assert len(store.query(queries[0].tolist(), n_results=50, where={"agent": "planner", "task": "t1"})["ids"][0]) == 50
+
+
+def test_agent_and_tag_filters_use_bitmap_index(tmp_path):
+    """Agent/tag filters come from row-id lists kept in sync with writes, compaction and reloads."""
+    from storage.simple_vector_store import SimpleVectorStore
+
+    store = SimpleVectorStore(persist_dir=str(tmp_path / "store"), compact_threshold=0.9)
+    n = 30
+    store.add(
+        [f"id{i}" for i in range(n)],
+        [[1.0, float(i)] for i in range(n)],
+        [f"doc{i}" for i in range(n)],
+        [{"agent": "researcher" if i % 2 else "architect", "tags": "a,b" if i % 3 == 0 else "c"} for i in range(n)]
+    )
+    # Metadata is not scanned for indexed fields
+    metadatas, store.metadatas = store.metadatas, None
+    mask = store._where_mask({"agent": "researcher", "tags": ["b", "missing"]}, ~store._deleted[:store._size])
+    assert mask.nonzero()[0].tolist() == [i for i in range(n) if i % 2 and i % 3 == 0]
+    store.metadatas = metadatas
+
+    # Tag filters apply before the limit and before top-k
+    assert store.get(where={"tags": ["a"]}, limit=3)["ids"] == ["id0", "id3", "id6"]
+    result = store.query([0.0, 1.0], n_results=4, where={"tags": "c", "agent": "architect"})
+    assert result["ids"][0] == ["id28", "id26", "id22", "id20"]
+
+    store.delete(ids=["id28"])
+    store.add(["id26"], [[1.0, 26.0]], ["doc26"], [{"agent": "architect", "tags": "a"}])
+    assert store.query([0.0, 1.0], n_results=2, where={"tags": "c", "agent": "architect"})["ids"][0] == ["id22", "id20"]
+
+    store.compact()
+    reloaded = SimpleVectorStore(persist_dir=str(tmp_path / "store"))
+    for s in (store, reloaded):
+        assert s.get(where={"tags": "a", "agent": "architect"}, limit=50)["ids"] == ["id0", "id6", "id12", "id18", "id24", "id26"]
+        assert s.get(where={"agent": "nobody"})["ids"] == []
+
+
+def test_metadata_index_keeps_sorted_row_ids():
+    """Row lists stay sorted and duplicate-free and only grow with the rows they hold."""
+    from storage.metadata_index import MetadataIndex
+
+    index = MetadataIndex()
+    for row in range(1000):
+        index.add(row, {"agent": "researcher", "tags": f"t{row}"})
+    index.add(5, {"tags": "t7,t7"})
+    index.add(3, {"tags": "t7"})
+    index.remove(500, {"agent": "researcher"})
+
+    assert index._postings["tags"]["t7"].rows.tolist() == [3, 5, 7]
+    assert index._postings["tags"]["t999"].buffer.nbytes < 100
+    assert index.lookup("tags", ["t7", " t9 ", "missing"], size=8).nonzero()[0].tolist() == [3, 5, 7]
+    mask = index.lookup("agent", ["researcher"], size=1000)
+    assert mask.sum() == 999 and not mask[500]
+
+
+def test_columnar_metadata_filters():
+    """Typed columns answer set, range and boolean filters; untyped fields fall back to scanning."""
+    from datetime import datetime, timedelta
+    from storage.simple_vector_store import SimpleVectorStore
+
+    now = datetime(2024, 6, 1, 12, 0, 0)
+    store = SimpleVectorStore()
+    n = 20
+    store.add(
+        [f"id{i}" for i in range(n)],
+        [[1.0, float(i)] for i in range(n)],
+        [f"doc{i}" for i in range(n)],
+        [
+            {
+                "agent": ["researcher", "architect"][i % 2],
+                "task": f"task{i % 4}",
+                "timestamp": (now - timedelta(days=i)).isoformat(),
+                "insights_count": i % 5,
+                "extra": [i] if i == 3 else "x"
+            }
+            for i in range(n)
+        ]
+    )
+    assert store._columns.column("timestamp").kind == "time"
+    assert store._columns.column("insights_count").kind == "number"
+    assert store._columns.column("task").kind == "category"
+    assert store._columns.column("extra") is None  # mixed types
+
+    def matching(where):
+        return [int(i[2:]) for i in store.get(where=where, limit=n)["ids"]]
+
+    week_ago = (now - timedelta(days=7)).isoformat()
+    assert matching({"agent": "researcher", "timestamp": {"$gte": week_ago}, "insights_count": {"$gte": 3}}) == [4]
+    assert matching({"task": {"$in": ["task1", "task2"]}, "insights_count": {"$lte": 1}}) == [1, 5, 6, 10]
+    assert matching({"$or": [{"insights_count": 4}, {"task": {"$eq": "task0"}}]}) == [0, 4, 8, 9, 12, 14, 16, 19]
+    assert matching({"$and": [{"insights_count": {"$gt": 2}}, {"insights_count": {"$lt": 4}}], "agent": {"$ne": "researcher"}}) == [3, 13]
+    assert matching({"task": {"$nin": ["task0", "task1", "task2"]}, "extra": "x"}) == [7, 11, 15, 19]
+    assert matching({"timestamp": {"$lt": "2024-05-30T00:00:00+00:00"}, "insights_count": {"$in": [0]}}) == [5, 10, 15]
+
+    # Deleted rows never match; compaction rebuilds the columns
+    store.delete(ids=["id4"])
+    store.compact()
+    assert matching({"insights_count": 4}) == [9, 14, 19]
+
+    with pytest.raises(ValueError):
+        store.get(where={"insights_count": {"$between": [1, 2]}})
+    # Range bounds must fit the column: numbers for numbers, timestamps for times
+    for where in (
+        {"insights_count": {"$gte": "3"}},
+        {"insights_count": {"$gte": week_ago}},
+        {"timestamp": {"$gte": "not-a-date"}},
+        {"timestamp": {"$gte": 3}}
+    ):
+        with pytest.raises(ValueError):
+            store.get(where=where)
+    with pytest.raises(ValueError):
+        store.query([1.0, 0.0], where={"tags": {"$gte": "a"}})
+
+
+def test_query_many_matrix_with_per_query_filters_and_k():
+    """A Q x D batch (per-query filters and k) returns what the queries return one by one."""
+    import numpy as np
+    from storage.simple_vector_store import SimpleVectorStore
+
+    rng = np.random.default_rng(2)
+    n = 400
+    agents = ["researcher", "architect", "planner", "strategist"]
+    store = SimpleVectorStore()
+    store.add(
+        [f"id{i}" for i in range(n)], rng.normal(size=(n, 12)), [f"doc{i}" for i in range(n)],
+        [{"agent": agents[i % 4]} for i in range(n)]
+    )
+
+    queries = rng.normal(size=(4, 12)).astype(np.float32)
+    wheres = [{"agent": agent} for agent in agents]
+    ks = [1, 3, 5, 7]
+    # Per-agent filters together cover the store, so the batch is one product with the whole matrix
+    batch = store.query_many(queries, n_results=ks, wheres=wheres)
+
+    for q, (where, k) in enumerate(zip(wheres, ks)):
+        single = store.query(queries[q].tolist(), n_results=k, where=where)
+        assert batch["ids"][q] == single["ids"][0]
+        assert np.allclose(batch["distances"][q], single["distances"][0], atol=1e-6)
+        assert all(m["agent"] == where["agent"] for m in batch["metadatas"][q])
+
+    # The caller's matrix is not normalized in place
+    assert not np.allclose(np.linalg.norm(queries, axis=1), 1.0)
+
+
+LEGACY_STORE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "storage", "vector_memory", "vector_store.json")
+
+
+def test_legacy_json_stream_reader_matches_json_load():
+    """The streaming reader yields the same arrays as json.load, even with tiny read chunks."""
+    import json
+    from storage.vector_log import _JsonStream
+
+    with open(LEGACY_STORE) as f:
+        expected = json.load(f)
+    with open(LEGACY_STORE) as f:
+        streamed = {}
+        for key, value in _JsonStream(f, chunk_size=7).items():
+            streamed.setdefault(key, []).append(value)
+
+    for key in ("vectors", "documents", "metadatas", "ids"):
+        assert streamed[key] == expected[key]
+
+
+def test_legacy_json_is_migrated_once(tmp_path):
+    """A legacy vector_store.json is converted to the log format and renamed."""
+    import json
+    import numpy as np
+    from storage.simple_vector_store import SimpleVectorStore
+
+    legacy = tmp_path / "vector_store.json"
+    shutil.copy(LEGACY_STORE, legacy)
+    with open(legacy) as f:
+        data = json.load(f)
+
+    store = SimpleVectorStore(persist_dir=str(tmp_path / "vector_store"), legacy_file=str(legacy))
+    assert store.count() == len(data["ids"])
+    assert store.get(limit=100)["documents"] == data["documents"]
+    assert not legacy.exists() and (tmp_path / "vector_store.json.migrated").exists()
+
+    # Search ranks entries as cosine similarity on the original vectors does
+    vectors = np.array(data["vectors"])
+    query = vectors[0] + vectors[1]
+    cosine = vectors @ query / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(query))
+    expected = [data["ids"][i] for i in np.argsort(cosine)[::-1][:3]]
+    assert store.query(query.tolist(), n_results=3)["ids"][0] == expected
+
+    reopened = SimpleVectorStore(persist_dir=str(tmp_path / "vector_store"), legacy_file=str(legacy))
+    assert reopened.get(limit=100)["ids"] == data["ids"]
+
+
+def test_log_appends_and_recovers_from_torn_writes(tmp_path):
+    """Writes append to the log; a torn tail is dropped on load and later writes stay aligned."""
+    from storage.simple_vector_store import SimpleVectorStore
+
+    path = str(tmp_path / "store")
+    store = SimpleVectorStore(persist_dir=path, compact_threshold=0.5)
+    store.add(["a", "b"], [[1.0, 0.0], [0.0, 1.0]], ["doc a", "doc b"], [{}, {}])
+    store.add(["c"], [[1.0, 1.0]], ["doc c"], [{}])
+    store.delete(ids=["b"])
+
+    log = store._log
+    assert os.path.getsize(log.vectors_file) == 3 * 2 * 4
+    with open(log.records_file) as f:
+        assert [line.count('"op"') for line in f] == [1, 1, 1, 1]
+
+    # Simulate a crash in the middle of the next write
+    with open(log.vectors_file, "ab") as f:
+        f.write(b"\x00" * 6)
+    with open(log.records_file, "a") as f:
+        f.write('{"op": "add", "row": 3, "id": "d", "docu')
+
+    recovered = SimpleVectorStore(persist_dir=path, compact_threshold=0.5)
+    assert recovered.get(limit=10)["ids"] == ["a", "c"]
+    recovered.add(["d"], [[0.0, 2.0]], ["doc d"], [{}])
+    assert SimpleVectorStore(persist_dir=path).query([0.0, 1.0], n_results=1)["ids"][0] == ["d"]
+
+    # Files removed underneath a running store are rewritten on the next write
+    log.remove()
+    recovered.add(["e"], [[2.0, 0.0]], ["doc e"], [{}])
+    assert SimpleVectorStore(persist_dir=path).get(limit=10)["ids"] == ["a", "c", "d", "e"]
+
+
+def test_open_is_lazy_and_answers_stats_from_manifest(tmp_path, monkeypatch):
+    """Reopening reads only the manifest until entries are needed; vectors are memory-mapped."""
+    import numpy as np
+    from storage.simple_vector_store import SimpleVectorStore
+    from storage.vector_log import VectorLog
+
+    path = str(tmp_path / "store")
+    store = SimpleVectorStore(persist_dir=path, model="nomic-embed-text", compact_threshold=0.9)
+    store.add(["a", "b", "a#chunk1"], [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]], ["doc a", "doc b", ""],
+              [{}, {}, {"parent_id": "a"}])
+    store.delete(ids=["b"])
+
+    loads = []
+    original_load = VectorLog.load
+    monkeypatch.setattr(VectorLog, "load", lambda self: (loads.append(1), original_load(self))[1])
+
+    reopened = SimpleVectorStore(persist_dir=path, model="nomic-embed-text")
+    assert (reopened.count(), reopened.vector_count(), reopened.dimension, reopened.model) == (1, 2, 3, "nomic-embed-text")
+    assert reopened.tombstone_ratio() == pytest.approx(1 / 3)
+    assert loads == []
+
+    assert reopened.query([0.0, 0.0, 1.0], n_results=5)["ids"][0] == ["a"]
+    assert loads == [1]
+    assert isinstance(reopened._matrix, np.memmap)
+
+    # The first insert moves the rows off the read-only map
+    reopened.add(["c"], [[1.0, 1.0, 0.0]], ["doc c"], [{}])
+    assert not isinstance(reopened._matrix, np.memmap)
+    assert SimpleVectorStore(persist_dir=path).count() == 2
+
+
+def test_ivf_index_search_persistence_and_fallbacks(tmp_path, monkeypatch):
+    """Large stores search through the IVF index, which is saved and reused on reopen."""
+    import numpy as np
+    from storage.simple_vector_store import SimpleVectorStore
+    from storage.ivf_index import IVFIndex
+
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(8, 32))
+    vectors = centers[rng.integers(0, 8, 600)] + rng.normal(scale=0.3, size=(600, 32))
+    ids = [str(i) for i in range(600)]
+    metadatas = [{"agent": "namer" if i == 5 else "researcher"} for i in range(600)]
+
+    path = str(tmp_path / "store")
+    store = SimpleVectorStore(persist_dir=path, ivf_min_rows=500, ivf_nprobe=6, compact_threshold=0.9)
+    store.add(ids[:400], vectors[:400].tolist(), [""] * 400, metadatas[:400])
+    assert not store.use_index  # below ivf_min_rows: exact search
+    store.add(ids[400:], vectors[400:].tolist(), [""] * 200, metadatas[400:])
+    assert store.use_index
+
+    exact = SimpleVectorStore()
+    exact.add(ids, vectors.tolist(), [""] * 600, metadatas)
+    queries = (centers + rng.normal(scale=0.3, size=centers.shape)).tolist()
+    approximate = store.query_many(queries, n_results=10)["ids"]
+    expected = exact.query_many(queries, n_results=10)["ids"]
+    hits = sum(len(set(a) & set(e)) for a, e in zip(approximate, expected))
+    assert hits / 80 >= 0.9
+
+    # A filter the probed lists cannot satisfy falls back to exact search
+    assert store.query(vectors[5].tolist(), where={"agent": "namer"})["ids"][0] == ["5"]
+    far = -vectors[5]
+    assert store.query(far.tolist(), n_results=1, where={"agent": "namer"})["ids"][0] == ["5"]
+
+    # Deleted rows never come back from the index
+    store.delete(ids=expected[0][:3])
+    assert not set(expected[0][:3]) & set(store.query(queries[0], n_results=10)["ids"][0])
+
+    trained = []
+    original_train = IVFIndex.train
+    monkeypatch.setattr(IVFIndex, "train", lambda self, v: (trained.append(len(v)), original_train(self, v))[1])
+    reopened = SimpleVectorStore(persist_dir=path, ivf_min_rows=500, ivf_nprobe=6)
+    assert reopened.query_many(queries, n_results=10)["ids"] == store.query_many(queries, n_results=10)["ids"]
+    assert reopened.use_index and trained == []
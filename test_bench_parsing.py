@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""Regression checks for the agent output parser over the export-based corpus."""
+
+import json
+import os
+import random
+import sys
+
+import pytest
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bench_parsing
+from agents.parsing import extract_agent_output
+
+EXPORT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "exports")
+OBJECTS = bench_parsing.harvest_objects(EXPORT_DIR)
+
+pytestmark = pytest.mark.skipif(not OBJECTS, reason="no exports available")
+
+
+@pytest.mark.parametrize("mutation", sorted(set(bench_parsing.MUTATORS) - {"truncated"}))
+def test_tolerant_parser_recovers_every_variant(mutation):
+    """Every synthetic variant except truncation is recovered with its exact content."""
+    cases = [c for c in bench_parsing.build_synthetic_corpus(OBJECTS, variants=2) if c["mutation"] == mutation]
+
+    for case in cases:
+        parsed = bench_parsing.tolerant_parse(case["text"], case["role"])
+        assert parsed is not None, case["text"][:200]
+        assert bench_parsing.content_matches(parsed, case), case["text"][:200]
+
+
+def test_truncated_variants_keep_a_prefix():
+    """Truncated output yields the beginning of the result in most cases."""
+    cases = [c for c in bench_parsing.build_synthetic_corpus(OBJECTS, variants=2) if c["mutation"] == "truncated"]
+    stats = bench_parsing.measure(bench_parsing.tolerant_parse, cases, rounds=0)
+
+    assert stats["correct"] >= 0.8
+
+
+def test_mutators_break_strict_json():
+    """Damaged variants really are invalid for json.loads."""
+    rng = random.Random(1)
+    obj = OBJECTS[0]
+    for name in ("unescaped", "truncated", "multiple"):
+        text = bench_parsing.MUTATORS[name](obj, rng)
+        with pytest.raises(json.JSONDecodeError):
+            json.loads(text)
+        assert extract_agent_output(text, obj["role"])["parsing_error"] is True
+
+
+def test_real_responses_not_worse_than_legacy():
+    """The tolerant parser recovers every real response the legacy path recovered model content from."""
+    for role, text in bench_parsing.harvest_responses(EXPORT_DIR):
+        legacy = bench_parsing.legacy_parse(text, role)
+        if legacy is not None and not bench_parsing.is_legacy_placeholder(legacy):
+            assert bench_parsing.tolerant_parse(text, role) is not None
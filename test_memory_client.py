@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""Tests for the pooled memory client against a local fake memory server."""
+
+import os
+import sys
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from agents.engine import MemoryClient, memory_context_query
+
+
+def make_app(hits, batch=True):
+    async def health(request):
+        hits["health"] = hits.get("health", 0) + 1
+        return web.json_response({"status": "healthy"})
+
+    async def search(request):
+        hits["search"] = hits.get("search", 0) + 1
+        body = await request.json()
+        return web.json_response({"results": [{"id": "1", "text": f"memory for {body['agent']}", "metadata": {}}]})
+
+    async def search_batch(request):
+        hits["search_batch"] = hits.get("search_batch", 0) + 1
+        body = await request.json()
+        return web.json_response({
+            "results": [
+                {"query": q["query"], "n_results": 1, "results": [{"id": "1", "text": f"memory for {q['agent']}", "metadata": {}}]}
+                for q in body["queries"]
+            ],
+            "count": len(body["queries"])
+        })
+
+    async def store(request):
+        hits["store"] = hits.get("store", 0) + 1
+        hits.setdefault("stored", []).append((await request.json())["agent"])
+        return web.json_response({"id": "x", "status": "success"})
+
+    async def store_batch(request):
+        hits["store_batch"] = hits.get("store_batch", 0) + 1
+        if hits.pop("fail_next", False):
+            return web.json_response({"detail": "embedding backend busy"}, status=503)
+        items = (await request.json())["items"]
+        hits.setdefault("stored", []).extend(item["agent"] for item in items)
+        return web.json_response({"ids": [str(i) for i in range(len(items))], "count": len(items)})
+
+    app = web.Application()
+    app.router.add_get("/memory/health", health)
+    app.router.add_post("/memory/search", search)
+    app.router.add_post("/memory/store", store)
+    if batch:
+        app.router.add_post("/memory/search_batch", search_batch)
+        app.router.add_post("/memory/store_batch", store_batch)
+    return app
+
+
+@pytest_asyncio.fixture
+async def memory_server(request, serve_app):
+    hits = {}
+    return {"url": await serve_app(make_app(hits, batch=request.param)), "hits": hits}
+
+
+QUERIES = [memory_context_query(role, "Analyze SME automation") for role in ("researcher", "strategist", "architect")]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("memory_server", [True], indirect=True)
+async def test_prefetch_is_one_request(memory_server):
+    """All agents' context comes back from a single batch request over the pooled session."""
+    client = MemoryClient(memory_server["url"])
+    await client.initialize()
+    session = client._session
+
+    contexts = await client.search_batch(QUERIES)
+    await client.search("follow-up", agent="researcher")
+
+    assert [c[0]["text"] for c in contexts] == ["memory for researcher", "memory for strategist", "memory for architect"]
+    assert memory_server["hits"] == {"health": 1, "search_batch": 1, "search": 1}
+    assert client._session is session
+
+    await client.close()
+    assert session.closed
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("memory_server", [False], indirect=True)
+async def test_prefetch_falls_back_without_batch_endpoint(memory_server):
+    """Older servers get concurrent single searches, and the batch endpoint is not retried."""
+    client = MemoryClient(memory_server["url"])
+    await client.initialize()
+
+    first = await client.search_batch(QUERIES)
+    second = await client.search_batch(QUERIES[:1])
+    await client.close()
+
+    assert [c[0]["text"] for c in first] == ["memory for researcher", "memory for strategist", "memory for architect"]
+    assert len(second) == 1
+    assert memory_server["hits"]["search"] == 4
+
+
+ROLES = ["researcher", "strategist", "product_manager", "architect", "project_manager", "namer", "copywriter"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("memory_server", [True], indirect=True)
+async def test_write_behind_batches_and_retries(memory_server):
+    """Queued stores are flushed in batches; a failed batch is retried; close() drains."""
+    client = MemoryClient(memory_server["url"])
+    await client.initialize()
+    memory_server["hits"]["fail_next"] = True
+
+    for role in ROLES:
+        assert await client.enqueue_store(f"output of {role}", agent=role, task="t")
+    await client.close()
+
+    assert sorted(memory_server["hits"]["stored"]) == sorted(ROLES)
+    assert memory_server["hits"]["store_batch"] <= 3
+    assert "store" not in memory_server["hits"]
+    assert client.write_stats["stored"] == len(ROLES)
+    assert client.write_stats["failed"] == 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("memory_server", [False], indirect=True)
+async def test_write_behind_falls_back_to_single_stores(memory_server):
+    """Without the batch endpoint every entry is posted to /memory/store."""
+    client = MemoryClient(memory_server["url"])
+    await client.initialize()
+
+    for role in ROLES[:3]:
+        await client.enqueue_store(f"output of {role}", agent=role, task="t")
+    await client.close()
+
+    assert memory_server["hits"]["store"] == 3
+    assert client.write_stats["stored"] == 3
+
+
+@pytest.mark.asyncio
+async def test_enqueue_without_server_is_noop():
+    """Nothing is queued when the memory server is not available."""
+    client = MemoryClient("http://127.0.0.1:9")
+    assert await client.enqueue_store("text", agent="researcher", task="t") is False
+    await client.close()
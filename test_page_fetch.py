@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""Offline tests for the page fetch pipeline against a local HTTP fixture server."""
+
+import asyncio
+import os
+import sys
+
+import aiohttp
+import pytest
+import pytest_asyncio
+from aiohttp import web
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from agents.page_fetch import PageFetcher, attach_page_excerpts, chunk_text, extract_text
+
+
+ARTICLE_HTML = """<html><head><title>SME Automation Report</title>
+<script>var tracking = "should not appear";</script></head>
+<body>
+<nav><a href="/">Home</a> <a href="/about">About us and our long menu entry</a></nav>
+<header>Subscribe to our newsletter for the latest updates</header>
+<article>
+<h1>Automation pain points</h1>
+<p>Small businesses spend hours every week on manual invoice processing and data entry.</p>
+<p>Most SMEs cite integration costs as the main barrier to adopting automation tools.</p>
+</article>
+<footer>Copyright 2024 Example Media, all rights reserved worldwide</footer>
+</body></html>"""
+
+
+@pytest_asyncio.fixture
+async def fixture_server(serve_app):
+    """Serve canned pages on localhost and count requests per path."""
+    hits = {}
+    active = {"now": 0, "peak": 0}
+
+    async def article(request):
+        hits["article"] = hits.get("article", 0) + 1
+        if request.headers.get("If-None-Match") == '"v1"':
+            return web.Response(status=304)
+        return web.Response(text=ARTICLE_HTML, content_type="text/html", headers={"ETag": '"v1"'})
+
+    async def huge(request):
+        resp = web.StreamResponse(headers={"Content-Type": "text/plain"})
+        await resp.prepare(request)
+        for _ in range(64):
+            await resp.write(b"word " * 2048)
+        return resp
+
+    async def slow(request):
+        active["now"] += 1
+        active["peak"] = max(active["peak"], active["now"])
+        await asyncio.sleep(0.05)
+        active["now"] -= 1
+        return web.Response(text="<p>Slow page content with enough words here.</p>", content_type="text/html")
+
+    async def binary(request):
+        return web.Response(body=b"\x89PNG", content_type="image/png")
+
+    app = web.Application()
+    app.router.add_get("/article", article)
+    app.router.add_get("/huge", huge)
+    app.router.add_get("/slow/{n}", slow)
+    app.router.add_get("/image", binary)
+
+    return {"base": await serve_app(app), "hits": hits, "active": active}
+
+
+def test_extract_text_strips_boilerplate():
+    """Navigation, header, footer and scripts are dropped."""
+    page = extract_text(ARTICLE_HTML)
+
+    assert page["title"] == "SME Automation Report"
+    assert "manual invoice processing" in page["text"]
+    assert "tracking" not in page["text"]
+    assert "newsletter" not in page["text"]
+    assert "Copyright" not in page["text"]
+
+
+def test_chunk_text_overlaps():
+    """Chunks cover the whole text and respect the size limit."""
+    text = " ".join(f"w{i}" for i in range(500))
+    chunks = chunk_text(text, chunk_chars=200, overlap=40)
+
+    assert len(chunks) > 1
+    assert all(len(c) <= 200 for c in chunks)
+    assert chunks[0].startswith("w0 ")
+    assert chunks[-1].endswith("w499")
+
+
+@pytest.mark.asyncio
+async def test_fetch_uses_etag_cache(fixture_server):
+    """A second fetch revalidates with If-None-Match and reuses the cached text."""
+    fetcher = PageFetcher()
+    url = fixture_server["base"] + "/article"
+
+    async with aiohttp.ClientSession() as session:
+        first = await fetcher.fetch(session, url)
+        second = await fetcher.fetch(session, url)
+
+    assert first["cached"] is False
+    assert second["cached"] is True
+    assert second["text"] == first["text"]
+    assert fetcher.stats["revalidated"] == 1
+    assert fixture_server["hits"]["article"] == 2
+
+
+@pytest.mark.asyncio
+async def test_cache_evicts_least_recently_used(fixture_server):
+    """Cache hits and 304 revalidations keep a page; the least recently used one is evicted."""
+    fetcher = PageFetcher(max_cache_entries=2)
+    base = fixture_server["base"]
+
+    async with aiohttp.ClientSession() as session:
+        await fetcher.fetch(session, base + "/article")
+        await fetcher.fetch(session, base + "/slow/1")
+        assert (await fetcher.fetch(session, base + "/article"))["cached"] is True  # 304
+        await fetcher.fetch(session, base + "/slow/2")
+        assert list(fetcher._cache) == [base + "/article", base + "/slow/2"]
+
+        assert (await fetcher.fetch(session, base + "/slow/2"))["cached"] is True  # TTL hit
+        await fetcher.fetch(session, base + "/article")
+        await fetcher.fetch(session, base + "/slow/3")
+        assert list(fetcher._cache) == [base + "/article", base + "/slow/3"]
+
+
+@pytest.mark.asyncio
+async def test_fetch_caps_body_size(fixture_server):
+    """Reads stop at max_bytes even for large streamed bodies."""
+    fetcher = PageFetcher(max_bytes=10_000)
+
+    async with aiohttp.ClientSession() as session:
+        page = await fetcher.fetch(session, fixture_server["base"] + "/huge")
+
+    assert page["truncated"] is True
+    assert len(page["text"]) <= 10_000
+
+
+@pytest.mark.asyncio
+async def test_fetch_bounds_concurrency_and_skips_non_text(fixture_server):
+    """No more than `concurrency` requests are in flight; binary pages are skipped."""
+    fetcher = PageFetcher(concurrency=2)
+    urls = [fixture_server["base"] + f"/slow/{i}" for i in range(6)]
+
+    async with aiohttp.ClientSession() as session:
+        pages = await fetcher.fetch_many(session, urls + [fixture_server["base"] + "/image"])
+
+    assert all(p is not None for p in pages[:-1])
+    assert pages[-1] is None
+    assert fixture_server["active"]["peak"] <= 2
+
+
+@pytest.mark.asyncio
+async def test_attach_page_excerpts(fixture_server):
+    """Search result items gain excerpts relevant to their query."""
+    fetcher = PageFetcher()
+    search_results = [{
+        "query": "SME integration costs",
+        "items": [{"title": "Report", "snippet": "", "url": fixture_server["base"] + "/article"}]
+    }]
+
+    async with aiohttp.ClientSession() as session:
+        attached = await attach_page_excerpts(fetcher, session, search_results)
+
+    assert attached == 1
+    assert "integration costs" in search_results[0]["items"][0]["excerpt"]
@@ -1,7 +1,6 @@
 #!/usr/bin/env python3
-"""Test script to validate JSON parsing fixes for strategist and project_manager agents."""
+"""Test the tolerant agent output parser against responses seen from strategist and project_manager agents."""
 
-import asyncio
 import json
 import sys
 import os
@@ -9,17 +8,10 @@ import os
 # Add current directory to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from agents.engine import run_subagent
-from agents.engine import mcp_client, memory_client
-import aiohttp
+from agents.parsing import extract_agent_output
 
 
-class MockSession:
-    """Mock session for testing."""
-    pass
-
-
-async def test_strategist_parsing():
+def test_strategist_parsing():
     """Test strategist agent parsing with mock response that has extra data."""
     print("Testing Strategist Agent Parsing...")
 
@@ -32,57 +24,26 @@ async def test_strategist_parsing():
 }
 SEARCH_REQUEST: "SME automation market size 2024"'''
 
-    # Test the parsing logic
-    role = "strategist"
-
-    # Simulate the JSON parsing section from run_subagent
     try:
-        result = json.loads(mock_response)
-        print("❌ Direct JSON parsing should have failed with extra data")
-        return False
+        json.loads(mock_response)
+        raise AssertionError("Direct JSON parsing should have failed with extra data")
     except json.JSONDecodeError as e:
         print(f"✅ Direct JSON parsing failed as expected: {e}")
 
-        # Test our custom handling
-        if role == "strategist" and mock_response.strip().startswith('{'):
-            print("🔧 Testing strategist custom parsing...")
-
-            json_start = mock_response.find('{')
-            json_end = mock_response.find('}', json_start) + 1
-
-            if json_start != -1 and json_end > json_start:
-                try:
-                    json_part = mock_response[json_start:json_end]
-                    result = json.loads(json_part)
-                    print("✅ Successfully extracted JSON for Strategist agent")
+    result = extract_agent_output(mock_response, "strategist")
 
-                    # Check for search requests in remaining text
-                    remaining_text = mock_response[json_end:]
-                    search_requests = []
-                    if "SEARCH_REQUEST:" in remaining_text:
-                        lines = remaining_text.split('\n')
-                        for line in lines:
-                            if "SEARCH_REQUEST:" in line:
-                                query = line.split("SEARCH_REQUEST:", 1)[1].strip().strip('"')
-                                if query:
-                                    search_requests.append(query)
+    assert result["role"] == "strategist"
+    assert result["result"].startswith("SaaS Concept 1")
+    assert len(result["insights"]) == 2
+    assert result["search_requests"] == ["SME automation market size 2024"]
+    assert result["parsing_error"] is True
+    assert result["extraction_method"] == "extracted"
 
-                    result["search_requests"] = search_requests
-                    result["parsing_error"] = True
-                    result["extraction_method"] = "strategist_json_first"
+    print(f"✅ Successfully processed Strategist with {len(result['search_requests'])} search requests")
+    print(f"   Result: {result['result'][:50]}...")
 
-                    print(f"✅ Successfully processed Strategist with {len(search_requests)} search requests")
-                    print(f"   Result: {result.get('result', '')[:50]}...")
-                    return True
 
-                except json.JSONDecodeError:
-                    print("❌ Custom parsing failed")
-                    return False
-
-    return False
-
-
-async def test_project_manager_parsing():
+def test_project_manager_parsing():
     """Test project manager agent parsing with complex markdown content."""
     print("\nTesting Project Manager Agent Parsing...")
 
@@ -153,112 +114,83 @@ The objective is to deliver a fully-functional, AI-driven chatbot that handles T
   "search_requests": ["AI chatbot development best practices", "CRM integration patterns", "ML model deployment strategies"]
 }'''
 
-    role = "project_manager"
-
-    # Test direct parsing (should fail due to complex content)
+    # Test direct parsing (should fail due to raw newlines in the markdown)
     try:
-        result = json.loads(mock_response)
-        print("❌ Direct JSON parsing should have failed with complex markdown")
-        return False
+        json.loads(mock_response)
+        raise AssertionError("Direct JSON parsing should have failed with complex markdown")
     except json.JSONDecodeError as e:
         print(f"✅ Direct JSON parsing failed as expected: {str(e)[:100]}...")
 
-        # Test our custom handling (simulate the logic from engine.py)
-        if role == "project_manager":
-            print("🔧 Testing project manager custom parsing...")
+    result = extract_agent_output(mock_response, "project_manager")
 
-            json_start = mock_response.find('{')
-            json_end = mock_response.rfind('}') + 1
+    assert result["role"] == "project_manager"
+    assert result["result"].startswith("## Detailed Project Plan")
+    assert "| Phase 6 – Post-Launch Support | 4 weeks |" in result["result"]
+    assert result["result"].endswith("API response time < 200ms")
+    assert len(result["insights"]) == 3
+    assert result["search_requests"][0] == "AI chatbot development best practices"
+    assert result["extraction_method"] == "repaired"
 
-            if json_start != -1 and json_end > json_start:
-                json_content = mock_response[json_start:json_end]
+    print("✅ Successfully processed Project Manager agent")
+    print(f"   Result contains: {len(result['result'])} characters")
 
-                try:
-                    import re
 
-                    # Apply the quote escaping logic from engine.py
-                    json_content = re.sub(r'(\w)"(\w)', r'\1\\"\2', json_content)
-                    json_content = re.sub(r'"(\w*)"(\w*)"', r'"\1\\"\2"', json_content)
+def test_truncated_and_multiple_objects():
+    """Truncated output is closed and multiple objects are merged."""
+    print("\nTesting truncated and multi-object responses...")
 
-                    def escape_internal_quotes(match):
-                        value = match.group(1)
-                        escaped = re.sub(r'(?<!^)(?<!:)\"(?!\s*[,}])', r'\\"', value)
-                        return f'"{escaped}"'
+    truncated = '{"role": "analyst", "result": "Market is growing", "insights": ["CAGR 12%", "Fragmented'
+    result = extract_agent_output(truncated, "analyst")
+    assert result["result"] == "Market is growing"
+    assert result["insights"] == ["CAGR 12%", "Fragmented"]
+    assert result["extraction_method"] == "truncated"
 
-                    json_content = re.sub(r'"([^"]*)"', escape_internal_quotes, json_content)
+    multiple = (
+        'Here is my analysis:\n'
+        '{"role": "critic", "result": "Part one", "insights": ["a"], "search_requests": []}\n'
+        '{"role": "critic", "result": "Part two", "insights": ["a", "b"], "search_requests": ["q1"]}\n'
+    )
+    result = extract_agent_output(multiple, "critic")
+    assert result["result"] == "Part one\n\nPart two"
+    assert result["insights"] == ["a", "b"]
+    assert result["search_requests"] == ["q1"]
+    assert result["extraction_method"] == "merged"
 
-                    result = json.loads(json_content)
-                    print("✅ Successfully parsed JSON for Project Manager after quote escaping")
+    result = extract_agent_output("I could not produce JSON this time.", "critic")
+    assert result["extraction_method"] == "raw_text"
+    assert result["result"] == "I could not produce JSON this time."
 
-                    result["parsing_error"] = True
-                    result["extraction_method"] = "project_manager_quote_escape"
+    print("✅ Truncated, merged and raw text responses handled")
 
-                    print("✅ Successfully processed Project Manager agent")
-                    print(f"   Result contains: {len(result.get('result', ''))} characters")
-                    return True
 
-                except (json.JSONDecodeError, re.error) as e:
-                    print(f"⚠️ Advanced quote escaping failed: {str(e)[:100]}...")
-
-                    # Test fallback content extraction
-                    try:
-                        result_start = mock_response.find('"result":')
-                        if result_start != -1:
-                            result_end = mock_response.find('"insights":', result_start)
-                            if result_end == -1:
-                                result_end = mock_response.find('"search_requests":', result_start)
-                            if result_end == -1:
-                                result_end = mock_response.find('}', result_start)
-
-                            if result_end != -1:
-                                result_content = mock_response[result_start:result_end].strip()
-                                content_match = re.search(r'"result":\s*"([^"]*)"', result_content, re.DOTALL)
-                                if content_match:
-                                    markdown_content = content_match.group(1)
-                                    markdown_content = markdown_content.replace('\\"', '"').replace('\\n', '\n')
-
-                                    print("✅ Content extraction fallback successful")
-                                    print(f"   Extracted {len(markdown_content)} characters of markdown")
-                                    return True
-
-                        # Test general markdown extraction
-                        if "## " in mock_response or "### " in mock_response:
-                            lines = mock_response.split('\n')
-                            result_content = []
-                            in_result = False
-
-                            for line in lines:
-                                if line.strip().startswith('## ') or line.strip().startswith('### '):
-                                    in_result = True
-                                if in_result and line.strip():
-                                    result_content.append(line)
-
-                            if result_content:
-                                print("✅ Markdown fallback successful")
-                                return True
-
-                    except Exception as fallback_e:
-                        print(f"❌ Fallback extraction failed: {fallback_e}")
-
-    return False
+def passes(test) -> bool:
+    """Run a test function, reporting a failed assertion instead of raising it."""
+    try:
+        test()
+        return True
+    except AssertionError as e:
+        print(f"❌ {test.__name__} failed: {e}")
+        return False
 
 
-async def main():
+def main():
     """Run parsing tests."""
     print("🧪 Testing JSON Parsing Fixes\n")
 
-    strategist_success = await test_strategist_parsing()
-    project_manager_success = await test_project_manager_parsing()
+    strategist_success = passes(test_strategist_parsing)
+    project_manager_success = passes(test_project_manager_parsing)
+    recovery_success = passes(test_truncated_and_multiple_objects)
 
     print(f"\n📊 Test Results:")
     print(f"   Strategist parsing: {'✅ PASS' if strategist_success else '❌ FAIL'}")
     print(f"   Project Manager parsing: {'✅ PASS' if project_manager_success else '❌ FAIL'}")
+    print(f"   Truncated/merged parsing: {'✅ PASS' if recovery_success else '❌ FAIL'}")
 
-    if strategist_success and project_manager_success:
-        print("\n🎉 All parsing tests passed! The fixes should resolve the agent issues.")
+    if strategist_success and project_manager_success and recovery_success:
+        print("\n🎉 All parsing tests passed!")
     else:
-        print("\n⚠️ Some tests failed. The fixes may need further adjustment.")
+        print("\n⚠️ Some tests failed.")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""Tests for the web search token-bucket rate limiter."""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from agents.rate_limit import SearchRateLimiter, RateLimitExceeded
+
+
+@pytest.mark.asyncio
+async def test_burst_then_priority_order():
+    """The burst is served immediately; queued requests are served by priority."""
+    limiter = SearchRateLimiter(rate=50.0, burst=1, max_queue=10, priorities={"researcher": 0, "namer": 1})
+    order = []
+
+    async def search(role):
+        await limiter.acquire("primary", role)
+        order.append(role)
+
+    await limiter.acquire("primary", "namer")  # Uses the single burst token
+    await asyncio.gather(search("namer"), search("copywriter"), search("researcher"))
+
+    assert order == ["researcher", "namer", "copywriter"]
+    stats = limiter.snapshot()["primary"]
+    assert stats["requests"] == 4
+    assert stats["waited"] == 3
+    assert stats["max_wait"] > 0
+    # The average covers the requests that queued, not the burst one
+    assert stats["avg_wait"] == pytest.approx(stats["total_wait"] / 3)
+
+
+@pytest.mark.asyncio
+async def test_groups_are_independent_and_queue_is_bounded():
+    """Each engine group has its own bucket; a full queue rejects new requests."""
+    limiter = SearchRateLimiter(rate=5.0, burst=1, max_queue=1)
+
+    await limiter.acquire("primary")
+    assert await limiter.acquire("fallback") == 0.0
+
+    waiter = asyncio.ensure_future(limiter.acquire("primary"))
+    await asyncio.sleep(0)
+    with pytest.raises(RateLimitExceeded):
+        await limiter.acquire("primary")
+
+    await waiter
+    assert limiter.snapshot()["primary"]["rejected"] == 1
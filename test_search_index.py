@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Tests for the local full-text index of web search results."""
+
+import os
+import sys
+import time
+
+import pytest
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from agents import engine
+from agents.search_index import SearchIndex
+
+
+ITEMS = [
+    {"title": "SME automation trends", "snippet": "Invoice processing is the top automation pain point", "url": "https://a.example/1"},
+    {"title": "Cloud pricing guide", "snippet": "Comparing SaaS pricing tiers", "url": "https://b.example/2"},
+]
+
+
+def test_index_ranks_and_filters_by_age(tmp_path):
+    """BM25 ranks the matching entry first; stale entries are excluded by max_age."""
+    index = SearchIndex(str(tmp_path / "index.sqlite3"))
+    index.add_results("sme automation", ITEMS, timestamp=time.time() - 3600)
+
+    hits = index.search("automation pain points")
+    assert hits[0]["url"] == "https://a.example/1"
+    assert index.search("automation", max_age=60) == []
+
+    # Re-indexing a URL refreshes it instead of duplicating it
+    index.add_results("sme automation", ITEMS[:1])
+    assert index.count() == 2
+    assert len(index.search("automation", max_age=60)) == 1
+    index.close()
+
+
+@pytest.mark.asyncio
+async def test_web_search_falls_back_to_index(monkeypatch):
+    """When SearXNG fails, previously indexed results are returned."""
+    index = SearchIndex(":memory:")
+    index.add_results("sme automation", ITEMS)
+
+    async def failing_search(query, max_results=5, role=None):
+        return {"results": "down", "urls": [], "query": query, "error": "HTTP 502"}
+
+    monkeypatch.setattr(engine, "_search_index", index)
+    monkeypatch.setattr(engine, "SEARCH_INDEX_MODE", "fallback")
+    monkeypatch.setattr(engine, "_searxng_search", failing_search)
+
+    result = await engine.web_search("automation pain points")
+
+    assert result["source"] == "local_index"
+    assert result["urls"][0] == "https://a.example/1"
+    assert result["live_error"] == "HTTP 502"
+
+
+@pytest.mark.asyncio
+async def test_cache_first_ignores_hits_sharing_one_term(monkeypatch):
+    """cache_first only serves hits that cover the query; unrelated ones fall through to SearXNG."""
+    index = SearchIndex(":memory:")
+    index.add_results("AI chatbot market size", [
+        {"title": f"AI chatbot market size report {i}", "snippet": "Chatbot market grows", "url": f"https://c.example/{i}"}
+        for i in range(5)
+    ])
+    assert len(index.search("SEO agency pricing market 2024")) == 5
+    assert index.search("SEO agency pricing market 2024", min_coverage=0.75) == []
+    assert len(index.search("chatbot market size", min_coverage=0.75)) == 5
+
+    live_queries = []
+
+    async def live_search(query, max_results=5, role=None):
+        live_queries.append(query)
+        return {"results": "live", "urls": [], "items": [], "query": query}
+
+    monkeypatch.setattr(engine, "_search_index", index)
+    monkeypatch.setattr(engine, "SEARCH_INDEX_MODE", "cache_first")
+    monkeypatch.setattr(engine, "_searxng_search", live_search)
+
+    result = await engine.web_search("SEO agency pricing market 2024")
+    assert result["results"] == "live"
+    assert live_queries == ["SEO agency pricing market 2024"]
+
+    result = await engine.web_search("AI chatbot market size")
+    assert result["source"] == "local_index"
+    assert live_queries == ["SEO agency pricing market 2024"]
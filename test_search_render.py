@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Tests for the compact rendering of web search results in prompts."""
+
+import os
+import sys
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from agents.search_render import estimate_tokens, extract_search_item, render_search_results
+
+
+def item(n, snippet="snippet"):
+    return {"title": f"Title {n}", "snippet": snippet, "url": f"https://example.com/{n}"}
+
+
+def test_extract_search_item_keeps_compact_triple():
+    """Whitespace is collapsed, long fields are cut at a word boundary, other fields dropped."""
+    raw = {"title": "  A\n title ", "content": "word " * 200, "url": "https://a.example", "engine": "ddg", "score": 3}
+    extracted = extract_search_item(raw)
+
+    assert set(extracted) == {"title", "snippet", "url"}
+    assert extracted["title"] == "A title"
+    assert len(extracted["snippet"]) <= 501 and extracted["snippet"].endswith("word…")
+    assert extract_search_item({})["snippet"] == ""
+
+
+def test_render_interleaves_by_rank_and_lists_shared_urls_once():
+    """Top hits of every query come first; a URL found by several queries appears once."""
+    results = [
+        {"query": "q1", "items": [item(1), item(2), item(3)]},
+        {"query": "q2", "items": [item(1), item(4)]},
+    ]
+    text = render_search_results(results, token_budget=10000)
+
+    assert text.splitlines()[0] == "Queries: q1; q2"
+    urls = [line for line in text.splitlines() if line.startswith("https://")]
+    assert urls == ["https://example.com/1", "https://example.com/2", "https://example.com/4", "https://example.com/3"]
+    assert "[4] Title 3" in text
+
+
+def test_render_stops_at_token_budget():
+    """Entries that would exceed the budget are left out; fewer entries fit a smaller budget."""
+    results = [{"query": "q", "items": [item(n, snippet="x " * 100) for n in range(10)]}]
+    full = render_search_results(results, token_budget=10000)
+    small = render_search_results(results, token_budget=200)
+
+    assert full.count("https://") == 10
+    assert 0 < small.count("https://") < 10
+    assert estimate_tokens(small) <= 200
+
+    # Not even one entry fits
+    assert render_search_results(results, token_budget=5).endswith("(results omitted: token budget exhausted)")
+
+
+def test_render_reports_errors_and_empty_results():
+    """Failed searches are reported; no results at all says so."""
+    failed = [{"query": "q", "results": "down", "urls": [], "error": "HTTP 502"}]
+    text = render_search_results(failed)
+    assert '(search for "q" failed: HTTP 502)' in text
+    assert "No results found." not in text
+
+    assert render_search_results([{"query": "q", "items": []}]).endswith("No results found.")
+    assert render_search_results([]) == "Search results\nNo results found."
+
+    # Older results only carry URLs
+    assert "https://legacy.example" in render_search_results([{"query": "q", "urls": ["https://legacy.example"]}])
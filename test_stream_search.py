@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""Tests for dispatching web searches while an agent response is still streaming."""
+
+import asyncio
+import json
+import os
+import sys
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from agents import engine
+from agents.parsing import SearchRequestStream
+
+RESPONSE = (
+    '{\n  "role": "researcher",\n  "result": "Mentions \\"search_requests\\" in prose",\n'
+    '  "insights": ["a"],\n  "search_requests": ["sme automation 2024", SEARCH_REQUEST: "saas pricing",\n  ]\n}\n'
+    'SEARCH_REQUEST: "invoice software market"'
+)
+
+
+@pytest.mark.parametrize("step", [1, 5, 64, len(RESPONSE)])
+def test_stream_recognizes_requests_at_any_fragment_size(step):
+    """Array entries and SEARCH_REQUEST lines are reported once, whatever the chunking."""
+    stream = SearchRequestStream()
+    found = []
+    for i in range(0, len(RESPONSE), step):
+        found += stream.feed(RESPONSE[i:i + step])
+    found += stream.finish()
+
+    assert found == ["sme automation 2024", "saas pricing", "invoice software market"]
+
+
+def test_stream_reports_entry_before_array_closes():
+    """An entry is emitted as soon as its closing quote is confirmed."""
+    stream = SearchRequestStream()
+    assert stream.feed('{"search_requests": ["first query"') == []
+    assert stream.feed(', "sec') == ["first query"]
+
+
+def test_stream_drops_scanned_text():
+    """Only an unfinished entry or token is carried between fragments, not the whole response."""
+    stream = SearchRequestStream()
+    longest = 0
+    text = "prose " * 2000 + RESPONSE
+    for char in text:
+        stream.feed(char)
+        longest = max(longest, len(stream.buffer))
+    assert stream.finish() == ["invoice software market"]
+    assert longest < 100
+
+
+@pytest.mark.asyncio
+async def test_searches_start_before_generation_finishes(monkeypatch, serve_app):
+    """The first search is dispatched while the model is still producing tokens."""
+    tokens = [RESPONSE[i:i + 8] for i in range(0, len(RESPONSE), 8)]
+    state = {"done": False}
+
+    async def generate(request):
+        resp = web.StreamResponse()
+        await resp.prepare(request)
+        for token in tokens:
+            await resp.write((json.dumps({"response": token}) + "\n").encode())
+            await asyncio.sleep(0.005)
+        state["done"] = True
+        await resp.write(b'{"done": true}\n')
+        return resp
+
+    app = web.Application()
+    app.router.add_post("/api/generate", generate)
+    base = await serve_app(app)
+
+    started = []
+
+    async def fake_search(query, max_results=5, role=None):
+        started.append((query, state["done"]))
+        return {"query": query, "results": "", "items": []}
+
+    monkeypatch.setattr(engine, "OLLAMA_URL", f"{base}/api/generate")
+    monkeypatch.setattr(engine, "web_search", fake_search)
+
+    searches = {}
+    async with aiohttp.ClientSession() as session:
+        response = await engine.call_ollama_dispatching_searches(session, "prompt", "researcher", searches)
+        await asyncio.gather(*searches.values())
+
+    assert response == RESPONSE
+    assert list(searches) == ["sme automation 2024", "saas pricing", "invoice software market"]
+    assert started[0] == ("sme automation 2024", False)
+
+
+@pytest.mark.asyncio
+async def test_retry_after_partial_stream_dispatches_each_search_once(monkeypatch, serve_app):
+    """A retried generation is parsed from scratch and does not start its searches again."""
+    attempts = {"count": 0}
+
+    async def generate(request):
+        attempts["count"] += 1
+        resp = web.StreamResponse()
+        await resp.prepare(request)
+        text = RESPONSE if attempts["count"] > 1 else RESPONSE[:RESPONSE.index("saas") + 2]
+        for i in range(0, len(text), 8):
+            await resp.write((json.dumps({"response": text[i:i + 8]}) + "\n").encode())
+        if attempts["count"] == 1:
+            # Cut the connection mid-stream
+            request.transport.close()
+            return resp
+        await resp.write(b'{"done": true}\n')
+        return resp
+
+    app = web.Application()
+    app.router.add_post("/api/generate", generate)
+    base = await serve_app(app)
+
+    started = []
+
+    async def fake_search(query, max_results=5, role=None):
+        started.append(query)
+        return {"query": query, "results": "", "items": []}
+
+    monkeypatch.setattr(engine, "OLLAMA_URL", f"{base}/api/generate")
+    monkeypatch.setattr(engine, "web_search", fake_search)
+
+    searches = {}
+    async with aiohttp.ClientSession() as session:
+        response = await engine.call_ollama_dispatching_searches(session, "prompt", "researcher", searches)
+        await asyncio.gather(*searches.values())
+
+    assert attempts["count"] == 2
+    assert response == RESPONSE
+    assert started == ["sme automation 2024", "saas pricing", "invoice software market"]
+
+
+@pytest.mark.asyncio
+async def test_failed_call_cancels_early_searches(monkeypatch):
+    """Searches started before the model call fails are cancelled."""
+    async def failing_call(session, prompt, on_token=None, on_attempt=None):
+        on_attempt()
+        on_token('{"search_requests": ["sme automation 2024", ')
+        raise RuntimeError("Ollama HTTP 500")
+
+    async def slow_search(query, max_results=5, role=None):
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(engine, "enhanced_call_ollama_with_tools", failing_call)
+    monkeypatch.setattr(engine, "web_search", slow_search)
+
+    searches = {}
+    with pytest.raises(RuntimeError):
+        await engine.call_ollama_dispatching_searches(None, "prompt", "researcher", searches)
+
+    assert list(searches) == ["sme automation 2024"]
+    await asyncio.sleep(0)
+    assert searches["sme automation 2024"].cancelled()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""Tests for the native tool-calling agent loop against a fake Ollama /api/chat server."""
+
+import asyncio
+import json
+import os
+import sys
+import time
+
+import aiohttp
+import pytest
+import pytest_asyncio
+from aiohttp import web
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from agents import engine
+
+FINAL_ANSWER = json.dumps({"role": "researcher", "result": "Done", "insights": ["one"], "search_requests": []})
+
+
+def tool_call(query):
+    return {"function": {"name": "web_search", "arguments": {"query": query}}}
+
+
+@pytest_asyncio.fixture
+async def chat_server(monkeypatch, serve_app):
+    """Fake /api/chat that replays scripted replies and records every request."""
+    state = {"requests": [], "replies": [], "delay": 0.0, "final_delay": 0.0}
+
+    async def chat(request):
+        payload = await request.json()
+        state["requests"].append(payload)
+        if "tools" in payload:
+            await asyncio.sleep(state["delay"])
+            message = state["replies"].pop(0) if state["replies"] else {"role": "assistant", "content": FINAL_ANSWER}
+        else:
+            await asyncio.sleep(state["final_delay"])
+            message = {"role": "assistant", "content": FINAL_ANSWER}
+        return web.json_response({"message": message, "done": True})
+
+    app = web.Application()
+    app.router.add_post("/api/chat", chat)
+    monkeypatch.setattr(engine, "OLLAMA_CHAT_URL", f"{await serve_app(app)}/api/chat")
+
+    return state
+
+
+@pytest.fixture
+def fake_search(monkeypatch):
+    """web_search tool that takes 0.2s and records how many calls overlap."""
+    state = {"in_flight": 0, "max_in_flight": 0, "queries": []}
+
+    async def handler(session, role, arguments):
+        state["queries"].append(arguments["query"])
+        state["in_flight"] += 1
+        state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+        await asyncio.sleep(0.2)
+        state["in_flight"] -= 1
+        return {"content": f"results for {arguments['query']}", "search": {"query": arguments["query"]}}
+
+    monkeypatch.setitem(engine.TOOL_HANDLERS, "web_search", handler)
+    return state
+
+
+@pytest.mark.asyncio
+async def test_tool_calls_run_concurrently_and_feed_back(chat_server, fake_search):
+    """All tool calls of a turn run at once, come back as tool messages, and a plain answer ends the loop."""
+    chat_server["replies"] = [{"role": "assistant", "content": "", "tool_calls": [tool_call("q1"), tool_call("q2")]}]
+
+    async with aiohttp.ClientSession() as session:
+        result = await engine.run_subagent_with_tools(session, "researcher", "task", {}, max_steps=4)
+
+    assert fake_search["max_in_flight"] == 2
+
+    assert len(chat_server["requests"]) == 2
+    tool_messages = [m for m in chat_server["requests"][1]["messages"] if m["role"] == "tool"]
+    assert [(m["tool_name"], m["content"]) for m in tool_messages] == [
+        ("web_search", "results for q1"), ("web_search", "results for q2")
+    ]
+
+    assert result["result"] == "Done"
+    assert result["search_requests"] == ["q1", "q2"]
+    assert result["tool_steps"] == 2
+
+
+@pytest.mark.asyncio
+async def test_max_steps_forces_final_answer(chat_server, fake_search):
+    """A model that keeps calling tools gets one last call without tools once max_steps is spent."""
+    chat_server["replies"] = [
+        {"role": "assistant", "content": "", "tool_calls": [tool_call(f"q{i}")]} for i in range(5)
+    ]
+
+    async with aiohttp.ClientSession() as session:
+        result = await engine.run_subagent_with_tools(session, "researcher", "task", {}, max_steps=2)
+
+    assert [("tools" in r) for r in chat_server["requests"]] == [True, True, False]
+    assert chat_server["requests"][-1]["messages"][-1]["content"].startswith("Stop calling tools")
+    assert fake_search["queries"] == ["q0", "q1"]
+    assert result["result"] == "Done"
+    assert result["tool_steps"] == 2
+
+
+@pytest.mark.asyncio
+async def test_slow_chat_call_is_cut_off_at_time_budget(chat_server, fake_search):
+    """A chat call still running when the budget ends is abandoned for the forced final answer."""
+    chat_server["delay"] = 2.0
+
+    async with aiohttp.ClientSession() as session:
+        start = time.monotonic()
+        result = await engine.run_subagent_with_tools(session, "researcher", "task", {}, time_budget=0.3)
+        elapsed = time.monotonic() - start
+
+    assert elapsed < 1.5
+    assert [("tools" in r) for r in chat_server["requests"]] == [True, False]
+    assert result["result"] == "Done"
+    assert result["tool_steps"] == 0
+
+
+@pytest.mark.asyncio
+async def test_slow_final_answer_is_bounded_by_grace(chat_server, fake_search):
+    """The forced final call only gets the grace period past the budget."""
+    chat_server["delay"] = 2.0
+    chat_server["final_delay"] = 2.0
+
+    async with aiohttp.ClientSession() as session:
+        start = time.monotonic()
+        result = await engine.run_subagent_with_tools(
+            session, "researcher", "task", {}, time_budget=0.3, final_grace=0.3
+        )
+        elapsed = time.monotonic() - start
+
+    assert elapsed < 1.5
+    assert [("tools" in r) for r in chat_server["requests"]] == [True, False]
+    assert result["parsing_error"] is True
+    assert result["result"] == "No response received from AI model"